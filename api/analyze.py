@@ -0,0 +1,99 @@
+from http.server import BaseHTTPRequestHandler
+import json
+import math
+import time
+from api.utils.response_wrapper import make_response
+from api.utils.validators import get_use_cache, validate_text_input, validate_analyses
+from api.utils.logger import log_request
+from services.profiler import request_profiler
+from services.text_analyzer import analyze_text, AVAILABLE_ANALYSES
+from services.process_pool import PoolBusy
+
+class handler(BaseHTTPRequestHandler):
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+    
+    def do_POST(self):
+        start_time = time.time()
+        
+        # Parse the request body
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length == 0:
+            response = make_response(400, "Request body is empty")
+            self._send_response(response)
+            log_request("/api/analyze", {}, response, start_time)
+            return
+            
+        request_body = self.rfile.read(content_length)
+        try:
+            request_data = json.loads(request_body)
+        except json.JSONDecodeError:
+            response = make_response(400, "Invalid JSON in request body")
+            self._send_response(response)
+            log_request("/api/analyze", {}, response, start_time)
+            return
+        
+        # Validate input
+        is_valid, error_message = validate_text_input(request_data)
+        if not is_valid:
+            response = make_response(400, error_message)
+            self._send_response(response)
+            log_request("/api/analyze", request_data, response, start_time)
+            return
+        
+        # Process the request
+        try:
+            use_cache = get_use_cache(request_data, self.headers)
+            text = request_data.get('text', '')
+            analyses = request_data.get('analyses', list(AVAILABLE_ANALYSES))
+            
+            # Validate analyses
+            is_valid, error_message = validate_analyses(analyses, AVAILABLE_ANALYSES)
+            if not is_valid:
+                response = make_response(400, error_message)
+                self._send_response(response)
+                log_request("/api/analyze", request_data, response, start_time)
+                return
+            
+            num_sentences = request_data.get('num_sentences', 3)
+            num_keywords = request_data.get('num_keywords', 5)
+            
+            # Validate num_sentences
+            try:
+                num_sentences = int(num_sentences)
+                if num_sentences < 1:
+                    num_sentences = 3
+            except (ValueError, TypeError):
+                num_sentences = 3
+                
+            # Validate num_keywords
+            try:
+                num_keywords = int(num_keywords)
+                if num_keywords < 1:
+                    num_keywords = 5
+            except (ValueError, TypeError):
+                num_keywords = 5
+                
+            result, profile = request_profiler.call("/api/analyze", self.headers, analyze_text, text, analyses, num_sentences, num_keywords, use_cache=use_cache)
+            response = make_response(200, "Text analysis completed successfully", result, profile=profile)
+        except PoolBusy as e:
+            # Too many CPU-bound requests already queued in this process
+            response = make_response(503, str(e))
+            response["headers"]["Retry-After"] = str(math.ceil(e.retry_after))
+        except Exception as e:
+            response = make_response(500, f"Error processing request: {str(e)}")
+        
+        # Send the response
+        self._send_response(response)
+        log_request("/api/analyze", request_data, response, start_time)
+    
+    def _send_response(self, response):
+        self.send_response(response["statusCode"])
+        for header, value in response["headers"].items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(response["body"].encode())
\ No newline at end of file
@@ -2,9 +2,10 @@ from http.server import BaseHTTPRequestHandler
 import json
 import time
 from api.utils.response_wrapper import make_response
-from api.utils.validators import validate_text_input
+from api.utils.validators import get_use_cache, validate_text_input, validate_batch_input, validate_option, get_flag
 from api.utils.logger import log_request
-from services.sentiment_analyzer import analyze_sentiment
+from services.profiler import request_profiler
+from services.sentiment_analyzer import analyze_sentiment, analyze_sentiment_batch, SENTIMENT_ENGINES
 
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -35,7 +36,10 @@ class handler(BaseHTTPRequestHandler):
             return
         
         # Validate input
-        is_valid, error_message = validate_text_input(request_data)
+        if isinstance(request_data, dict) and 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+        else:
+            is_valid, error_message = validate_text_input(request_data)
         if not is_valid:
             response = make_response(400, error_message)
             self._send_response(response)
@@ -44,9 +48,22 @@ class handler(BaseHTTPRequestHandler):
         
         # Process the request
         try:
-            text = request_data.get('text', '')
-            result = analyze_sentiment(text)
-            response = make_response(200, "Sentiment analysis completed successfully", result)
+            use_cache = get_use_cache(request_data, self.headers)
+            engine = request_data.get('engine', 'textblob')
+            is_valid, error_message = validate_option('engine', engine, SENTIMENT_ENGINES)
+            if not is_valid:
+                response = make_response(400, error_message)
+                self._send_response(response)
+                log_request("/api/analyze_sentiment", request_data, response, start_time)
+                return
+            sentences = get_flag(request_data, 'sentences')
+                
+            if 'texts' in request_data:
+                result, profile = request_profiler.call("/api/analyze_sentiment", self.headers, analyze_sentiment_batch, request_data['texts'], engine, sentences, use_cache=use_cache)
+            else:
+                text = request_data.get('text', '')
+                result, profile = request_profiler.call("/api/analyze_sentiment", self.headers, analyze_sentiment, text, engine, sentences, use_cache=use_cache)
+            response = make_response(200, "Sentiment analysis completed successfully", result, profile=profile)
         except Exception as e:
             response = make_response(500, f"Error processing request: {str(e)}")
         
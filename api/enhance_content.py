@@ -2,9 +2,10 @@ from http.server import BaseHTTPRequestHandler
 import json
 import time
 from api.utils.response_wrapper import make_response
-from api.utils.validators import validate_text_input
+from api.utils.validators import get_use_cache, validate_text_input, validate_batch_input
 from api.utils.logger import log_request
-from services.content_enhancer import enhance_content
+from services.profiler import request_profiler
+from services.content_enhancer import enhance_content, enhance_content_batch
 
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -35,7 +36,10 @@ class handler(BaseHTTPRequestHandler):
             return
         
         # Validate input
-        is_valid, error_message = validate_text_input(request_data)
+        if isinstance(request_data, dict) and 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+        else:
+            is_valid, error_message = validate_text_input(request_data)
         if not is_valid:
             response = make_response(400, error_message)
             self._send_response(response)
@@ -44,9 +48,13 @@ class handler(BaseHTTPRequestHandler):
         
         # Process the request
         try:
-            text = request_data.get('text', '')
-            result = enhance_content(text)
-            response = make_response(200, "Content enhancement completed successfully", result)
+            use_cache = get_use_cache(request_data, self.headers)
+            if 'texts' in request_data:
+                result, profile = request_profiler.call("/api/enhance_content", self.headers, enhance_content_batch, request_data['texts'], use_cache=use_cache)
+            else:
+                text = request_data.get('text', '')
+                result, profile = request_profiler.call("/api/enhance_content", self.headers, enhance_content, text, use_cache=use_cache)
+            response = make_response(200, "Content enhancement completed successfully", result, profile=profile)
         except Exception as e:
             response = make_response(500, f"Error processing request: {str(e)}")
         
@@ -1,10 +1,13 @@
 from http.server import BaseHTTPRequestHandler
 import json
+import math
 import time
 from api.utils.response_wrapper import make_response
-from api.utils.validators import validate_text_input
+from api.utils.validators import get_use_cache, validate_text_input, validate_batch_input, validate_option, get_flag
 from api.utils.logger import log_request
-from services.keyword_extractor import extract_keywords
+from services.profiler import request_profiler
+from services.keyword_extractor import extract_keywords, extract_keywords_batch, KEYWORD_METHODS, KEYWORD_TOKENIZERS
+from services.process_pool import PoolBusy
 
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -35,7 +38,10 @@ class handler(BaseHTTPRequestHandler):
             return
         
         # Validate input
-        is_valid, error_message = validate_text_input(request_data)
+        if isinstance(request_data, dict) and 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+        else:
+            is_valid, error_message = validate_text_input(request_data)
         if not is_valid:
             response = make_response(400, error_message)
             self._send_response(response)
@@ -44,7 +50,7 @@ class handler(BaseHTTPRequestHandler):
         
         # Process the request
         try:
-            text = request_data.get('text', '')
+            use_cache = get_use_cache(request_data, self.headers)
             num_keywords = request_data.get('num_keywords', 5)
             
             # Validate num_keywords
@@ -55,8 +61,34 @@ class handler(BaseHTTPRequestHandler):
             except (ValueError, TypeError):
                 num_keywords = 5
                 
-            result = extract_keywords(text, num_keywords)
-            response = make_response(200, "Keyword extraction completed successfully", result)
+            # Validate method
+            method = request_data.get('method', 'frequency')
+            is_valid, error_message = validate_option('method', method, KEYWORD_METHODS)
+            if not is_valid:
+                response = make_response(400, error_message)
+                self._send_response(response)
+                log_request("/api/extract_keywords", request_data, response, start_time)
+                return
+            
+            tokenizer = request_data.get('tokenizer', 'treebank')
+            is_valid, error_message = validate_option('tokenizer', tokenizer, KEYWORD_TOKENIZERS)
+            if not is_valid:
+                response = make_response(400, error_message)
+                self._send_response(response)
+                log_request("/api/extract_keywords", request_data, response, start_time)
+                return
+            keyphrases = get_flag(request_data, 'keyphrases')
+                
+            if 'texts' in request_data:
+                result, profile = request_profiler.call("/api/extract_keywords", self.headers, extract_keywords_batch, request_data['texts'], num_keywords, method, tokenizer, keyphrases, use_cache=use_cache)
+            else:
+                text = request_data.get('text', '')
+                result, profile = request_profiler.call("/api/extract_keywords", self.headers, extract_keywords, text, num_keywords, method, tokenizer, keyphrases, use_cache=use_cache)
+            response = make_response(200, "Keyword extraction completed successfully", result, profile=profile)
+        except PoolBusy as e:
+            # Too many CPU-bound requests already queued in this process
+            response = make_response(503, str(e))
+            response["headers"]["Retry-After"] = str(math.ceil(e.retry_after))
         except Exception as e:
             response = make_response(500, f"Error processing request: {str(e)}")
         
@@ -1,10 +1,13 @@
 from http.server import BaseHTTPRequestHandler
 import json
+import math
 import time
 from api.utils.response_wrapper import make_response
-from api.utils.validators import validate_text_input
+from api.utils.validators import get_use_cache, validate_text_input, validate_batch_input, validate_option
 from api.utils.logger import log_request
-from services.text_summarizer import summarize_text
+from services.profiler import request_profiler
+from services.text_summarizer import summarize_text, summarize_text_batch, SUMMARY_ALGORITHM_CHOICES, SUMMARY_MODES
+from services.process_pool import PoolBusy
 
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -35,7 +38,10 @@ class handler(BaseHTTPRequestHandler):
             return
         
         # Validate input
-        is_valid, error_message = validate_text_input(request_data)
+        if isinstance(request_data, dict) and 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+        else:
+            is_valid, error_message = validate_text_input(request_data)
         if not is_valid:
             response = make_response(400, error_message)
             self._send_response(response)
@@ -44,7 +50,7 @@ class handler(BaseHTTPRequestHandler):
         
         # Process the request
         try:
-            text = request_data.get('text', '')
+            use_cache = get_use_cache(request_data, self.headers)
             num_sentences = request_data.get('num_sentences', 3)
             
             # Validate num_sentences
@@ -55,8 +61,43 @@ class handler(BaseHTTPRequestHandler):
             except (ValueError, TypeError):
                 num_sentences = 3
                 
-            result = summarize_text(text, num_sentences)
-            response = make_response(200, "Text summarization completed successfully", result)
+            # Validate algorithm. A latency budget selects it automatically
+            # unless one is given
+            max_latency_ms = request_data.get('max_latency_ms')
+            if max_latency_ms is not None:
+                try:
+                    max_latency_ms = float(max_latency_ms)
+                    if max_latency_ms <= 0:
+                        max_latency_ms = None
+                except (ValueError, TypeError):
+                    max_latency_ms = None
+                
+            algorithm = request_data.get('algorithm', 'auto' if max_latency_ms is not None else 'lsa')
+            is_valid, error_message = validate_option('algorithm', algorithm, SUMMARY_ALGORITHM_CHOICES)
+            if not is_valid:
+                response = make_response(400, error_message)
+                self._send_response(response)
+                log_request("/api/summarize", request_data, response, start_time)
+                return
+            
+            mode = request_data.get('mode', 'standard')
+            is_valid, error_message = validate_option('mode', mode, SUMMARY_MODES)
+            if not is_valid:
+                response = make_response(400, error_message)
+                self._send_response(response)
+                log_request("/api/summarize", request_data, response, start_time)
+                return
+                
+            if 'texts' in request_data:
+                result, profile = request_profiler.call("/api/summarize", self.headers, summarize_text_batch, request_data['texts'], num_sentences, algorithm, mode, max_latency_ms, use_cache=use_cache)
+            else:
+                text = request_data.get('text', '')
+                result, profile = request_profiler.call("/api/summarize", self.headers, summarize_text, text, num_sentences, algorithm, mode, max_latency_ms, use_cache=use_cache)
+            response = make_response(200, "Text summarization completed successfully", result, profile=profile)
+        except PoolBusy as e:
+            # Too many CPU-bound requests already queued in this process
+            response = make_response(503, str(e))
+            response["headers"]["Retry-After"] = str(math.ceil(e.retry_after))
         except Exception as e:
             response = make_response(500, f"Error processing request: {str(e)}")
         
@@ -1,10 +1,12 @@
 from http.server import BaseHTTPRequestHandler
 import json
+import math
 import time
 from api.utils.response_wrapper import make_response
-from api.utils.validators import validate_text_input
+from api.utils.validators import get_use_cache, validate_text_input, validate_batch_input
 from api.utils.logger import log_request
-from services.translator import translate_text, SUPPORTED_LANGUAGES
+from services.profiler import request_profiler
+from services.translator import translate_text, translate_text_batch, SUPPORTED_LANGUAGES, TranslationError, TranslationUnavailable
 
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -35,7 +37,10 @@ class handler(BaseHTTPRequestHandler):
             return
         
         # Validate input
-        is_valid, error_message = validate_text_input(request_data)
+        if isinstance(request_data, dict) and 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+        else:
+            is_valid, error_message = validate_text_input(request_data)
         if not is_valid:
             response = make_response(400, error_message)
             self._send_response(response)
@@ -44,7 +49,7 @@ class handler(BaseHTTPRequestHandler):
         
         # Process the request
         try:
-            text = request_data.get('text', '')
+            use_cache = get_use_cache(request_data, self.headers)
             from_lang = request_data.get('from_lang', 'auto')
             to_lang = request_data.get('to_lang', 'en')
             
@@ -55,8 +60,20 @@ class handler(BaseHTTPRequestHandler):
                 log_request("/api/translate", request_data, response, start_time)
                 return
                 
-            result = translate_text(text, from_lang, to_lang)
-            response = make_response(200, "Translation completed successfully", result)
+            if 'texts' in request_data:
+                result, profile = request_profiler.call("/api/translate", self.headers, translate_text_batch, request_data['texts'], from_lang, to_lang, use_cache=use_cache)
+            else:
+                text = request_data.get('text', '')
+                result, profile = request_profiler.call("/api/translate", self.headers, translate_text, text, from_lang, to_lang, use_cache=use_cache)
+            response = make_response(200, "Translation completed successfully", result, profile=profile)
+        except ValueError as e:
+            response = make_response(400, str(e))
+        except TranslationUnavailable as e:
+            # The provider is down: tell clients when to come back
+            response = make_response(503, str(e))
+            response["headers"]["Retry-After"] = str(math.ceil(e.retry_after))
+        except TranslationError as e:
+            response = make_response(502, str(e))
         except Exception as e:
             response = make_response(500, f"Error processing request: {str(e)}")
         
@@ -1,11 +1,189 @@
+import atexit
 import json
+import os
+import queue
+import random
+import sys
+import threading
 import time
 from datetime import datetime
+import config
+from services.metrics import metrics
+
+class RequestLogger:
+    """
+    Writes one JSON line per request to stdout from a background thread.
+
+    Request threads only put the record in a bounded queue, so a slow or
+    contended stdout never adds to the latency of a request. The writer
+    thread takes the records in batches of up to batch_size and writes each
+    batch at once. When the queue is full the record is dropped and
+    counted, and the writer reports how many were dropped. Successful
+    requests can be sampled: only a sample_rate share of them is logged,
+    with the rate in the record, while errors are always logged.
+    """
+
+    def __init__(self, queue_size=10000, batch_size=256, sample_rate=1.0, asynchronous=True, stream=None,
+                 enabled=True):
+        """
+        Args:
+            queue_size (int): Records that may wait for the writer
+            batch_size (int): Most records written at once
+            sample_rate (float): Share of the successful requests logged
+            asynchronous (bool): Whether to write from a background thread;
+                if False, every record is written by the calling thread
+            stream (file, optional): Where to write, stdout if None
+            enabled (bool): Whether to log at all
+        """
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self.asynchronous = asynchronous
+        self.stream = stream
+        self.enabled = enabled
+
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pid = None
+        self._counters = {"logged": 0, "written": 0, "dropped": 0, "sampled_out": 0}
+        self._reported_drops = 0
+
+    def log(self, route, status, processing_time_ms=None, method="POST", **fields):
+        """
+        Log a request.
+
+        Args:
+            route (str): The API route that was accessed
+            status (int): HTTP status code of the response
+            processing_time_ms (float, optional): Time taken to answer
+            method (str): HTTP method of the request
+            **fields: Further fields of the record
+        """
+        if not self.enabled:
+            return
+        record = dict(fields, time=time.time(), route=route, method=method, status=status,
+                      processing_time_ms=processing_time_ms)
+        if status < 400 and self.sample_rate < 1.0:
+            if random.random() >= self.sample_rate:
+                with self._lock:
+                    self._counters["sampled_out"] += 1
+                return
+            record["sample_rate"] = self.sample_rate
+
+        if not self.asynchronous:
+            with self._lock:
+                self._counters["logged"] += 1
+            self._write([record])
+            return
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped"] += 1
+            return
+        with self._lock:
+            self._counters["logged"] += 1
+
+    def flush(self, timeout=1.0):
+        """Write the queued records, waiting at most timeout seconds for the writer."""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            records = self._take(block=False)
+            if records:
+                self._write(records)
+
+    def stats(self):
+        """Return the queue depth and the counts of logged, written, dropped and sampled out records."""
+        with self._lock:
+            return dict(
+                queue_size=self.queue_size,
+                queued=self._queue.qsize(),
+                sample_rate=self.sample_rate,
+                enabled=self.enabled,
+                asynchronous=self.asynchronous,
+                **self._counters
+            )
+
+    def _ensure_writer(self):
+        # Threads don't survive a fork, so start the writer once per process
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Records of the parent process are its own to write
+                self._queue = queue.Queue(maxsize=self.queue_size)
+            else:
+                atexit.register(self.flush)
+            self._pid = pid
+            thread = threading.Thread(target=self._work, name="request-log-writer", daemon=True)
+            thread.start()
+
+    def _work(self):
+        while True:
+            records = self._take(block=True)
+            if records:
+                self._write(records)
+
+    def _take(self, block):
+        # The first record waits, the others of the batch are those queued
+        records = []
+        try:
+            records.append(self._queue.get(block=block))
+            while len(records) < self.batch_size:
+                records.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return records
+
+    def _write(self, records):
+        with self._lock:
+            dropped = self._counters["dropped"] - self._reported_drops
+            self._reported_drops += dropped
+
+        lines = [json.dumps(_format(record)) for record in records]
+        if dropped:
+            lines.append(json.dumps({
+                "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                "event": "request_log_dropped",
+                "dropped": dropped
+            }))
+
+        with self._write_lock:
+            stream = self.stream or sys.stdout
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except (OSError, ValueError):
+                # Closed stdout at shutdown
+                return
+        with self._lock:
+            self._counters["written"] += len(records)
+
+def _format(record):
+    # Formatting the timestamp is left to the writer
+    timestamp = datetime.utcfromtimestamp(record.pop("time")).strftime("%Y-%m-%d %H:%M:%S")
+    return dict(timestamp=timestamp, **record)
+
+# Logger of every request of this process, of the Flask app and the
+# serverless handlers alike
+request_logger = RequestLogger(
+    queue_size=config.REQUEST_LOG_QUEUE_SIZE,
+    batch_size=config.REQUEST_LOG_BATCH_SIZE,
+    sample_rate=config.REQUEST_LOG_SAMPLE_RATE,
+    asynchronous=config.REQUEST_LOG_ASYNC,
+    enabled=config.REQUEST_LOG_ENABLED
+)
 
 def log_request(route, request_body, response, start_time=None):
     """
     Logs information about a request.
-    
+
     Args:
         route (str): The API route that was accessed
         request_body (dict): The request body
@@ -14,14 +192,11 @@ def log_request(route, request_body, response, start_time=None):
     """
     end_time = time.time()
     processing_time = round((end_time - start_time) * 1000, 2) if start_time else None
-    
-    log_entry = {
-        "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-        "route": route,
-        "status": response.get("statusCode", 0),
-        "processing_time_ms": processing_time
-    }
-    
-    # In a real application, you would write this to a log file or service
-    # For Vercel, logs are automatically collected and viewable in the dashboard
-    print(json.dumps(log_entry))
\ No newline at end of file
+    status = response.get("statusCode", 0)
+
+    if start_time:
+        metrics.observe_request(route, "POST", status, end_time - start_time)
+
+    # Written to stdout by a background thread; on Vercel, logs are
+    # automatically collected and viewable in the dashboard
+    request_logger.log(route, status, processing_time)
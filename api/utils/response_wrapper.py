@@ -1,7 +1,7 @@
 from http.server import BaseHTTPRequestHandler
 import json
 
-def make_response(status_code, message, data=None):
+def make_response(status_code, message, data=None, profile=None):
     """
     Creates a standardized API response.
     
@@ -9,6 +9,8 @@ def make_response(status_code, message, data=None):
         status_code (int): HTTP status code
         message (str): Response message
         data (any, optional): Response data payload
+        profile (dict, optional): Profile of the request, when it asked
+            for one
         
     Returns:
         dict: Standardized response structure
@@ -20,16 +22,22 @@ def make_response(status_code, message, data=None):
     
     if data is not None:
         response["data"] = data
+    if profile is not None:
+        response["profile"] = profile
+        
+    headers = {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Headers": "Content-Type",
+        "Access-Control-Allow-Methods": "POST, OPTIONS"
+    }
+    if profile is not None and "id" in profile:
+        headers["X-Profile-Id"] = profile["id"]
         
     return {
         "statusCode": status_code,
         "body": json.dumps(response),
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Methods": "POST, OPTIONS"
-        }
+        "headers": headers
     }
 
 class VercelHandler(BaseHTTPRequestHandler):
@@ -1,3 +1,6 @@
+# Maximum number of texts accepted in a single batch request
+MAX_BATCH_SIZE = 100
+
 def validate_text_input(request_body):
     """
     Validates if the request body contains valid text input.
@@ -21,4 +24,111 @@ def validate_text_input(request_body):
     if not text.strip():
         return False, "'text' cannot be empty"
         
-    return True, None
\ No newline at end of file
+    return True, None
+
+def validate_analyses(analyses, available):
+    """
+    Validates the list of analyses requested from the combined endpoint.
+    
+    Args:
+        analyses (any): The 'analyses' value from the request body
+        available (tuple): Names of the analyses that can be requested
+        
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if not isinstance(analyses, list) or not analyses:
+        return False, "'analyses' must be a non-empty list"
+    
+    unknown = [name for name in analyses if name not in available]
+    if unknown:
+        return False, f"Unknown analyses: {', '.join(map(str, unknown))}. Available analyses: {', '.join(available)}"
+        
+    return True, None
+
+
+def validate_batch_input(request_body):
+    """
+    Validates if the request body contains a valid batch of texts.
+    
+    Only the list itself is validated here; invalid items are reported
+    per item in the batch results so they don't fail the whole batch.
+    
+    Args:
+        request_body (dict): The parsed request body
+        
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if not request_body:
+        return False, "Request body is empty or malformed"
+    
+    texts = request_body.get('texts')
+    if not isinstance(texts, list):
+        return False, "'texts' must be a list of strings"
+    
+    if not texts:
+        return False, "'texts' cannot be empty"
+    
+    if len(texts) > MAX_BATCH_SIZE:
+        return False, f"'texts' cannot contain more than {MAX_BATCH_SIZE} items"
+        
+    return True, None
+
+
+def get_use_cache(request_body, headers=None):
+    """
+    Reads whether the caller accepts cached results.
+    
+    Caching is on by default and can be turned off per request with
+    "use_cache": false in the body or a "Cache-Control: no-cache" header.
+    
+    Args:
+        request_body (dict): The parsed request body
+        headers (mapping, optional): The request headers
+        
+    Returns:
+        bool: True if cached results may be returned
+    """
+    if headers is not None and 'no-cache' in (headers.get('Cache-Control') or '').lower():
+        return False
+    
+    return get_flag(request_body, 'use_cache', True)
+
+
+def get_flag(request_body, name, default=False):
+    """
+    Reads a boolean option from the request body.
+    
+    Args:
+        request_body (dict): The parsed request body
+        name (str): Name of the option
+        default (bool): Value when the option is missing
+        
+    Returns:
+        bool: The option, with "false", "0", "no" and "off" strings read
+            as False
+    """
+    value = request_body.get(name, default) if isinstance(request_body, dict) else default
+    if isinstance(value, str):
+        return value.strip().lower() not in ('false', '0', 'no', 'off')
+        
+    return bool(value)
+
+
+def validate_option(name, value, available):
+    """
+    Validates that a request option is one of the accepted values.
+    
+    Args:
+        name (str): Name of the option in the request body
+        value (any): The value from the request body
+        available (iterable): The accepted values
+        
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    if not isinstance(value, str) or value not in available:
+        return False, f"'{name}' must be one of: {', '.join(available)}"
+        
+    return True, None
@@ -1,37 +1,81 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory
+import json
+import math
 import os
 import sys
-import nltk
-
-# Download NLTK data at startup
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-    
-try:
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-except LookupError:
-    nltk.download('averaged_perceptron_tagger')
+import time
 
 # Add the project root to the path so we can import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import our services
-from services.sentiment_analyzer import analyze_sentiment
-from services.text_summarizer import summarize_text
-from services.keyword_extractor import extract_keywords
-from services.content_enhancer import enhance_content
-from services.translator import translate_text
+import config
+from api.utils.logger import request_logger
+from api.utils.validators import validate_analyses, validate_batch_input, validate_option, get_flag, get_use_cache
+from services.cache import result_cache
+from services.metrics import metrics
+from services.profiler import request_profiler
+from services import resources
+
+# The services import the heavy NLP libraries (textblob, sumy, nltk,
+# deep_translator), so each route imports its service on first use.
+# Unless LAZY_STARTUP is set, everything is loaded once here instead, before
+# any request; under gunicorn --preload this happens in the master and is
+# shared by the workers.
+if not config.LAZY_STARTUP:
+    resources.warm_up()
 
 # Create Flask app
 app = Flask(__name__, static_folder="public")
 
+# WSGI environ key of the requests dispatched by run_endpoint(). They are
+# the items of jobs and bulk runs, not requests from clients, so they are
+# not timed, logged or profiled as such.
+INTERNAL_DISPATCH = 'app.internal_dispatch'
+
+@app.before_request
+def start_timer():
+    if not request.environ.get(INTERNAL_DISPATCH):
+        g.start_time = time.perf_counter()
+    if config.LAZY_STARTUP:
+        # The models load in the background from the first request of each
+        # worker, so readiness probes see the worker become ready
+        resources.warm_up_in_background()
+
+def call_service(function, *args, **kwargs):
+    """
+    Call a service function for the current request.
+    
+    The call is profiled when the request asks for it or is sampled, see
+    RequestProfiler; a requested profile is added to the response. Items of
+    jobs and bulk runs are never profiled.
+    """
+    if request.environ.get(INTERNAL_DISPATCH):
+        return function(*args, **kwargs)
+    result, profile = request_profiler.call(request.path, request.headers, function, *args, **kwargs)
+    if profile is not None:
+        g.profile = profile
+    return result
+
+@app.after_request
+def record_request(response):
+    profile = g.pop('profile', None)
+    if profile is not None and response.is_json:
+        body = response.get_json()
+        if isinstance(body, dict):
+            body["profile"] = profile
+            response.set_data(json.dumps(body))
+        if "id" in profile:
+            response.headers["X-Profile-Id"] = profile["id"]
+    
+    if 'start_time' in g:
+        elapsed = time.perf_counter() - g.start_time
+        # Requests are counted by route rule, not path, so static files and
+        # job ids don't make a series each
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe_request(endpoint, request.method, response.status_code, elapsed)
+        request_logger.log(request.path, response.status_code, round(elapsed * 1000, 2), request.method)
+    return response
+
 # CORS headers
 @app.after_request
 def add_cors_headers(response):
@@ -52,15 +96,36 @@ def serve_static(path):
 @app.route('/api/analyze_sentiment', methods=['POST'])
 def api_analyze_sentiment():
     try:
+        from services.sentiment_analyzer import analyze_sentiment, analyze_sentiment_batch, SENTIMENT_ENGINES
+        
         request_data = request.get_json()
-        if not request_data or 'text' not in request_data:
+        if not request_data or ('text' not in request_data and 'texts' not in request_data):
             return jsonify({
                 "status": "error",
-                "message": "Missing required parameter: text"
+                "message": "Missing required parameter: text or texts"
             }), 400
             
-        text = request_data.get('text', '')
-        result = analyze_sentiment(text)
+        use_cache = get_use_cache(request_data, request.headers)
+        engine = request_data.get('engine', 'textblob')
+        is_valid, error_message = validate_option('engine', engine, SENTIMENT_ENGINES)
+        if not is_valid:
+            return jsonify({
+                "status": "error",
+                "message": error_message
+            }), 400
+        sentences = get_flag(request_data, 'sentences')
+            
+        if 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+            if not is_valid:
+                return jsonify({
+                    "status": "error",
+                    "message": error_message
+                }), 400
+            result = call_service(analyze_sentiment_batch, request_data['texts'], engine, sentences, use_cache=use_cache)
+        else:
+            text = request_data.get('text', '')
+            result = call_service(analyze_sentiment, text, engine, sentences, use_cache=use_cache)
         
         return jsonify({
             "status": "success",
@@ -76,14 +141,17 @@ def api_analyze_sentiment():
 @app.route('/api/summarize', methods=['POST'])
 def api_summarize():
     try:
+        from services.text_summarizer import summarize_text, summarize_text_batch, SUMMARY_ALGORITHM_CHOICES, SUMMARY_MODES
+        from services.process_pool import PoolBusy
+        
         request_data = request.get_json()
-        if not request_data or 'text' not in request_data:
+        if not request_data or ('text' not in request_data and 'texts' not in request_data):
             return jsonify({
                 "status": "error",
-                "message": "Missing required parameter: text"
+                "message": "Missing required parameter: text or texts"
             }), 400
             
-        text = request_data.get('text', '')
+        use_cache = get_use_cache(request_data, request.headers)
         num_sentences = request_data.get('num_sentences', 3)
         
         try:
@@ -93,13 +161,55 @@ def api_summarize():
         except (ValueError, TypeError):
             num_sentences = 3
             
-        result = summarize_text(text, num_sentences)
+        # A latency budget selects the algorithm automatically unless one is given
+        max_latency_ms = request_data.get('max_latency_ms')
+        if max_latency_ms is not None:
+            try:
+                max_latency_ms = float(max_latency_ms)
+                if max_latency_ms <= 0:
+                    max_latency_ms = None
+            except (ValueError, TypeError):
+                max_latency_ms = None
+            
+        algorithm = request_data.get('algorithm', 'auto' if max_latency_ms is not None else 'lsa')
+        is_valid, error_message = validate_option('algorithm', algorithm, SUMMARY_ALGORITHM_CHOICES)
+        if not is_valid:
+            return jsonify({
+                "status": "error",
+                "message": error_message
+            }), 400
+            
+        mode = request_data.get('mode', 'standard')
+        is_valid, error_message = validate_option('mode', mode, SUMMARY_MODES)
+        if not is_valid:
+            return jsonify({
+                "status": "error",
+                "message": error_message
+            }), 400
+            
+        if 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+            if not is_valid:
+                return jsonify({
+                    "status": "error",
+                    "message": error_message
+                }), 400
+            result = call_service(summarize_text_batch, request_data['texts'], num_sentences, algorithm, mode, max_latency_ms, use_cache=use_cache)
+        else:
+            text = request_data.get('text', '')
+            result = call_service(summarize_text, text, num_sentences, algorithm, mode, max_latency_ms, use_cache=use_cache)
         
         return jsonify({
             "status": "success",
             "message": "Text summarization completed successfully",
             "data": result
         })
+    except PoolBusy as e:
+        # Too many CPU-bound requests already queued in this worker
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 503, {"Retry-After": str(math.ceil(e.retry_after))}
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -109,14 +219,17 @@ def api_summarize():
 @app.route('/api/extract_keywords', methods=['POST'])
 def api_extract_keywords():
     try:
+        from services.keyword_extractor import extract_keywords, extract_keywords_batch, KEYWORD_METHODS, KEYWORD_TOKENIZERS
+        from services.process_pool import PoolBusy
+        
         request_data = request.get_json()
-        if not request_data or 'text' not in request_data:
+        if not request_data or ('text' not in request_data and 'texts' not in request_data):
             return jsonify({
                 "status": "error",
-                "message": "Missing required parameter: text"
+                "message": "Missing required parameter: text or texts"
             }), 400
             
-        text = request_data.get('text', '')
+        use_cache = get_use_cache(request_data, request.headers)
         num_keywords = request_data.get('num_keywords', 5)
         
         try:
@@ -126,13 +239,53 @@ def api_extract_keywords():
         except (ValueError, TypeError):
             num_keywords = 5
             
-        result = extract_keywords(text, num_keywords)
+        method = request_data.get('method', 'frequency')
+        is_valid, error_message = validate_option('method', method, KEYWORD_METHODS)
+        if not is_valid:
+            return jsonify({
+                "status": "error",
+                "message": error_message
+            }), 400
+        
+        tokenizer = request_data.get('tokenizer', 'treebank')
+        is_valid, error_message = validate_option('tokenizer', tokenizer, KEYWORD_TOKENIZERS)
+        if not is_valid:
+            return jsonify({
+                "status": "error",
+                "message": error_message
+            }), 400
+        keyphrases = get_flag(request_data, 'keyphrases')
+            
+        if 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+            if not is_valid:
+                return jsonify({
+                    "status": "error",
+                    "message": error_message
+                }), 400
+            result = call_service(extract_keywords_batch, request_data['texts'], num_keywords, method, tokenizer, keyphrases, use_cache=use_cache)
+        else:
+            text = request_data.get('text', '')
+            result = call_service(extract_keywords, text, num_keywords, method, tokenizer, keyphrases, use_cache=use_cache)
         
         return jsonify({
             "status": "success",
             "message": "Keyword extraction completed successfully",
             "data": result
         })
+    except PoolBusy as e:
+        # Too many CPU-bound requests already queued in this worker
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 503, {"Retry-After": str(math.ceil(e.retry_after))}
+    except ValueError as e:
+        # A request the service can't answer as asked, such as tfidf
+        # without an IDF index
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -142,15 +295,27 @@ def api_extract_keywords():
 @app.route('/api/enhance_content', methods=['POST'])
 def api_enhance_content():
     try:
+        from services.content_enhancer import enhance_content, enhance_content_batch
+        
         request_data = request.get_json()
-        if not request_data or 'text' not in request_data:
+        if not request_data or ('text' not in request_data and 'texts' not in request_data):
             return jsonify({
                 "status": "error",
-                "message": "Missing required parameter: text"
+                "message": "Missing required parameter: text or texts"
             }), 400
             
-        text = request_data.get('text', '')
-        result = enhance_content(text)
+        use_cache = get_use_cache(request_data, request.headers)
+        if 'texts' in request_data:
+            is_valid, error_message = validate_batch_input(request_data)
+            if not is_valid:
+                return jsonify({
+                    "status": "error",
+                    "message": error_message
+                }), 400
+            result = call_service(enhance_content_batch, request_data['texts'], use_cache=use_cache)
+        else:
+            text = request_data.get('text', '')
+            result = call_service(enhance_content, text, use_cache=use_cache)
         
         return jsonify({
             "status": "success",
@@ -166,18 +331,47 @@ def api_enhance_content():
 @app.route('/api/translate', methods=['POST'])
 def api_translate():
     try:
+        from services.translator import translate_text, translate_text_batch, TranslationError, TranslationUnavailable
+        
         request_data = request.get_json()
-        if not request_data or 'text' not in request_data:
+        if not request_data or ('text' not in request_data and 'texts' not in request_data):
             return jsonify({
                 "status": "error",
-                "message": "Missing required parameter: text"
+                "message": "Missing required parameter: text or texts"
             }), 400
             
-        text = request_data.get('text', '')
+        use_cache = get_use_cache(request_data, request.headers)
         from_lang = request_data.get('from_lang', 'auto')
         to_lang = request_data.get('to_lang', 'en')
         
-        result = translate_text(text, from_lang, to_lang)
+        try:
+            if 'texts' in request_data:
+                is_valid, error_message = validate_batch_input(request_data)
+                if not is_valid:
+                    return jsonify({
+                        "status": "error",
+                        "message": error_message
+                    }), 400
+                result = call_service(translate_text_batch, request_data['texts'], from_lang, to_lang, use_cache=use_cache)
+            else:
+                text = request_data.get('text', '')
+                result = call_service(translate_text, text, from_lang, to_lang, use_cache=use_cache)
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
+        except TranslationUnavailable as e:
+            # The provider is down: tell clients when to come back
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 503, {"Retry-After": str(math.ceil(e.retry_after))}
+        except TranslationError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 502
         
         return jsonify({
             "status": "success",
@@ -190,6 +384,252 @@ def api_translate():
             "message": f"Error processing request: {str(e)}"
         }), 500
 
+@app.route('/api/analyze', methods=['POST'])
+def api_analyze():
+    try:
+        from services.text_analyzer import analyze_text, AVAILABLE_ANALYSES
+        from services.process_pool import PoolBusy
+        
+        request_data = request.get_json()
+        if not request_data or 'text' not in request_data:
+            return jsonify({
+                "status": "error",
+                "message": "Missing required parameter: text"
+            }), 400
+            
+        use_cache = get_use_cache(request_data, request.headers)
+        text = request_data.get('text', '')
+        analyses = request_data.get('analyses', list(AVAILABLE_ANALYSES))
+        
+        is_valid, error_message = validate_analyses(analyses, AVAILABLE_ANALYSES)
+        if not is_valid:
+            return jsonify({
+                "status": "error",
+                "message": error_message
+            }), 400
+        
+        num_sentences = request_data.get('num_sentences', 3)
+        try:
+            num_sentences = int(num_sentences)
+            if num_sentences < 1:
+                num_sentences = 3
+        except (ValueError, TypeError):
+            num_sentences = 3
+            
+        num_keywords = request_data.get('num_keywords', 5)
+        try:
+            num_keywords = int(num_keywords)
+            if num_keywords < 1:
+                num_keywords = 5
+        except (ValueError, TypeError):
+            num_keywords = 5
+            
+        result = call_service(analyze_text, text, analyses, num_sentences, num_keywords, use_cache=use_cache)
+        
+        return jsonify({
+            "status": "success",
+            "message": "Text analysis completed successfully",
+            "data": result
+        })
+    except PoolBusy as e:
+        # Too many CPU-bound requests already queued in this worker
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 503, {"Retry-After": str(math.ceil(e.retry_after))}
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Error processing request: {str(e)}"
+        }), 500
+
+# Endpoints that can run as jobs or in bulk, by service name
+SERVICE_ENDPOINTS = {
+    'analyze_sentiment': '/api/analyze_sentiment',
+    'summarize': '/api/summarize',
+    'extract_keywords': '/api/extract_keywords',
+    'enhance_content': '/api/enhance_content',
+    'translate': '/api/translate',
+    'analyze': '/api/analyze',
+}
+
+def run_endpoint(service, body, headers=None):
+    """
+    Answer a request to the endpoint of a service without going through HTTP.
+    
+    Jobs and the bulk processing script use it, so their requests are
+    validated and answered exactly like direct ones. They are not counted
+    in the request metrics and logs, nor profiled.
+    
+    Args:
+        service (str): A key of SERVICE_ENDPOINTS
+        body (dict): The JSON body of the request
+        headers (dict, optional): Request headers, such as Cache-Control
+        
+    Returns:
+        tuple: (status_code, body) of the response
+    """
+    with app.test_request_context(SERVICE_ENDPOINTS[service], method='POST', json=body, headers=headers or {},
+                                  environ_base={INTERNAL_DISPATCH: True}):
+        response = app.full_dispatch_request()
+    return response.status_code, response.get_json()
+
+@app.route('/api/jobs', methods=['POST'])
+def api_create_job():
+    try:
+        from services.jobs import JobQueueFull
+        
+        request_data = request.get_json()
+        if not request_data or 'service' not in request_data:
+            return jsonify({
+                "status": "error",
+                "message": "Missing required parameter: service"
+            }), 400
+            
+        service = request_data['service']
+        is_valid, error_message = validate_option('service', service, tuple(SERVICE_ENDPOINTS))
+        if not is_valid:
+            return jsonify({
+                "status": "error",
+                "message": error_message
+            }), 400
+        
+        # The job sends the rest of the body to the service's endpoint, so
+        # it is validated and answered exactly like a direct request
+        body = {name: value for name, value in request_data.items() if name != 'service'}
+        headers = {}
+        if 'Cache-Control' in request.headers:
+            headers['Cache-Control'] = request.headers['Cache-Control']
+        
+        try:
+            job_id = resources.get_job_queue(run_endpoint).submit(service, body, headers)
+        except JobQueueFull as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 503, {"Retry-After": "5"}
+        
+        location = f"/api/jobs/{job_id}"
+        return jsonify({
+            "status": "success",
+            "message": "Job submitted successfully",
+            "data": {"id": job_id, "service": service, "state": "queued", "url": location}
+        }), 202, {"Location": location}
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Error processing request: {str(e)}"
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    try:
+        job = resources.get_job_queue(run_endpoint).get(job_id)
+        if job is None:
+            return jsonify({
+                "status": "error",
+                "message": "Job not found or expired"
+            }), 404
+            
+        return jsonify({
+            "status": "success",
+            "message": "Job retrieved successfully",
+            "data": job
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Error processing request: {str(e)}"
+        }), 500
+
+@app.route('/api/jobs/stats', methods=['GET'])
+def api_job_stats():
+    return jsonify({
+        "status": "success",
+        "message": "Job statistics retrieved successfully",
+        "data": resources.get_job_queue(run_endpoint).stats()
+    })
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # The process is up if we get here; "warm" tells whether the models are
+    # loaded. Readiness probes can pass ?ready=1 to get a 503 until they are;
+    # with LAZY_STARTUP, the first probe starts loading them.
+    status = resources.status()
+    if request.args.get('ready') and not status["warm"]:
+        return jsonify({
+            "status": "error",
+            "message": "Models are not loaded yet",
+            "data": status
+        }), 503
+        
+    return jsonify({
+        "status": "success",
+        "message": "Service is up",
+        "data": status
+    })
+
+@app.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    return jsonify({
+        "status": "success",
+        "message": "Cache statistics retrieved successfully",
+        "data": result_cache.stats()
+    })
+
+@app.route('/api/translate/stats', methods=['GET'])
+def api_translate_stats():
+    from services.translator import translation_stats
+    
+    return jsonify({
+        "status": "success",
+        "message": "Translation statistics retrieved successfully",
+        "data": translation_stats()
+    })
+
+@app.route('/api/pool/stats', methods=['GET'])
+def api_pool_stats():
+    return jsonify({
+        "status": "success",
+        "message": "CPU pool statistics retrieved successfully",
+        "data": resources.get_cpu_pool().stats()
+    })
+
+@app.route('/api/logs/stats', methods=['GET'])
+def api_log_stats():
+    return jsonify({
+        "status": "success",
+        "message": "Request log statistics retrieved successfully",
+        "data": request_logger.stats()
+    })
+
+@app.route('/api/profiles', methods=['GET'])
+def api_profiles():
+    # Only for the requests allowed to ask for profiles
+    if not request_profiler.is_authorized(request.headers):
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    return jsonify({
+        "status": "success",
+        "message": "Profiles retrieved successfully",
+        "data": request_profiler.store.latest()
+    })
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def api_get_profile(profile_id):
+    report = request_profiler.store.get(profile_id) if request_profiler.is_authorized(request.headers) else None
+    if report is None:
+        return jsonify({"status": "error", "message": "Profile not found"}), 404
+    return jsonify({
+        "status": "success",
+        "message": "Profile retrieved successfully",
+        "data": report
+    })
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Prometheus text format, added up over every worker of the server
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Run the app
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
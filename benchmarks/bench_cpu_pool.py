@@ -0,0 +1,114 @@
+"""
+Benchmark of the CPU pool.
+
+Runs long summarizations in background threads, like concurrent
+/api/summarize requests on a gunicorn worker, and times short sentiment
+analyses made meanwhile from another thread, first with the summaries
+in the request threads, then in a CPU pool. Also reports how long the
+summaries took, which the pool runs in parallel.
+
+Usage:
+    python -m benchmarks.bench_cpu_pool [--workers N] [--summaries N] [--words N] [--algorithm NAME]
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.bench_sentiment import make_corpus
+from services import resources
+from services.sentiment_analyzer import analyze_sentiment
+from services.text_summarizer import summarize_text
+
+
+def make_text(words, seed=0):
+    # Sentences of random words from a large vocabulary, so the summarizers
+    # have as much work as on real text
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+                  for _ in range(5000)]
+    sentences = []
+    for _ in range(words // 15):
+        sentence = " ".join(rng.choice(vocabulary) for _ in range(15))
+        sentences.append(sentence.capitalize() + ".")
+    return " ".join(sentences)
+
+
+def use_pool(workers):
+    # A new pool for every configuration, started before it is timed
+    config.CPU_POOL_SIZE = workers
+    config.CPU_POOL_QUEUE_SIZE = 64
+    previous = resources._resources.pop('cpu_pool', None)
+    if previous is not None:
+        previous.shutdown()
+    pool = resources.get_cpu_pool()
+    pool.start()
+    return pool
+
+
+def run(workers, summaries, algorithm, text, short_texts):
+    pool = use_pool(workers)
+    summary_times = []
+
+    def summarize():
+        start = time.perf_counter()
+        summarize_text(text, 3, algorithm, use_cache=False)
+        summary_times.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=summarize) for _ in range(summaries)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    index = 0
+    while any(thread.is_alive() for thread in threads):
+        # Timed from when the call is due, so the time spent waiting for the
+        # GIL after the pause counts
+        due = time.perf_counter() + 0.005
+        time.sleep(0.005)
+        analyze_sentiment(short_texts[index % len(short_texts)], use_cache=False)
+        latencies.append((time.perf_counter() - due) * 1000)
+        index += 1
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"  pool workers {workers}: {summaries} summaries in {wall:.2f}s "
+          f"(mean {statistics.mean(summary_times):.2f}s each), "
+          f"{len(latencies)} sentiment calls meanwhile, "
+          f"p50 {latencies[len(latencies) // 2]:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.2f} ms, max {latencies[-1]:.2f} ms")
+    return pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2, help='processes of the CPU pool (default: %(default)s)')
+    parser.add_argument('--summaries', type=int, default=2, help='concurrent summaries (default: %(default)s)')
+    parser.add_argument('--words', type=int, default=15000, help='words per summarized text (default: %(default)s)')
+    parser.add_argument('--algorithm', default='lexrank', help='summarization algorithm (default: %(default)s)')
+    args = parser.parse_args()
+
+    resources.warm_up()
+    text = make_text(args.words)
+    short_texts = make_corpus(50)
+    print(f"Summarizing {args.summaries} x {len(text)} characters with {args.algorithm} "
+          f"while analyzing the sentiment of short texts")
+
+    run(0, args.summaries, args.algorithm, text, short_texts)
+    pool = run(args.workers, args.summaries, args.algorithm, text, short_texts)
+    print(f"  pool stats: {pool.stats()}")
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
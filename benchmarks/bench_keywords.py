@@ -0,0 +1,83 @@
+"""
+Benchmark of keyword extraction with the treebank and fast tokenizers.
+
+Times uncached extract_keywords calls on a generated text of the given
+size with NLTK's treebank tokenizer (the default), the regex fast path,
+and the fast path with keyphrases, and reports how many of the top
+keywords the fast path shares with the treebank one.
+
+Usage:
+    python -m benchmarks.bench_keywords [--words N] [--iterations N]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import resources
+from services.keyword_extractor import extract_keywords
+
+SENTENCES = [
+    "The result cache keeps summaries of long documents for an hour.",
+    "Gunicorn workers share the on-disk cache, so a summary is computed once.",
+    "Keyword extraction doesn't need sentence boundaries, only words.",
+    "Translation requests are the slowest because they call a remote service.",
+    "State-of-the-art summarizers rank sentences by their latent concepts.",
+    "Each worker loads the NLTK models once, before the first request.",
+]
+
+
+def make_text(words):
+    rng = random.Random(0)
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = rng.choice(SENTENCES)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return " ".join(sentences)
+
+
+def measure(function, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--words', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    resources.warm_up()
+    text = make_text(args.words)
+
+    cases = [
+        ("treebank", dict(tokenizer="treebank")),
+        ("fast", dict(tokenizer="fast")),
+        ("fast + keyphrases", dict(tokenizer="fast", keyphrases=True)),
+    ]
+    print(f"{len(text.split())} words, median of {args.iterations} runs")
+    timings = {}
+    for name, options in cases:
+        timings[name] = measure(lambda: extract_keywords(text, 10, use_cache=False, **options), args.iterations)
+        print(f"  {name:<20} {timings[name]:10.1f} ms")
+    print(f"  fast path speedup    {timings['treebank'] / timings['fast']:10.1f} x")
+
+    treebank = extract_keywords(text, 10, use_cache=False)["keywords"]
+    fast = extract_keywords(text, 10, tokenizer="fast", keyphrases=True, use_cache=False)
+    shared = len(set(treebank) & set(fast["keywords"]))
+    print(f"  top-10 keywords shared with treebank: {shared}/10")
+    print(f"  keyphrases: {', '.join(fast['keyphrases'])}")
+
+
+if __name__ == '__main__':
+    main()
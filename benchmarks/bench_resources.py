@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of the per-request setup removed by services.resources.
+
+Compares building the NLTK/sumy resources on every request, as the services
+used to do, with fetching them from the process-wide registry, and reports
+the end-to-end time of uncached summarize/keyword calls.
+
+Usage:
+    python -m benchmarks.bench_resources [--iterations N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nltk
+from nltk.corpus import stopwords
+from sumy.nlp.stemmers import Stemmer
+from sumy.nlp.tokenizers import Tokenizer
+from sumy.summarizers.lsa import LsaSummarizer
+from sumy.utils import get_stop_words
+
+from services import resources
+from services.keyword_extractor import extract_keywords
+from services.text_summarizer import summarize_text
+
+SAMPLE_TEXT = (
+    "Natural language processing studies how computers read human language. "
+    "Summaries help readers decide what to read in full. "
+    "Keyword extraction finds the terms that matter most in a document. "
+    "Sentiment analysis measures the tone of reviews and support tickets. "
+    "Translation makes the same content available in other languages. "
+) * 4
+
+
+def per_request_setup():
+    """The setup every request used to perform."""
+    for resource in ('tokenizers/punkt', 'corpora/stopwords'):
+        nltk.data.find(resource)
+    set(stopwords.words('english'))
+    Tokenizer("english")
+    summarizer = LsaSummarizer(Stemmer("english"))
+    summarizer.stop_words = get_stop_words("english")
+
+
+def registry_setup():
+    """The same resources, fetched from the registry."""
+    resources.ensure_nltk_data()
+    resources.get_stop_words()
+    resources.get_sumy_tokenizer()
+    resources.get_lsa_summarizer()
+
+
+def time_per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    resources.warm_up()
+    warm_up_ms = (time.perf_counter() - start) * 1000
+
+    before = time_per_call(per_request_setup, args.iterations)
+    after = time_per_call(registry_setup, args.iterations)
+
+    print(f"warm_up (once per process): {warm_up_ms:10.1f} ms")
+    print(f"per-request setup, before:  {before:10.1f} us")
+    print(f"per-request setup, after:   {after:10.1f} us")
+    print(f"saved per request:          {before - after:10.1f} us")
+
+    for name, func in (
+        ("summarize_text", lambda: summarize_text(SAMPLE_TEXT, 3, use_cache=False)),
+        ("extract_keywords", lambda: extract_keywords(SAMPLE_TEXT, 5, use_cache=False)),
+    ):
+        print(f"{name + ' (uncached):':28}{time_per_call(func, args.iterations):10.1f} us")
+
+
+if __name__ == '__main__':
+    main()
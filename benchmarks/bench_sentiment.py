@@ -0,0 +1,116 @@
+"""
+Benchmark of the lexicon sentiment engine against TextBlob.
+
+Scores a generated corpus of short reviews with both engines and reports
+the largest polarity and subjectivity differences and how many texts
+differ by more than the tolerance, then times uncached analyze_sentiment
+calls on a long text and on a batch with each engine.
+
+Usage:
+    python -m benchmarks.bench_sentiment [--texts N] [--words N] [--iterations N] [--tolerance X]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textblob import TextBlob
+
+from services import resources
+from services.sentiment_analyzer import analyze_sentiment, analyze_sentiment_batch
+
+OPENINGS = ["The", "This", "Our", "My", "Their"]
+SUBJECTS = ["hotel", "service", "movie", "food", "support team", "update", "battery"]
+ADVERBS = ["", "", "very ", "really ", "extremely ", "slightly ", "not ", "never ", "not very "]
+ADJECTIVES = ["good", "bad", "great", "terrible", "slow", "friendly", "boring", "amazing",
+              "disappointing", "helpful", "cheap", "perfect", "awful", "nice", "ordinary"]
+ENDINGS = [".", ".", "!", "!!", "?", " :)", " :(", "...", " (!)"]
+
+
+def make_sentence(rng):
+    adjectives = " and ".join(rng.choice(ADVERBS) + rng.choice(ADJECTIVES) for _ in range(rng.randint(1, 2)))
+    verb = rng.choice(["was", "is", "wasn't", "seemed", "felt"])
+    return f"{rng.choice(OPENINGS)} {rng.choice(SUBJECTS)} {verb} {adjectives}{rng.choice(ENDINGS)}"
+
+
+def make_corpus(texts, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(make_sentence(rng) for _ in range(rng.randint(1, 4))) for _ in range(texts)]
+
+
+def make_text(words, seed=1):
+    rng = random.Random(seed)
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = make_sentence(rng)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return " ".join(sentences)
+
+
+def measure(function, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def compare(corpus, tolerance):
+    polarity_diff = subjectivity_diff = 0.0
+    mismatches = 0
+    for text in corpus:
+        expected = TextBlob(text).sentiment
+        result = analyze_sentiment(text, engine="lexicon", use_cache=False)
+        diff = (abs(result["polarity"] - expected.polarity), abs(result["subjectivity"] - expected.subjectivity))
+        polarity_diff = max(polarity_diff, diff[0])
+        subjectivity_diff = max(subjectivity_diff, diff[1])
+        mismatches += max(diff) > tolerance
+    return polarity_diff, subjectivity_diff, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--texts', type=int, default=2000, help='size of the comparison corpus and of the batch')
+    parser.add_argument('--words', type=int, default=100000, help='size of the long text')
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    resources.warm_up()
+    corpus = make_corpus(args.texts)
+
+    polarity_diff, subjectivity_diff, mismatches = compare(corpus, args.tolerance)
+    print(f"Agreement with TextBlob on {len(corpus)} texts")
+    print(f"  max polarity difference      {polarity_diff:.3g}")
+    print(f"  max subjectivity difference  {subjectivity_diff:.3g}")
+    print(f"  texts beyond {args.tolerance:g}         {mismatches} ({mismatches / len(corpus):.2%})")
+
+    text = make_text(args.words)
+    cases = [
+        (f"long text, {len(text.split())} words", lambda engine, sentences: analyze_sentiment(
+            text, engine, sentences, use_cache=False)),
+        (f"batch of {len(corpus)} texts", lambda engine, sentences: analyze_sentiment_batch(
+            corpus, engine, sentences, use_cache=False)),
+    ]
+    print(f"Median of {args.iterations} runs")
+    for name, run in cases:
+        print(f"  {name}")
+        for sentences in (False, True):
+            timings = {
+                engine: measure(lambda: run(engine, sentences), args.iterations)
+                for engine in ("textblob", "lexicon")
+            }
+            label = "per sentence" if sentences else "document"
+            print(f"    {label:<13} textblob {timings['textblob']:9.1f} ms  lexicon {timings['lexicon']:8.1f} ms"
+                  f"  ({timings['textblob'] / timings['lexicon']:.1f} x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Startup-time benchmark for app.py.
+
+Starts fresh interpreters that import the app, in eager (models warmed at
+import) and lazy (LAZY_STARTUP=1) mode, and reports the median import time
+and the latency of the first request in each mode. With --max-lazy-ms the
+script exits non-zero when lazy startup gets slower than the budget, so it
+can guard against startup regressions in CI.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs N] [--max-lazy-ms MS]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: times the import of the app and its first
+# summarize request, and prints both as JSON
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.post('/api/summarize', json={'text': 'Startup probe. It measures the first request.', 'use_cache': False})
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': (done - imported) * 1000}))
+"""
+
+
+def measure(lazy, runs):
+    env = dict(os.environ, LAZY_STARTUP='1' if lazy else '0', NLTK_DOWNLOAD='0', PYTHONPATH=ROOT)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ('import_ms', 'first_request_ms')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-lazy-ms', type=float, default=None,
+                        help='fail if the lazy import takes longer than this')
+    args = parser.parse_args()
+
+    results = {
+        'eager': measure(False, args.runs),
+        'lazy': measure(True, args.runs),
+    }
+    for mode, timings in results.items():
+        print(f"{mode:6} import: {timings['import_ms']:8.1f} ms   "
+              f"first request: {timings['first_request_ms']:8.1f} ms")
+
+    if args.max_lazy_ms is not None and results['lazy']['import_ms'] > args.max_lazy_ms:
+        print(f"lazy startup exceeded the {args.max_lazy_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark of chunked translation against the offline fake backend.
+
+Translates a generated text many times the provider's per-call limit with
+FakeBackend, which answers after a fixed delay and fails at random.
+Checks that every call is within the limit and that the translation
+reassembles the text in order, and compares the elapsed time with the
+time the same calls would take one after the other. Then translates the
+text again, which should be served from the translation memory, and sends
+the same new text from many threads at once, which should make a single
+upstream call.
+
+Usage:
+    python -m benchmarks.bench_translate [--chars N] [--latency-ms X] [--failure-rate X] [--workers N] [--concurrent N]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from services import resources, translator
+from services.translation_backends import TRANSLATION_BACKENDS, FakeBackend
+
+SUBJECTS = ["The quarterly report", "Our team", "The new warehouse", "Every customer", "The setup guide",
+            "The support desk", "This release", "The board"]
+VERBS = ["needs", "reviewed", "improved", "asked for", "mentions", "replaced", "delayed", "approved"]
+OBJECTS = ["the shipping times", "a clearer manual", "the budget", "two new chapters", "the translation",
+           "the original order", "our suppliers", "the last survey"]
+
+
+class RecordingBackend(FakeBackend):
+    """FakeBackend remembering the texts it was asked to translate."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.chunks = []
+
+    def _translate(self, text, source, target):
+        self.chunks.append(text)
+        return super()._translate(text, source, target)
+
+
+def make_sentence(rng):
+    return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)} in week {rng.randint(1, 52)}."
+
+
+def make_text(chars, seed=0):
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < chars:
+        paragraph = " ".join(make_sentence(rng) for _ in range(rng.randint(2, 8)))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def translate(text):
+    return translator.translate_text(text, 'en', 'de', use_cache=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chars', type=int, default=200000)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=config.TRANSLATE_MAX_WORKERS)
+    parser.add_argument('--concurrent', type=int, default=20, help='identical requests sent at once')
+    args = parser.parse_args()
+
+    fake = RecordingBackend(latency_ms=args.latency_ms, failure_rate=args.failure_rate, seed=0)
+    TRANSLATION_BACKENDS['recording'] = lambda: fake
+    config.TRANSLATE_BACKEND = 'recording'
+    config.TRANSLATE_MAX_WORKERS = args.workers
+    config.TRANSLATE_RETRY_DELAY_MS = 0
+    resources.warm_up()
+
+    text = make_text(args.chars)
+    start = time.perf_counter()
+    result = translate(text)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    restored = re.sub(r"\[de\] ", "", result["translated_text"])
+    stats = translator.translation_stats()["upstream"]
+    largest = max(map(len, fake.chunks))
+    sequential = stats["calls"] * args.latency_ms
+    print(f"{len(text)} characters, {result['segments']} segments in {len(set(fake.chunks))} chunks, "
+          f"{args.workers} workers")
+    print(f"  calls                 {stats['calls']} ({stats['errors']} failed and retried)")
+    print(f"  upstream latency      p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms")
+    print(f"  largest chunk         {largest} characters (limit {fake.max_chars})")
+    print(f"  text reassembled      {'yes' if restored == text else 'NO'}")
+    print(f"  elapsed               {elapsed:10.1f} ms")
+    print(f"  one call at a time    {sequential:10.1f} ms ({sequential / elapsed:.1f} x)")
+    failed = restored != text or largest > fake.max_chars
+
+    calls = stats["calls"]
+    again = translate(text)
+    new_calls = translator.translation_stats()["upstream"]["calls"] - calls
+    print(f"Same text again: {again['segments_from_memory']}/{again['segments']} segments from memory, "
+          f"{new_calls} calls")
+    failed |= again["translated_text"] != result["translated_text"] or new_calls > 0
+
+    fake.failure_rate = 0
+    calls = translator.translation_stats()["upstream"]["calls"]
+    shared = make_text(2000, seed=1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(translate(shared))) for _ in range(args.concurrent)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    new_calls = translator.translation_stats()["upstream"]["calls"] - calls
+    print(f"{args.concurrent} concurrent identical requests: {new_calls} calls, "
+          f"{sum(1 for result in results if result['segments_from_memory'] == result['segments'])} "
+          f"served entirely by the other calls")
+    failed |= len({result["translated_text"] for result in results}) != 1 or new_calls > 1
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
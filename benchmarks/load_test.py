@@ -0,0 +1,314 @@
+"""
+Load test replaying a JSONL request log against the app.
+
+Every line is a request in the format of the jobs and of
+scripts/bulk_process.py, {"service": "summarize", "text": "...", ...},
+or names the route itself, {"method": "POST", "path": "/api/summarize",
+"body": {...}}. The requests are replayed in a loop, in-process through
+the Flask test client by default, which runs like one gunicorn worker
+with as many threads, or against a running server with --url.
+
+The load is run in stages of increasing concurrency (closed loop: each
+client sends its next request when it gets an answer) or, with --rates,
+of increasing arrival rates (open loop: requests are sent on schedule
+whether or not the earlier ones were answered, and their latency counts
+from when they were due, queueing included). For every stage and
+endpoint it reports the throughput, the p50/p95/p99 latencies and the
+error rate, then the saturation point: the last stage before the
+throughput stopped growing, the p99 exceeded --slo-ms or the error rate
+exceeded --max-error-rate.
+
+Repeated requests are answered from the result cache, as they would be
+in production; --no-cache sends "Cache-Control: no-cache" to time every
+request in full. Run with TRANSLATE_BACKEND=fake to replay translations
+offline.
+
+Usage:
+    python -m benchmarks.load_test REQUESTS.jsonl [--url URL] [--no-cache] [--concurrency 1,2,4,8] [--rates R,...]
+                                   [--duration S] [--slo-ms X] [--max-error-rate X] [--output RESULTS.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Requests on a stage may still be running when it ends: they are waited
+# for at most this long
+DRAIN_TIMEOUT = 60.0
+
+
+def load_requests(path):
+    """
+    Read the requests of a JSONL log.
+
+    Returns:
+        list: (method, path, body) of every valid line
+    """
+    from app import SERVICE_ENDPOINTS
+
+    requests = []
+    with open(path, encoding='utf-8') as lines:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping line {line_number}: invalid JSON", file=sys.stderr)
+                continue
+            if not isinstance(record, dict):
+                print(f"Skipping line {line_number}: not an object", file=sys.stderr)
+            elif "path" in record:
+                requests.append((record.get("method", "POST").upper(), record["path"], record.get("body")))
+            elif record.get("service") in SERVICE_ENDPOINTS:
+                body = {name: value for name, value in record.items() if name not in ("service", "id")}
+                requests.append(("POST", SERVICE_ENDPOINTS[record["service"]], body))
+            else:
+                print(f"Skipping line {line_number}: no 'path' nor known 'service'", file=sys.stderr)
+    return requests
+
+
+class TestClientTarget:
+    """Sends the requests to the app in this process through its test client."""
+
+    def __init__(self, headers=None):
+        from api.utils.logger import request_logger
+        from app import app
+        # Requests are logged as in production, but not among the report
+        request_logger.stream = open(os.devnull, 'w')
+        self.app = app
+        self.headers = headers or {}
+        self._local = threading.local()
+
+    def send(self, method, path, body):
+        # A client per thread, as they keep cookies and context between calls
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client.open(path, method=method, json=body, headers=self.headers).status_code
+
+
+class HttpTarget:
+    """Sends the requests to a running server."""
+
+    def __init__(self, url, headers=None, timeout=60.0):
+        self.url = url.rstrip('/')
+        self.headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        self.timeout = timeout
+
+    def send(self, method, path, body):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method, headers=self.headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+class Recorder:
+    """Collects the latency and status of the answers of a stage by endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, path, latency_ms, status):
+        with self._lock:
+            self.samples.setdefault(path, []).append((latency_ms, status))
+
+
+def _send(target, recorder, request, due):
+    method, path, body = request
+    try:
+        status = target.send(method, path, body)
+    except Exception:
+        # Timeouts and refused connections
+        status = None
+    recorder.record(path, (time.perf_counter() - due) * 1000, status)
+
+
+def run_closed(target, requests, concurrency, duration, offset):
+    """Run concurrency clients sending requests back to back for duration seconds."""
+    recorder = Recorder()
+    lock = threading.Lock()
+    position = offset
+    end = time.perf_counter() + duration
+
+    def client():
+        nonlocal position
+        while time.perf_counter() < end:
+            with lock:
+                request = requests[position % len(requests)]
+                position += 1
+            _send(target, recorder, request, time.perf_counter())
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + DRAIN_TIMEOUT)
+    return recorder, time.perf_counter() - start, position
+
+
+def run_open(target, requests, rate, duration, offset, max_in_flight):
+    """Send rate requests per second for duration seconds, answered by up to max_in_flight threads."""
+    recorder = Recorder()
+    interval = 1.0 / rate
+    count = max(1, int(rate * duration))
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    for number in range(count):
+        due = start + number * interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # Latency counts from when the request was due, so the time spent
+        # waiting for a free thread when the app falls behind is included
+        executor.submit(_send, target, recorder, requests[(offset + number) % len(requests)], due)
+    executor.shutdown(wait=True)
+    return recorder, time.perf_counter() - start, offset + count
+
+
+def _percentile(samples, percent):
+    return samples[min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))]
+
+
+def summarize(samples, elapsed):
+    """Throughput, latency percentiles and errors of (latency_ms, status) samples."""
+    latencies = sorted(latency for latency, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(1 for _, status in samples if status is None or status >= 400)
+    return {
+        "requests": len(samples),
+        "throughput": round(len(samples) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+        "error_rate": round(errors / len(samples), 4),
+        "statuses": statuses,
+    }
+
+
+def stage_label(mode, load):
+    return f"{load:g} req/s" if mode == "rate" else f"{load} clients"
+
+
+def saturation_point(stages, key, slo_ms, max_error_rate, min_gain=0.1):
+    """
+    Find the highest stage the app sustains.
+
+    A stage is past saturation when it has more errors than
+    max_error_rate, a p99 above slo_ms or, in closed loop, less than
+    min_gain more throughput than the previous stage. In open loop, the
+    app is also saturated when it answers fewer requests per second than
+    sent, by more than min_gain.
+
+    Returns:
+        tuple: (the last sustained stage or None, the reason the next one
+            isn't, None if every stage is sustained)
+    """
+    sustained = None
+    previous = None
+    for stage in stages:
+        result = stage["endpoints"].get(key) if key else stage["total"]
+        if result is None:
+            continue
+        if result["error_rate"] > max_error_rate:
+            return sustained, f"error rate {result['error_rate']:.1%} at {stage_label(stage['mode'], stage['load'])}"
+        if slo_ms is not None and result["p99_ms"] > slo_ms:
+            return sustained, f"p99 {result['p99_ms']:.0f} ms at {stage_label(stage['mode'], stage['load'])}"
+        if (stage["mode"] == "concurrency" and previous is not None
+                and result["throughput"] < previous["throughput"] * (1 + min_gain)):
+            return sustained, f"throughput flat at {stage_label(stage['mode'], stage['load'])}"
+        # Every endpoint waits in the same queue when the app falls behind
+        if stage["mode"] == "rate" and stage["total"]["throughput"] < stage["load"] * (1 - min_gain):
+            return sustained, f"falling behind at {stage_label(stage['mode'], stage['load'])}"
+        sustained = stage["load"]
+        previous = result
+    return sustained, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('requests', help='JSONL request log')
+    parser.add_argument('--url', help='base URL of a running server (default: the app in this process)')
+    parser.add_argument('--no-cache', action='store_true', help='bypass the result cache of the app')
+    parser.add_argument('--concurrency', default='1,2,4,8',
+                        help='concurrent clients of the stages (default: %(default)s)')
+    parser.add_argument('--rates', help='requests per second of the stages, for an open-loop test instead')
+    parser.add_argument('--max-in-flight', type=int, default=64,
+                        help='most requests in flight in open loop (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per stage (default: %(default)s)')
+    parser.add_argument('--slo-ms', type=float, help='p99 latency beyond which a stage is saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='error rate beyond which a stage is saturated (default: %(default)s)')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    args = parser.parse_args()
+
+    requests = load_requests(args.requests)
+    if not requests:
+        sys.exit(f"No requests to replay in {args.requests}")
+    headers = {"Cache-Control": "no-cache"} if args.no_cache else {}
+    target = HttpTarget(args.url, headers) if args.url else TestClientTarget(headers)
+    if args.rates:
+        mode, loads = "rate", [float(rate) for rate in args.rates.split(",")]
+    else:
+        mode, loads = "concurrency", [int(clients) for clients in args.concurrency.split(",")]
+
+    print(f"Replaying {len(requests)} requests against {args.url or 'the app in this process'}, "
+          f"{args.duration:g}s per stage")
+    stages = []
+    offset = 0
+    for load in loads:
+        if mode == "rate":
+            recorder, elapsed, offset = run_open(target, requests, load, args.duration, offset, args.max_in_flight)
+        else:
+            recorder, elapsed, offset = run_closed(target, requests, load, args.duration, offset)
+        samples = [sample for path_samples in recorder.samples.values() for sample in path_samples]
+        if not samples:
+            continue
+        stage = {
+            "mode": mode,
+            "load": load,
+            "total": summarize(samples, elapsed),
+            "endpoints": {path: summarize(path_samples, elapsed)
+                          for path, path_samples in sorted(recorder.samples.items())},
+        }
+        stages.append(stage)
+
+        print(f"\n{stage_label(mode, load)}:")
+        for path, result in [("total", stage["total"])] + list(stage["endpoints"].items()):
+            print(f"  {path:<26} {result['requests']:>6} requests {result['throughput']:>8.1f}/s  "
+                  f"p50 {result['p50_ms']:>9.1f} ms  p95 {result['p95_ms']:>9.1f} ms  "
+                  f"p99 {result['p99_ms']:>9.1f} ms  errors {result['error_rate']:>6.1%}")
+
+    saturation = {}
+    print("\nSaturation point:")
+    for key in [None] + sorted({path for stage in stages for path in stage["endpoints"]}):
+        sustained, reason = saturation_point(stages, key, args.slo_ms, args.max_error_rate)
+        saturation[key or "total"] = {"sustained": sustained, "limited_by": reason}
+        print(f"  {key or 'total':<26} sustains "
+              f"{stage_label(mode, sustained) if sustained is not None else 'no stage'}"
+              f"{f' ({reason})' if reason else ', not reached'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as results_file:
+            json.dump({"stages": stages, "saturation": saturation}, results_file, indent=2)
+        print(f"Wrote the results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
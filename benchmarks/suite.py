@@ -0,0 +1,301 @@
+"""
+Benchmark suite of every service and route over document sizes.
+
+"run" times analyze_sentiment, summarize_text, extract_keywords,
+enhance_content and translate_text, called directly and through the Flask
+routes, on synthetic English documents from 100 bytes to several
+megabytes, with the result cache bypassed and the offline translation
+backend. For every case and size it records the latency percentiles, the
+throughput and the peak memory allocated (measured on a separate run, as
+tracemalloc slows the code down) in a JSON results file.
+
+"compare" reports the changes of a results file against a baseline and
+exits with status 1 if a case got slower or used more memory than the
+thresholds allow.
+
+Usage:
+    python -m benchmarks.suite run RESULTS.json [--sizes 100B,1KB,...] [--cases NAME,...] [--min-time S]
+    python -m benchmarks.suite compare BASELINE.json RESULTS.json [--threshold X] [--memory-threshold X]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline translations, and no CPU pool: the suite measures the services
+os.environ['TRANSLATE_BACKEND'] = 'fake'
+os.environ['CPU_POOL_SIZE'] = '0'
+
+DEFAULT_SIZES = "100B,1KB,10KB,100KB,1MB,4MB"
+
+SUBJECTS = ["the customer", "our team", "the new model", "this library", "the city council", "the market",
+            "the research group", "every user", "the support desk", "the release", "the museum", "the pilot"]
+VERBS = ["improved", "delayed", "praised", "criticized", "analyzed", "expanded", "reviewed", "measured",
+         "replaced", "announced", "tested", "described"]
+ADJECTIVES = ["good", "slow", "reliable", "terrible", "helpful", "expensive", "excellent", "confusing",
+              "remarkable", "disappointing", "careful", "efficient"]
+OBJECTS = ["the quarterly report", "a translation service", "the summary", "the search results",
+           "the training data", "a public dataset", "the annual budget", "the user interface",
+           "the delivery schedule", "a regional office", "the documentation", "the benchmark"]
+CLAUSES = ["after a long discussion", "despite the weather", "during the spring", "for the first time",
+           "with great care", "in several countries", "before the deadline", "without any warning"]
+
+
+def make_document(size, seed=0):
+    """
+    A synthetic English document of about size bytes.
+
+    Sentences are built from a few word lists plus generated names and
+    numbers, so the vocabulary keeps growing with the document like real
+    text, and are grouped into paragraphs.
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    sentences = []
+    length = 0
+    while length < size:
+        name = "".join(rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou") for _ in range(rng.randint(2, 4)))
+        sentence = (f"{rng.choice(SUBJECTS).capitalize()} {rng.choice(VERBS)} {rng.choice(OBJECTS)} "
+                    f"of {name.capitalize()} {rng.choice(CLAUSES)}, and it was {rng.choice(ADJECTIVES)} "
+                    f"in {rng.randint(2, 98)} cases{rng.choice(['.', '.', '.', '!', '?'])}")
+        sentences.append(sentence)
+        length += len(sentence) + 1
+        if len(sentences) >= rng.randint(3, 8):
+            paragraphs.append(" ".join(sentences))
+            sentences = []
+            length += 1
+    if sentences:
+        paragraphs.append(" ".join(sentences))
+    return "\n".join(paragraphs)[:max(size, 1)]
+
+
+def parse_size(label):
+    units = {"B": 1, "KB": 1024, "MB": 1024 * 1024}
+    for unit in ("KB", "MB", "B"):
+        if label.upper().endswith(unit):
+            return int(float(label[:-len(unit)]) * units[unit])
+    return int(label)
+
+
+def build_cases():
+    """
+    The benchmarked cases: name -> (function of a text, largest size).
+
+    Some algorithms don't scale to every size: standard summarization
+    builds a dense matrix of the whole document, so larger documents use
+    the hierarchical mode, as recommended for them, which itself takes
+    minutes beyond a megabyte.
+    """
+    from api.utils.logger import request_logger
+    from app import app
+    from services.content_enhancer import enhance_content
+    from services.keyword_extractor import extract_keywords
+    from services.sentiment_analyzer import analyze_sentiment
+    from services.text_summarizer import summarize_text
+    from services.translation_memory import translation_memory
+    from services.translator import translate_text
+
+    # The routes log every request as in production, but not among the results
+    request_logger.stream = open(os.devnull, 'w')
+    client = app.test_client()
+
+    def translate(text):
+        # Every call translates the whole text again
+        translation_memory.clear()
+        return translate_text(text, 'en', 'de', use_cache=False)
+
+    def route(path, **params):
+        def call(text):
+            translation_memory.clear()
+            response = client.post(path, json=dict(params, text=text, use_cache=False))
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} answered {response.status_code}: {response.get_json()}")
+            return response
+        return call
+
+    mb = 1024 * 1024
+    return {
+        "analyze_sentiment": (lambda text: analyze_sentiment(text, use_cache=False), None),
+        "analyze_sentiment_lexicon": (lambda text: analyze_sentiment(text, engine="lexicon", use_cache=False), None),
+        "summarize": (lambda text: summarize_text(text, 3, "lsa", use_cache=False), 100 * 1024),
+        "summarize_hierarchical": (lambda text: summarize_text(text, 3, "lsa", "hierarchical", use_cache=False), mb),
+        "extract_keywords": (lambda text: extract_keywords(text, 5, use_cache=False), None),
+        "extract_keywords_fast": (lambda text: extract_keywords(text, 5, tokenizer="fast", use_cache=False), None),
+        "enhance_content": (lambda text: enhance_content(text, use_cache=False), None),
+        "translate_text": (translate, None),
+        "route_analyze_sentiment": (route('/api/analyze_sentiment'), mb),
+        "route_summarize": (route('/api/summarize'), 100 * 1024),
+        "route_extract_keywords": (route('/api/extract_keywords'), mb),
+        "route_enhance_content": (route('/api/enhance_content'), mb),
+        "route_translate": (route('/api/translate', from_lang='en', to_lang='de'), mb),
+        "route_analyze": (route('/api/analyze'), 100 * 1024),
+    }
+
+
+def measure(function, text, min_time, max_iterations):
+    """Time calls until min_time seconds or max_iterations calls have passed."""
+    from services.memory import track_peak_memory
+
+    # The first call warms up the caches of the libraries and the lazy
+    # imports; it is only kept when it alone lasted longer than min_time,
+    # where the warm-up is negligible and another call too long to wait for
+    start = time.perf_counter()
+    function(text)
+    first_ms = (time.perf_counter() - start) * 1000
+    if first_ms > min_time * 1000:
+        samples = [first_ms]
+    else:
+        samples = []
+        start = time.perf_counter()
+        while len(samples) < max_iterations and (time.perf_counter() - start < min_time or len(samples) < 3):
+            call_start = time.perf_counter()
+            function(text)
+            samples.append((time.perf_counter() - call_start) * 1000)
+
+    with track_peak_memory() as memory:
+        function(text)
+
+    samples.sort()
+    mean_ms = sum(samples) / len(samples)
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(mean_ms, 3),
+        "min_ms": round(samples[0], 3),
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "p99_ms": round(_percentile(samples, 99), 3),
+        "max_ms": round(samples[-1], 3),
+        "docs_per_sec": round(1000 / mean_ms, 3) if mean_ms else None,
+        "mb_per_sec": round(len(text.encode('utf-8')) / (1024 * 1024) / (mean_ms / 1000), 3) if mean_ms else None,
+        "peak_memory_bytes": memory.peak_bytes,
+    }
+
+
+def _percentile(samples, percent):
+    return samples[min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    sizes = [(label, parse_size(label)) for label in args.sizes.split(",")]
+    cases = build_cases()
+    selected = args.cases.split(",") if args.cases else list(cases)
+    unknown = [name for name in selected if name not in cases]
+    if unknown:
+        sys.exit(f"Unknown cases: {', '.join(unknown)}. Available: {', '.join(cases)}")
+
+    documents = {label: make_document(size) for label, size in sizes}
+    results = {}
+    for name in selected:
+        function, max_size = cases[name]
+        for label, size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            key = f"{name}@{label}"
+            results[key] = measure(function, documents[label], args.min_time, args.max_iterations)
+            result = results[key]
+            print(f"{key:<36} p50 {result['p50_ms']:>10.2f} ms  p95 {result['p95_ms']:>10.2f} ms  "
+                  f"{result['docs_per_sec']:>9.2f} docs/s  peak {result['peak_memory_bytes'] / 1024:>9.0f} KiB",
+                  flush=True)
+
+    output = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "min_time": args.min_time,
+        },
+        "results": results,
+    }
+    with open(args.results, "w", encoding="utf-8") as results_file:
+        json.dump(output, results_file, indent=2, sort_keys=True)
+    print(f"Wrote {len(results)} results to {args.results}")
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.results, encoding="utf-8") as results_file:
+        current = json.load(results_file)
+
+    regressions = []
+    print(f"{'case':<36} {'baseline p50':>14} {'p50':>12} {'change':>8} {'peak change':>12}")
+    for key in sorted(set(baseline["results"]) & set(current["results"])):
+        before = baseline["results"][key]
+        after = current["results"][key]
+        change = after["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        memory_change = (after["peak_memory_bytes"] / before["peak_memory_bytes"] - 1
+                         if before["peak_memory_bytes"] else 0.0)
+
+        flags = []
+        # Differences below the noise floor are never regressions
+        if change > args.threshold and after["p50_ms"] - before["p50_ms"] > args.min_ms:
+            flags.append("SLOWER")
+        if memory_change > args.memory_threshold and after["peak_memory_bytes"] - before["peak_memory_bytes"] > args.min_bytes:
+            flags.append("MORE MEMORY")
+        if flags:
+            regressions.append(key)
+        print(f"{key:<36} {before['p50_ms']:>11.2f} ms {after['p50_ms']:>9.2f} ms {change:>+8.1%} "
+              f"{memory_change:>+12.1%}  {' '.join(flags)}")
+
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"Not in the results: {', '.join(missing)}")
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {args.threshold:.0%} slower "
+              f"or {args.memory_threshold:.0%} more memory")
+        sys.exit(1)
+    print("No regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_command = commands.add_parser('run', help='run the benchmarks and save the results')
+    run_command.add_argument('results', help='JSON file to write the results to')
+    run_command.add_argument('--sizes', default=DEFAULT_SIZES, help='document sizes (default: %(default)s)')
+    run_command.add_argument('--cases', help='comma-separated cases to run (default: all)')
+    run_command.add_argument('--min-time', type=float, default=1.0,
+                             help='seconds spent timing each case and size (default: %(default)s)')
+    run_command.add_argument('--max-iterations', type=int, default=200,
+                             help='most calls timed per case and size (default: %(default)s)')
+    run_command.set_defaults(handler=run)
+
+    compare_command = commands.add_parser('compare', help='compare results with a baseline')
+    compare_command.add_argument('baseline', help='results of the reference version')
+    compare_command.add_argument('results', help='results of the version under test')
+    compare_command.add_argument('--threshold', type=float, default=0.15,
+                                 help='largest tolerated p50 slowdown (default: %(default)s)')
+    compare_command.add_argument('--memory-threshold', type=float, default=0.25,
+                                 help='largest tolerated peak memory increase (default: %(default)s)')
+    compare_command.add_argument('--min-ms', type=float, default=0.5,
+                                 help='p50 increases below this are noise (default: %(default)s)')
+    compare_command.add_argument('--min-bytes', type=int, default=64 * 1024,
+                                 help='peak memory increases below this are noise (default: %(default)s)')
+    compare_command.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
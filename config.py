@@ -0,0 +1,177 @@
+import os
+import tempfile
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+# Result cache
+RESULT_CACHE_ENABLED = _env_bool('RESULT_CACHE_ENABLED', True)
+RESULT_CACHE_MAX_ENTRIES = _env_int('RESULT_CACHE_MAX_ENTRIES', 2048)
+RESULT_CACHE_MAX_BYTES = _env_int('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+
+# Time-to-live of cached results per service, in seconds
+RESULT_CACHE_TTLS = {
+    'analyze_sentiment': _env_int('RESULT_CACHE_TTL_SENTIMENT', 3600),
+    'summarize': _env_int('RESULT_CACHE_TTL_SUMMARIZE', 3600),
+    'extract_keywords': _env_int('RESULT_CACHE_TTL_KEYWORDS', 3600),
+    'enhance_content': _env_int('RESULT_CACHE_TTL_ENHANCE', 300),
+    'translate': _env_int('RESULT_CACHE_TTL_TRANSLATE', 86400),
+}
+
+# On-disk result cache shared by all gunicorn workers, disabled unless a
+# directory is configured
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR') or None
+RESULT_CACHE_DISK_MAX_BYTES = _env_int('RESULT_CACHE_DISK_MAX_BYTES', 256 * 1024 * 1024)
+RESULT_CACHE_DISK_COMPACTION_INTERVAL = _env_int('RESULT_CACHE_DISK_COMPACTION_INTERVAL', 300)
+RESULT_CACHE_DISK_SERVICES = ('summarize', 'extract_keywords', 'translate')
+
+# Startup. With LAZY_STARTUP the heavy NLP libraries are imported and the
+# models loaded on the first request that needs them instead of at import.
+LAZY_STARTUP = _env_bool('LAZY_STARTUP', False)
+
+# NLTK data is looked up in NLTK_DATA_DIR first. It is downloaded there by
+# the build (see the README); set NLTK_DOWNLOAD=true to also download
+# missing packages at runtime, which blocks startup on the network.
+NLTK_DATA_DIR = os.environ.get(
+    'NLTK_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+)
+NLTK_DOWNLOAD = _env_bool('NLTK_DOWNLOAD', False)
+
+# Number of LSA concepts kept by the sparse LSA summarizer on documents
+# too large to rank exactly
+SPARSE_LSA_DIMENSIONS = _env_int('SPARSE_LSA_DIMENSIONS', 50)
+
+# Size of the chunks the hierarchical summarization mode works on
+SUMMARY_CHUNK_CHARS = _env_int('SUMMARY_CHUNK_CHARS', 20000)
+
+# Whether hierarchical summaries report the peak memory they allocated,
+# measured with tracemalloc at a large cost in speed: for debugging and
+# benchmarks only
+SUMMARY_MEASURE_MEMORY = _env_bool('SUMMARY_MEASURE_MEMORY', False)
+
+# Latency budget of the "auto" summarization algorithm when the request
+# doesn't give one, in milliseconds
+SUMMARY_LATENCY_BUDGET_MS = _env_int('SUMMARY_LATENCY_BUDGET_MS', 1000)
+
+# IDF index used by TF-IDF keyword extraction, built with
+# python -m scripts.idf_index build
+KEYWORD_IDF_INDEX = os.environ.get('KEYWORD_IDF_INDEX') or None
+
+# Translation backend: "google" (Google Translate's web endpoint) or
+# "fake", an offline stand-in for development and benchmarks
+TRANSLATE_BACKEND = os.environ.get('TRANSLATE_BACKEND', 'google')
+
+# Timeouts of every call to the translation provider, in seconds, and the
+# number of keep-alive connections kept open to it per process
+TRANSLATE_CONNECT_TIMEOUT = _env_float('TRANSLATE_CONNECT_TIMEOUT', 3.05)
+TRANSLATE_READ_TIMEOUT = _env_float('TRANSLATE_READ_TIMEOUT', 10)
+TRANSLATE_POOL_SIZE = _env_int('TRANSLATE_POOL_SIZE', 10)
+
+# Circuit breaker of the translation provider: when at least
+# TRANSLATE_BREAKER_MIN_CALLS calls were made in the last
+# TRANSLATE_BREAKER_WINDOW seconds and TRANSLATE_BREAKER_ERROR_RATE of them
+# failed, translations fail fast for TRANSLATE_BREAKER_COOLDOWN seconds,
+# then a single call probes whether the provider is back
+TRANSLATE_BREAKER_ERROR_RATE = _env_float('TRANSLATE_BREAKER_ERROR_RATE', 0.5)
+TRANSLATE_BREAKER_MIN_CALLS = _env_int('TRANSLATE_BREAKER_MIN_CALLS', 10)
+TRANSLATE_BREAKER_WINDOW = _env_float('TRANSLATE_BREAKER_WINDOW', 30)
+TRANSLATE_BREAKER_COOLDOWN = _env_float('TRANSLATE_BREAKER_COOLDOWN', 15)
+
+# Send a call to the translation provider a second time when it takes
+# longer than this percentile of the recent calls (for instance 95), and
+# use whichever answers first. 0 disables hedging.
+TRANSLATE_HEDGE_PERCENTILE = _env_float('TRANSLATE_HEDGE_PERCENTILE', 0)
+
+# Texts longer than TRANSLATE_CHUNK_CHARS are split into sentence-aligned
+# chunks (the provider rejects more than 5000 characters per call), which
+# are translated concurrently by up to TRANSLATE_MAX_WORKERS threads shared
+# by all requests. A failed chunk is retried TRANSLATE_RETRIES times, after
+# TRANSLATE_RETRY_DELAY_MS milliseconds doubling at every attempt.
+TRANSLATE_CHUNK_CHARS = _env_int('TRANSLATE_CHUNK_CHARS', 4500)
+TRANSLATE_MAX_WORKERS = _env_int('TRANSLATE_MAX_WORKERS', 4)
+TRANSLATE_RETRIES = _env_int('TRANSLATE_RETRIES', 2)
+TRANSLATE_RETRY_DELAY_MS = _env_int('TRANSLATE_RETRY_DELAY_MS', 250)
+
+# Number of translated sentences kept per process for the (source, target)
+# language pairs, so repeated sentences are translated once. 0 disables it.
+TRANSLATION_MEMORY_SIZE = _env_int('TRANSLATION_MEMORY_SIZE', 50000)
+
+# Texts to translate from "auto" are identified locally first, from their
+# first LANGUAGE_DETECTION_MAX_CHARS characters. A text detected in the
+# target language with at least LANGUAGE_DETECTION_MIN_CONFIDENCE is
+# returned untranslated instead of being sent to the provider.
+LANGUAGE_DETECTION_MIN_CONFIDENCE = _env_float('LANGUAGE_DETECTION_MIN_CONFIDENCE', 0.9)
+LANGUAGE_DETECTION_MAX_CHARS = _env_int('LANGUAGE_DETECTION_MAX_CHARS', 2000)
+
+# Summarization, keyword extraction and combined analyses of texts of at
+# least CPU_POOL_MIN_CHARS characters run in a pool of CPU_POOL_SIZE
+# processes per worker instead of the request thread, so they don't hold
+# the GIL against the other requests. At most CPU_POOL_QUEUE_SIZE of them
+# wait for a free process, further ones are answered 503. 0 disables the
+# pool. CPU_POOL_START_METHOD is the multiprocessing start method, the
+# platform's default ("fork" on Linux) if unset.
+CPU_POOL_SIZE = _env_int('CPU_POOL_SIZE', 0)
+CPU_POOL_QUEUE_SIZE = _env_int('CPU_POOL_QUEUE_SIZE', 8)
+CPU_POOL_MIN_CHARS = _env_int('CPU_POOL_MIN_CHARS', 2000)
+CPU_POOL_START_METHOD = os.environ.get('CPU_POOL_START_METHOD') or None
+
+# Jobs submitted to /api/jobs run on JOB_WORKERS threads per worker, with
+# at most JOB_QUEUE_SIZE of them pending. Their state and results are kept
+# for JOB_RESULT_TTL seconds in a SQLite file shared by all the workers.
+# A worker renews the lease of its jobs while it runs; the jobs of a worker
+# that stopped are run again by another one JOB_LEASE_SECONDS later.
+JOB_WORKERS = _env_int('JOB_WORKERS', 2)
+JOB_QUEUE_SIZE = _env_int('JOB_QUEUE_SIZE', 100)
+JOB_RESULT_TTL = _env_int('JOB_RESULT_TTL', 3600)
+JOB_LEASE_SECONDS = _env_float('JOB_LEASE_SECONDS', 30.0)
+JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH') or os.path.join(tempfile.gettempdir(), 'text_analysis_jobs.sqlite3')
+
+# Request and stage metrics served by /metrics. Every process writes its
+# counts to METRICS_DIR, if set, and /metrics adds up those of all the
+# processes; gunicorn.conf.py sets one, emptied when the server starts
+# and stops.
+METRICS_ENABLED = _env_bool('METRICS_ENABLED', True)
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = _env_float('METRICS_FLUSH_INTERVAL', 1.0)
+
+# Request logs are JSON lines written to stdout by a background thread, in
+# batches of up to REQUEST_LOG_BATCH_SIZE. Beyond REQUEST_LOG_QUEUE_SIZE
+# waiting records, new ones are dropped and counted rather than slow the
+# requests down. Only a REQUEST_LOG_SAMPLE_RATE share of the successful
+# requests is logged; errors always are. Serverless deployments, frozen
+# between requests, may set REQUEST_LOG_ASYNC=false to write in the request.
+REQUEST_LOG_ENABLED = _env_bool('REQUEST_LOG_ENABLED', True)
+REQUEST_LOG_ASYNC = _env_bool('REQUEST_LOG_ASYNC', True)
+REQUEST_LOG_QUEUE_SIZE = _env_int('REQUEST_LOG_QUEUE_SIZE', 10000)
+REQUEST_LOG_BATCH_SIZE = _env_int('REQUEST_LOG_BATCH_SIZE', 256)
+REQUEST_LOG_SAMPLE_RATE = _env_float('REQUEST_LOG_SAMPLE_RATE', 1.0)
+
+# Profiling of individual requests. With PROFILING_ENABLED and a
+# PROFILING_TOKEN (profiling stays off without one), a request with an
+# "X-Profile" header set to the token gets the profile of its service call
+# in the response. One in PROFILING_SAMPLE_EVERY
+# requests per route is profiled as well (0 to sample none). The reports of
+# both are kept in PROFILING_DIR, the latest PROFILING_MAX_ENTRIES of them.
+PROFILING_ENABLED = _env_bool('PROFILING_ENABLED', False)
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN') or None
+PROFILING_SAMPLE_EVERY = _env_int('PROFILING_SAMPLE_EVERY', 0)
+PROFILING_SAMPLE_MEMORY = _env_bool('PROFILING_SAMPLE_MEMORY', False)
+PROFILING_TOP = _env_int('PROFILING_TOP', 25)
+PROFILING_DIR = os.environ.get('PROFILING_DIR') or os.path.join(tempfile.gettempdir(), 'text_analysis_profiles')
+PROFILING_MAX_ENTRIES = _env_int('PROFILING_MAX_ENTRIES', 200)
@@ -0,0 +1,38 @@
+"""
+gunicorn settings, loaded automatically from the working directory.
+
+The command line (Procfile, railway.toml) still sets the workers and
+threads; this only adds hooks.
+"""
+import os
+import tempfile
+
+# Read before the app is loaded: the workers write their metrics to this
+# directory, emptied when the server starts and stops so /metrics adds up
+# those of this server's workers only. Servers sharing a machine need a
+# METRICS_DIR each.
+if not os.environ.get('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = os.path.join(tempfile.gettempdir(), 'text_analysis_metrics')
+
+
+def on_starting(server):
+    # Snapshots left by a server that was killed before on_exit
+    from services.metrics import metrics
+    metrics.clear()
+
+
+def on_exit(server):
+    from services.metrics import metrics
+    metrics.clear()
+
+
+def post_fork(server, worker):
+    # Start the CPU pool of the worker before it starts its request threads,
+    # so its processes are forked from a single-threaded process with the
+    # models loaded by --preload
+    import config
+
+    if config.CPU_POOL_SIZE > 0:
+        from services.resources import get_cpu_pool
+        get_cpu_pool().start()
+        server.log.info("Worker %s started %s CPU pool processes", worker.pid, config.CPU_POOL_SIZE)
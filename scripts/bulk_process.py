@@ -0,0 +1,192 @@
+"""
+Process a JSONL file of requests offline, without going through HTTP.
+
+Every line is a JSON object naming the "service" (analyze_sentiment,
+summarize, extract_keywords, enhance_content, translate or analyze) with
+the body its endpoint takes, like the jobs of POST /api/jobs, for
+instance {"service": "summarize", "text": "...", "num_sentences": 2}. An
+optional "id" is copied to the result.
+
+The requests are answered by the endpoints' own code on a pool of worker
+processes, and the results written as JSONL in input order, one line per
+request, with the status code and body the endpoint would have answered.
+At most --window requests are read ahead of the last one written, so
+memory stays bounded whatever the size of the input. Throughput and
+per-service timings are printed to stderr at the end, from a fixed-size
+summary per service rather than every latency.
+
+Usage:
+    python -m scripts.bulk_process INPUT.jsonl OUTPUT.jsonl [--workers N] [--window N]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+# The worker processes are the parallelism: no CPU pool inside them. The
+# results are the output, not request logs
+config.CPU_POOL_SIZE = 0
+config.REQUEST_LOG_ENABLED = False
+
+
+class TimingSummary:
+    """
+    Count, mean, maximum and approximate percentiles of latencies in fixed memory.
+
+    Latencies are counted in buckets growing geometrically by resolution,
+    so a percentile is off by at most that share of its value, however
+    many latencies were added.
+    """
+
+    def __init__(self, resolution=0.02, floor_ms=0.01):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._growth = math.log1p(resolution)
+        self._floor_ms = floor_ms
+        self._buckets = {}
+
+    def add(self, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        bucket = max(0, math.ceil(math.log(max(elapsed_ms, self._floor_ms) / self._floor_ms) / self._growth))
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def mean(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile, at most the maximum."""
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(self.max_ms, self._floor_ms * math.exp(bucket * self._growth))
+        return self.max_ms
+
+
+def process_line(line_number, line):
+    """
+    Answer the request on one line of the input.
+
+    Returns:
+        tuple: (service, result, elapsed_ms), service being None when the
+            line is not a valid request
+    """
+    from app import SERVICE_ENDPOINTS, run_endpoint
+
+    start = time.perf_counter()
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None, {"line": line_number, "status_code": 400, "body": {"status": "error", "message": "Invalid JSON"}}, 0.0
+
+    service = record.get("service") if isinstance(record, dict) else None
+    result = {"line": line_number}
+    if isinstance(record, dict) and "id" in record:
+        result["id"] = record["id"]
+    if service not in SERVICE_ENDPOINTS:
+        result.update(status_code=400, body={
+            "status": "error",
+            "message": f"'service' must be one of: {', '.join(SERVICE_ENDPOINTS)}"
+        })
+        return None, result, 0.0
+
+    body = {name: value for name, value in record.items() if name not in ("service", "id")}
+    try:
+        status_code, response = run_endpoint(service, body)
+    except Exception as e:
+        status_code, response = 500, {"status": "error", "message": f"Error processing request: {str(e)}"}
+    result.update(service=service, status_code=status_code, body=response)
+    return service, result, (time.perf_counter() - start) * 1000
+
+
+def read_lines(path):
+    """Yield (line_number, line) for the non-empty lines of a file."""
+    with open(path, encoding='utf-8') as lines:
+        for line_number, line in enumerate(lines, 1):
+            if line.strip():
+                yield line_number, line
+
+
+def run(input_path, output, workers, window):
+    """
+    Process the input on workers processes and write the results in order.
+
+    Returns:
+        tuple: (service -> TimingSummary of the elapsed times of its
+            requests, count of processed requests, count of failed ones)
+    """
+    timings = {}
+    processed = failed = 0
+
+    def write(future):
+        nonlocal processed, failed
+        service, result, elapsed_ms = future.result()
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        processed += 1
+        if not 200 <= result["status_code"] < 300:
+            failed += 1
+        if service is not None:
+            if service not in timings:
+                timings[service] = TimingSummary()
+            timings[service].add(elapsed_ms)
+
+    # Forked from this process, the workers share the models loaded here
+    import app  # noqa: F401
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for line_number, line in read_lines(input_path):
+            if len(pending) >= window:
+                write(pending.popleft())
+            pending.append(executor.submit(process_line, line_number, line))
+        while pending:
+            write(pending.popleft())
+    return timings, processed, failed
+
+
+def report(timings, processed, failed, elapsed):
+    print(f"Processed {processed} requests ({failed} failed) in {elapsed:.2f}s: "
+          f"{processed / elapsed if elapsed else 0:.1f} docs/sec", file=sys.stderr)
+    for service, summary in sorted(timings.items()):
+        print(f"  {service:<18} {summary.count:>7} requests  "
+              f"mean {summary.mean():8.2f} ms  "
+              f"p50 {summary.percentile(50):8.2f} ms  "
+              f"p95 {summary.percentile(95):8.2f} ms  "
+              f"max {summary.max_ms:8.2f} ms", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='JSONL file, one request per line')
+    parser.add_argument('output', help="JSONL file of the results, '-' for stdout")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: the number of CPUs, %(default)s)')
+    parser.add_argument('--window', type=int, default=None,
+                        help='requests in flight at most (default: 8 per worker)')
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    window = max(workers, args.window or 8 * workers)
+    start = time.perf_counter()
+    if args.output == '-':
+        timings, processed, failed = run(args.input, sys.stdout, workers, window)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            timings, processed, failed = run(args.input, output, workers, window)
+    report(timings, processed, failed, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Build or update the IDF index used by TF-IDF keyword extraction.
+
+Reads a JSONL corpus, one JSON object per line, and counts the documents
+each term occurs in. The text of a document is the concatenation of the
+given fields, or of all its string fields when none are given. "build"
+writes a new index next to the target and atomically replaces it, and
+running workers map the new one on their next request; "update"
+folds the documents into an existing index in place, where running workers
+see them immediately. Terms are split by the tokenizer given to "build",
+which is recorded in the index and used by "update"; TF-IDF keyword
+requests must use the same one.
+
+Usage:
+    python -m scripts.idf_index build CORPUS.jsonl INDEX [--field NAME ...] [--buckets N] [--tokenizer NAME]
+    python -m scripts.idf_index update CORPUS.jsonl INDEX [--field NAME ...]
+    python -m scripts.idf_index stats INDEX
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.idf_index import DEFAULT_BUCKETS, IdfIndex, create_index_file
+from services.keyword_extractor import KEYWORD_TOKENIZERS, index_terms
+
+
+def read_documents(path, fields):
+    """Yield the text of every document of a JSONL corpus."""
+    with open(path, encoding='utf-8') as corpus:
+        for line_number, line in enumerate(corpus, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"{path}:{line_number}: skipping invalid JSON", file=sys.stderr)
+                continue
+            if isinstance(record, str):
+                yield record
+                continue
+            if not isinstance(record, dict):
+                continue
+            names = fields or [name for name, value in record.items() if isinstance(value, str)]
+            yield "\n".join(record[name] for name in names if isinstance(record.get(name), str))
+
+
+def add_corpus(index, corpus, fields):
+    return index.add_documents(index_terms(text, index.tokenizer) for text in read_documents(corpus, fields))
+
+
+def build(args):
+    temporary = args.index + '.tmp'
+    create_index_file(temporary, args.buckets, args.tokenizer)
+    added = add_corpus(IdfIndex(temporary, writable=True), args.corpus, args.field)
+    os.replace(temporary, args.index)
+    print(f"Indexed {added} documents into {args.index}")
+
+
+def update(args):
+    added = add_corpus(IdfIndex(args.index, writable=True), args.corpus, args.field)
+    print(f"Added {added} documents to {args.index}")
+
+
+def stats(args):
+    print(json.dumps(IdfIndex(args.index).stats(), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for name, handler in (('build', build), ('update', update)):
+        command = commands.add_parser(name)
+        command.add_argument('corpus', help='JSONL file, one document per line')
+        command.add_argument('index', help='path of the index file')
+        command.add_argument('--field', action='append',
+                             help='field holding the text (repeatable, default: all string fields)')
+        if name == 'build':
+            command.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS,
+                                 help='number of hashed counters (default: %(default)s)')
+            command.add_argument('--tokenizer', choices=KEYWORD_TOKENIZERS, default='treebank',
+                                 help='word tokenizer of the keyword requests (default: %(default)s)')
+        command.set_defaults(handler=handler)
+
+    command = commands.add_parser('stats')
+    command.add_argument('index', help='path of the index file')
+    command.set_defaults(handler=stats)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
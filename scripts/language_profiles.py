@@ -0,0 +1,134 @@
+"""
+Build the character n-gram profiles of the offline language detector.
+
+A profile holds the log-probabilities of the most frequent character
+n-grams of a language. Without a corpus, the profiles are built from word
+lists that are already installed: sumy's stopword lists, which are the
+most frequent words of each language, and, if pycountry is installed, its
+translations of country, language and currency names. Pass JSONL corpora
+with "language" and "text" fields to build them from real text instead.
+
+Only the languages written in the Latin script need a profile: the others
+are told apart by their script.
+
+Usage:
+    python -m scripts.language_profiles OUTPUT [CORPUS.jsonl ...] [--top N]
+"""
+import argparse
+import gettext
+import glob
+import json
+import math
+import os
+import sys
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.language_detector import NGRAM_SIZES, iter_ngrams
+
+# Languages with a profile, and their sumy stopword list and pycountry locale
+LANGUAGES = {
+    'en': ('english', None),
+    'de': ('german', 'de'),
+    'es': ('spanish', 'es'),
+    'fr': ('french', 'fr'),
+    'it': ('italian', 'it'),
+    'pt': ('portuguese', 'pt'),
+}
+
+# The stopwords are a small share of the word lists but most of the words
+# of a real text
+STOPWORD_WEIGHT = 30
+
+PYCOUNTRY_DOMAINS = ('iso3166-1', 'iso639-3', 'iso4217')
+
+
+def installed_texts(code):
+    """Yield (text, weight) pairs from the word lists installed for a language."""
+    import sumy
+
+    stopwords, locale = LANGUAGES[code]
+    path = os.path.join(os.path.dirname(sumy.__file__), 'data', 'stopwords', stopwords + '.txt')
+    with open(path, encoding='utf-8') as words:
+        for word in words:
+            if word.strip():
+                yield word.strip(), STOPWORD_WEIGHT
+
+    try:
+        import pycountry
+    except ImportError:
+        return
+    base = os.path.dirname(pycountry.__file__)
+    for domain in PYCOUNTRY_DOMAINS:
+        if locale is None:
+            # English is the language of the untranslated names
+            path = glob.glob(os.path.join(base, 'locales', 'de', 'LC_MESSAGES', domain + '.mo'))
+            names = (key for key in _catalog(path) if isinstance(key, str))
+        else:
+            path = glob.glob(os.path.join(base, 'locales', locale, 'LC_MESSAGES', domain + '.mo'))
+            names = (value for key, value in _catalog(path).items() if key and value != key)
+        for name in names:
+            if name:
+                yield name, 1
+
+
+def _catalog(paths):
+    if not paths:
+        return {}
+    with open(paths[0], 'rb') as mo:
+        return gettext.GNUTranslations(mo)._catalog
+
+
+def corpus_texts(paths):
+    """Yield (language, text) pairs from JSONL corpora."""
+    for path in paths:
+        with open(path, encoding='utf-8') as corpus:
+            for line in corpus:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if isinstance(record.get('text'), str) and record.get('language'):
+                    yield record['language'], record['text']
+
+
+def build_profile(weighted_texts, top):
+    counts = Counter()
+    for text, weight in weighted_texts:
+        for ngram in iter_ngrams(text):
+            counts[ngram] += weight
+
+    total = sum(counts.values())
+    kept = dict(counts.most_common(top))
+    # Add-one smoothing over the kept n-grams, and the same probability mass
+    # as the least frequent of them for anything unseen
+    denominator = total + len(kept)
+    return {
+        "unseen": round(math.log(1 / denominator), 3),
+        "ngrams": {ngram: round(math.log((count + 1) / denominator), 3) for ngram, count in kept.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help='path of the JSON profiles')
+    parser.add_argument('corpus', nargs='*', help='JSONL files with "language" and "text" fields')
+    parser.add_argument('--top', type=int, default=1000, help='n-grams kept per language (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.corpus:
+        texts = {}
+        for language, text in corpus_texts(args.corpus):
+            texts.setdefault(language, []).append((text, 1))
+    else:
+        texts = {code: list(installed_texts(code)) for code in LANGUAGES}
+
+    profiles = {code: build_profile(weighted, args.top) for code, weighted in sorted(texts.items())}
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump({"ngram_sizes": list(NGRAM_SIZES), "profiles": profiles}, output,
+                  ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    print(f"Wrote the profiles of {', '.join(profiles)} to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
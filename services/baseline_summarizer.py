@@ -0,0 +1,56 @@
+from collections import Counter
+
+from sumy.summarizers._summarizer import AbstractSummarizer
+
+
+class BaselineSummarizer(AbstractSummarizer):
+    """
+    Cheap summarizer rating sentences by word frequency and position.
+
+    A sentence is rated by the mean document frequency of its content words,
+    scaled to [0, 1], plus a bonus for being near the start of its paragraph.
+    It makes two passes over the words, so it is linear in the size of the
+    text and meant as the fallback when the other algorithms are too slow.
+    """
+
+    # Bonus of the first sentence of a paragraph, halved for the second, ...
+    POSITION_WEIGHT = 0.5
+
+    def __init__(self, stemmer, stop_words=()):
+        super(BaselineSummarizer, self).__init__(stemmer)
+        self.stop_words = stop_words
+
+    @property
+    def stop_words(self):
+        return self._stop_words
+
+    @stop_words.setter
+    def stop_words(self, words):
+        self._stop_words = frozenset(map(self.normalize_word, words))
+
+    def __call__(self, document, sentences_count):
+        stop_words = self._stop_words
+        sentence_stems = []
+        frequencies = Counter()
+        for paragraph in document.paragraphs:
+            for position, sentence in enumerate(paragraph.sentences):
+                stems = [
+                    self.stem_word(word) for word in sentence.words
+                    if self.normalize_word(word) not in stop_words
+                ]
+                frequencies.update(stems)
+                sentence_stems.append((position, stems))
+
+        if not frequencies:
+            return ()
+
+        max_frequency = max(frequencies.values())
+        ratings = []
+        for position, stems in sentence_stems:
+            rating = self.POSITION_WEIGHT / (1 + position)
+            if stems:
+                rating += sum(frequencies[stem] for stem in stems) / (len(stems) * max_frequency)
+            ratings.append(rating)
+
+        ratings = iter(ratings)
+        return self._get_best_sentences(document.sentences, sentences_count, lambda s: next(ratings))
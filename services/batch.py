@@ -0,0 +1,50 @@
+def run_batch(process, texts):
+    """
+    Run a single-text processing function over a batch of texts.
+
+    Items are processed independently: an invalid text or a failure while
+    processing one item is reported in that item's result and does not stop
+    the rest of the batch.
+
+    Args:
+        process (callable): Function taking one text and returning its result
+        texts (list): The texts to process
+
+    Returns:
+        dict: Per-item results in input order and success/failure counts
+    """
+    results = []
+    failed = 0
+
+    for index, text in enumerate(texts):
+        if not isinstance(text, str):
+            error_message = "'text' must be a string"
+        elif not text.strip():
+            error_message = "'text' cannot be empty"
+        else:
+            error_message = None
+
+        if error_message is None:
+            try:
+                results.append({
+                    "index": index,
+                    "status": "success",
+                    "data": process(text)
+                })
+                continue
+            except Exception as e:
+                error_message = f"Error processing text: {str(e)}"
+
+        failed += 1
+        results.append({
+            "index": index,
+            "status": "error",
+            "message": error_message
+        })
+
+    return {
+        "results": results,
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed
+    }
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from services.disk_cache import DiskCache
+
+
+class ResultCache:
+    """
+    In-process, content-addressed cache of service results.
+
+    Entries are keyed by a hash of (service, text, parameters) and stored
+    as JSON strings, so callers always get a fresh copy and the size of the
+    cache can be bounded in bytes as well as in entries. The least recently
+    used entries are evicted first and every service has its own TTL.
+
+    An optional DiskCache can be layered underneath for selected services:
+    memory misses fall through to it and new results are written to both.
+    """
+
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024, ttls=None, default_ttl=3600,
+                 disk=None, disk_services=()):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.disk = disk
+        self.disk_services = frozenset(disk_services)
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    @staticmethod
+    def make_key(service, text, params=None):
+        """
+        Build the cache key for a service call.
+
+        The text is hashed as-is: normalizing whitespace would change the
+        lengths reported in the results.
+        """
+        payload = json.dumps([service, text, params or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, service, key):
+        """Return the cached result for a key, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                self._remove(key)
+                entry = None
+
+            counters = self._service_counters(service)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                counters["hits"] += 1
+                return json.loads(entry[0])
+
+        serialized = None
+        if self.disk is not None and service in self.disk_services:
+            serialized = self.disk.get(key)
+
+        with self._lock:
+            counters = self._service_counters(service)
+            if serialized is None:
+                counters["misses"] += 1
+                return None
+            counters["hits"] += 1
+            counters["disk_hits"] += 1
+
+        self._store(service, key, serialized)
+        return json.loads(serialized)
+
+    def set(self, service, key, value):
+        """Store a result, evicting least recently used entries if needed."""
+        serialized = json.dumps(value)
+        if self.disk is not None and service in self.disk_services:
+            self.disk.set(key, service, serialized, self.ttls.get(service, self.default_ttl))
+        self._store(service, key, serialized)
+
+    def _store(self, service, key, serialized):
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + self.ttls.get(service, self.default_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (serialized, expires_at, service)
+            self._size += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._size > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                evicted_service = self._entries[oldest_key][2]
+                self._remove(oldest_key)
+                self._service_counters(evicted_service)["evictions"] += 1
+
+    def get_or_compute(self, service, text, params, compute, use_cache=True):
+        """
+        Return the cached result of a service call, computing it on a miss.
+
+        Args:
+            service (str): Name of the service
+            text (str): The text the service is applied to
+            params (dict): Parameters that change the result
+            compute (callable): Produces the result when it is not cached
+            use_cache (bool): Set to False to bypass the cache entirely
+
+        Returns:
+            any: The (possibly cached) result of compute()
+        """
+        if not use_cache or not config.RESULT_CACHE_ENABLED:
+            return compute()
+
+        key = self.make_key(service, text, params)
+        result = self.get(service, key)
+        if result is None:
+            result = compute()
+            self.set(service, key, result)
+        return result
+
+    def stats(self):
+        """Return entry counts, size and per-service hit/miss counters."""
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "services": {
+                    service: dict(counters)
+                    for service, counters in self._counters.items()
+                }
+            }
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+    def clear(self):
+        """Drop every cached entry, on disk as well."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def _remove(self, key):
+        serialized = self._entries.pop(key)[0]
+        self._size -= len(serialized)
+
+    def _service_counters(self, service):
+        counters = self._counters.get(service)
+        if counters is None:
+            counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+            self._counters[service] = counters
+        return counters
+
+
+def _create_disk_cache():
+    if not config.RESULT_CACHE_DIR:
+        return None
+    return DiskCache(
+        config.RESULT_CACHE_DIR,
+        max_bytes=config.RESULT_CACHE_DISK_MAX_BYTES,
+        compaction_interval=config.RESULT_CACHE_DISK_COMPACTION_INTERVAL
+    )
+
+
+# Cache shared by every service in this process, backed by the disk cache
+# shared by every worker when RESULT_CACHE_DIR is set
+result_cache = ResultCache(
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=config.RESULT_CACHE_MAX_BYTES,
+    ttls=config.RESULT_CACHE_TTLS,
+    disk=_create_disk_cache(),
+    disk_services=config.RESULT_CACHE_DISK_SERVICES
+)
@@ -0,0 +1,72 @@
+from services.resources import get_sumy_tokenizer
+
+# Don't cut a chunk at a paragraph break in its first half, it would leave
+# a lot of small chunks behind
+MIN_FILL = 0.5
+
+
+def iter_chunks(text, max_chars):
+    """
+    Split a text into chunks of at most max_chars, lazily.
+
+    Chunks end at the last paragraph break of the window if there is one
+    in its second half, otherwise at the start of its last sentence, so
+    sentences are never split unless a single one is longer than max_chars.
+    Only one window is tokenized at a time, whatever the size of the text.
+
+    Args:
+        text (str): The text to split
+        max_chars (int): Maximum number of characters per chunk
+
+    Yields:
+        str: The non-blank chunks, in order
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + max_chars
+        if end >= length:
+            chunk = text[start:]
+            if chunk.strip():
+                yield chunk
+            return
+
+        window = text[start:end]
+        cut = _find_cut(window)
+        chunk = window[:cut]
+        if chunk.strip():
+            yield chunk
+        start += cut
+
+
+def _find_cut(window):
+    minimum = int(len(window) * MIN_FILL)
+
+    cut = window.rfind("\n\n")
+    if cut >= minimum:
+        return cut + 2
+
+    # The last sentence of the window is probably incomplete, leave it for
+    # the next chunk
+    spans = list(sentence_spans(window))
+    if len(spans) > 1:
+        return spans[-1][0]
+
+    # A single sentence longer than the window: cut between words
+    cut = window.rfind(" ")
+    if cut > 0:
+        return cut + 1
+    return len(window)
+
+
+def sentence_spans(text):
+    """
+    The (start, end) offsets of the sentences of a text.
+
+    Args:
+        text (str): The text to split
+
+    Returns:
+        iterator: The spans, in order, from sumy's punkt sentence tokenizer
+    """
+    return get_sumy_tokenizer()._sentence_tokenizer.span_tokenize(text)
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Fails calls to a degraded dependency fast instead of waiting on it.
+
+    The breaker is closed while the dependency is healthy. When at least
+    min_calls calls were made in the last window seconds and the share of
+    failures among them reaches error_rate, it opens: calls are rejected
+    without being made for cooldown seconds. It then goes half-open and
+    lets a single probe call through, which closes it again if it succeeds
+    and reopens it for another cooldown if it fails.
+
+    Callers ask allow() before every call and report its outcome with
+    record(), whether it succeeded or not, passing the permit allow()
+    returned. Permits tell the calls of every closed period and every probe
+    apart, so a call that started before the breaker last changed state
+    never counts: only the probe itself resolves the half-open state.
+    """
+
+    def __init__(self, error_rate=0.5, min_calls=10, window=30.0, cooldown=15.0, clock=time.monotonic):
+        """
+        Args:
+            error_rate (float): Share of failed calls that opens the breaker
+            min_calls (int): Calls in the window before the rate is trusted
+            window (float): Seconds of calls the error rate is computed on
+            cooldown (float): Seconds the breaker stays open
+            clock (callable): Monotonic time source, in seconds
+        """
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque()
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = False
+        # Changes with every state change, see allow()
+        self._generation = 1
+        self._counters = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self):
+        """CLOSED, OPEN or HALF_OPEN."""
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def allow(self):
+        """
+        Tell whether a call may be made now.
+
+        Returns:
+            int: The permit of the call, to pass to record(); None if the
+                breaker is open, or half-open with its probe call under way
+        """
+        with self._lock:
+            state = self._current_state(self._clock())
+            if state == CLOSED:
+                return self._generation
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self._generation += 1
+                return self._generation
+            self._counters["rejected"] += 1
+            return None
+
+    def record(self, permit, success):
+        """
+        Report the outcome of a call that was allowed.
+
+        Args:
+            permit (int): What allow() returned for the call
+            success (bool): Whether the call succeeded
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._current_state(now)
+            if permit != self._generation:
+                # A call started before the breaker last changed state
+                return
+            if state == HALF_OPEN and self._probing:
+                self._probing = False
+                if success:
+                    self._close()
+                else:
+                    self._open(now)
+                return
+            if state != CLOSED:
+                return
+
+            self._outcomes.append((now, success))
+            if not success:
+                self._failures += 1
+            self._expire(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures >= self.error_rate * calls:
+                self._open(now)
+
+    def retry_after(self):
+        """Seconds until the breaker lets a call through again, 0 if it does."""
+        with self._lock:
+            if self._current_state(self._clock()) != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.cooldown - self._clock())
+
+    def stats(self):
+        """Return the state, the calls in the window and the counters."""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            return dict(
+                state=self._current_state(now),
+                window_calls=len(self._outcomes),
+                window_failures=self._failures,
+                **self._counters
+            )
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def _open(self, now):
+        self._state = OPEN
+        self._generation += 1
+        self._opened_at = now
+        self._counters["opened"] += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._generation += 1
+        self._outcomes.clear()
+        self._failures = 0
+
+    def _expire(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            _, success = self._outcomes.popleft()
+            if not success:
+                self._failures -= 1
@@ -1,13 +1,39 @@
-import nltk
 import random
-from nltk.tokenize import sent_tokenize
+from services.batch import run_batch
+from services.cache import result_cache
+from services.document import ParsedDocument
+from services.metrics import metrics
 
-def enhance_content(text):
+# Transition phrases to add readability
+TRANSITION_PHRASES = [
+    "Furthermore, ",
+    "In addition, ",
+    "Moreover, ",
+    "Similarly, ",
+    "Likewise, ",
+    "For instance, ",
+    "To illustrate, ",
+    "Specifically, ",
+    "As a result, ",
+    "Consequently, ",
+    "Therefore, ",
+    "Hence, ",
+    "In contrast, ",
+    "On the other hand, ",
+    "However, ",
+    "Nevertheless, ",
+    "In conclusion, ",
+    "To summarize, "
+]
+
+def enhance_content(text, document=None, use_cache=True):
     """
     Enhance the given text by adding transition phrases.
     
     Args:
         text (str): The text to enhance
+        document (ParsedDocument, optional): Pre-parsed form of the text
+        use_cache (bool): Whether a cached result may be returned
         
     Returns:
         dict: A dictionary containing the enhanced text and related stats
@@ -20,37 +46,35 @@ def enhance_content(text):
             "changes_made": 0
         }
     
-    # Ensure we have NLTK punkt
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
+    def compute():
+        # Split text into sentences the way the ParsedDocument /api/analyze
+        # shares does, so both endpoints enhance the same sentences and can
+        # share cached results
+        with metrics.time_stage("enhance_content", "tokenize"):
+            sentences = (document or ParsedDocument(text)).sentences
+        
+        with metrics.time_stage("enhance_content", "rewrite"):
+            return _enhance(text, sentences)
     
-    # Transition phrases to add readability
-    transition_phrases = [
-        "Furthermore, ",
-        "In addition, ",
-        "Moreover, ",
-        "Similarly, ",
-        "Likewise, ",
-        "For instance, ",
-        "To illustrate, ",
-        "Specifically, ",
-        "As a result, ",
-        "Consequently, ",
-        "Therefore, ",
-        "Hence, ",
-        "In contrast, ",
-        "On the other hand, ",
-        "However, ",
-        "Nevertheless, ",
-        "In conclusion, ",
-        "To summarize, "
-    ]
+    return result_cache.get_or_compute("enhance_content", text, None, compute, use_cache)
+
+def enhance_content_batch(texts, use_cache=True):
+    """
+    Enhance a batch of texts by adding transition phrases.
     
-    # Split text into sentences
-    sentences = sent_tokenize(text)
+    Args:
+        texts (list): The texts to enhance
+        use_cache (bool): Whether cached results may be returned
+        
+    Returns:
+        dict: Per-text results as returned by run_batch
+    """
+    def process(text):
+        return enhance_content(text, use_cache=use_cache)
     
+    return run_batch(process, texts)
+
+def _enhance(text, sentences):
     # Skip enhancement if text is too short
     if len(sentences) < 3:
         return {
@@ -70,7 +94,7 @@ def enhance_content(text):
             # Don't add transitions to very short sentences
             if len(sentences[i].split()) > 4:
                 # Choose a random transition phrase
-                transition = random.choice(transition_phrases)
+                transition = random.choice(TRANSITION_PHRASES)
                 
                 # Add transition at the beginning of the sentence
                 # If it starts with uppercase, preserve it
@@ -0,0 +1,196 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """
+    SQLite-backed cache of serialized results shared by every process.
+
+    All gunicorn workers open the same database file in WAL mode, so a result
+    computed by one worker is visible to the others and survives restarts and
+    deploys. Connections are opened per thread and re-opened after a fork.
+    A background thread in each process periodically drops expired entries,
+    evicts the least recently used ones above the size cap and gives the
+    freed pages back to the file system.
+
+    Errors from SQLite are swallowed and treated as cache misses: the disk
+    cache must never fail a request.
+    """
+
+    # Only refresh an entry's access time when it is older than this, so
+    # that reads don't turn into a write on every hit
+    ACCESS_RESOLUTION = 60
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, compaction_interval=300):
+        self.path = os.path.join(directory, "result_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self.compaction_interval = compaction_interval
+
+        self._local = threading.local()
+        self._compactor_lock = threading.Lock()
+        self._compactor_pid = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._execute_script(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                service TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+            CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+            """
+        )
+
+    def get(self, key):
+        """Return the serialized value stored for a key, or None."""
+        self._ensure_compactor()
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            if row[2] < now - self.ACCESS_RESOLUTION:
+                with connection:
+                    connection.execute(
+                        "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+                    )
+            return row[0]
+        except sqlite3.Error:
+            return None
+
+    def set(self, key, service, serialized, ttl):
+        """Store a serialized value for a key for ttl seconds."""
+        self._ensure_compactor()
+        size = len(serialized)
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries "
+                    "(key, service, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, service, serialized, size, now + ttl, now)
+                )
+        except sqlite3.Error:
+            pass
+
+    def compact(self):
+        """
+        Drop expired entries, then evict least recently used entries until
+        the total size is under the cap, and reclaim the freed space.
+
+        Returns:
+            int: Number of entries removed
+        """
+        removed = 0
+        try:
+            connection = self._connection()
+            with connection:
+                removed += connection.execute(
+                    "DELETE FROM entries WHERE expires_at <= ?", (time.time(),)
+                ).rowcount
+
+            total = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                # Collect the least recently used entries until enough bytes
+                # are freed, then delete them in one transaction
+                excess = total - self.max_bytes
+                keys = []
+                for key, size in connection.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed_at"
+                ):
+                    keys.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                with connection:
+                    connection.executemany("DELETE FROM entries WHERE key = ?", keys)
+                removed += len(keys)
+
+            if removed:
+                connection.execute("PRAGMA incremental_vacuum").fetchall()
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error:
+            pass
+        return removed
+
+    def stats(self):
+        """Return the number of entries and bytes stored on disk."""
+        try:
+            count, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            count, size = None, None
+        return {
+            "path": self.path,
+            "entries": count,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+    def clear(self):
+        """Drop every entry stored on disk."""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("DELETE FROM entries")
+        except sqlite3.Error:
+            pass
+
+    def _connection(self):
+        # Connections can't be shared between threads, nor survive a fork
+        pid = os.getpid()
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != pid:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = pid
+        return connection
+
+    def _execute_script(self, script):
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            # auto_vacuum only applies if set before the first table exists
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.executescript(script)
+        finally:
+            connection.close()
+
+    def _ensure_compactor(self):
+        # Threads don't survive a fork either, so start one per process
+        pid = os.getpid()
+        if self._compactor_pid == pid or not self.compaction_interval:
+            return
+        with self._compactor_lock:
+            if self._compactor_pid == pid:
+                return
+            self._compactor_pid = pid
+            thread = threading.Thread(target=self._compact_forever, name="disk-cache-compactor", daemon=True)
+            thread.start()
+
+    def _compact_forever(self):
+        while True:
+            # Jitter so workers started together don't compact in lockstep
+            time.sleep(self.compaction_interval * random.uniform(0.8, 1.2))
+            self.compact()
@@ -0,0 +1,171 @@
+import re
+
+from nltk.tokenize import sent_tokenize, word_tokenize
+from services.resources import ensure_nltk_data, get_stemmer
+
+# Tokens sumy counts as words: letters, with apostrophes and hyphens inside
+# (the pattern of sumy's own Tokenizer)
+_SUMY_WORD = re.compile(r"^[^\W\d_](?:[^\W\d_]|['-])*$")
+
+
+class _SentenceWords:
+    """
+    Tokenizer for sumy Sentences that answers from tokens we already have.
+
+    sumy asks the tokenizer of a sentence for its words through to_words()
+    the first time they are needed; this one looks them up by sentence
+    instead of tokenizing the sentence again.
+    """
+
+    def __init__(self, language):
+        self.language = language
+        self._words = {}
+
+    def add(self, sentence, tokens):
+        self._words[sentence] = tuple(token for token in tokens if _SUMY_WORD.match(token))
+
+    def to_words(self, sentence):
+        words = self._words.get(sentence)
+        if words is None:
+            words = tuple(token for token in word_tokenize(sentence, language=self.language)
+                          if _SUMY_WORD.match(token))
+        return words
+
+
+class ParsedDocument:
+    """
+    A text tokenized once and shared between the analysis services.
+
+    Paragraphs are split on blank lines and all-uppercase lines are kept as
+    headings, the same way sumy's PlaintextParser reads plain text, so the
+    summarizer sees the same structure it would have built itself. Every
+    derived view (tokens, lowercased tokens, stems, the sumy document and
+    the TextBlob) is computed lazily and memoized on first use; stems come
+    from the process-wide memoized stemmer.
+    """
+
+    def __init__(self, text, language="english"):
+        self.text = text
+        self.language = language
+
+        self._paragraphs = None
+        self._sentences = None
+        self._sentence_tokens = None
+        self._tokens = None
+        self._lower_tokens = None
+        self._stems = None
+        self._sumy_document = None
+        self._blob = None
+
+    def _split_paragraphs(self, text):
+        """Split text into paragraphs of (sentence, is_heading) pairs."""
+        ensure_nltk_data()
+        paragraphs = []
+        current_lines = []
+        current = []
+
+        def flush_lines():
+            if current_lines:
+                joined = " ".join(current_lines)
+                for sentence in sent_tokenize(joined, language=self.language):
+                    sentence = sentence.strip()
+                    if sentence:
+                        current.append((sentence, False))
+                current_lines.clear()
+
+        for line in text.strip().splitlines():
+            line = line.strip()
+            if line.isupper():
+                flush_lines()
+                current.append((line, True))
+            elif not line:
+                flush_lines()
+                if current:
+                    paragraphs.append(list(current))
+                    current.clear()
+            else:
+                current_lines.append(line)
+
+        flush_lines()
+        if current:
+            paragraphs.append(list(current))
+
+        return paragraphs
+
+    @property
+    def paragraphs(self):
+        """Paragraphs of the document as lists of (sentence, is_heading)."""
+        if self._paragraphs is None:
+            self._paragraphs = self._split_paragraphs(self.text)
+        return self._paragraphs
+
+    @property
+    def sentences(self):
+        """All sentences of the document, headings included."""
+        if self._sentences is None:
+            self._sentences = [
+                sentence
+                for paragraph in self.paragraphs
+                for sentence, _ in paragraph
+            ]
+        return self._sentences
+
+    @property
+    def sentence_tokens(self):
+        """Word tokens of every sentence, in document order."""
+        if self._sentence_tokens is None:
+            self._sentence_tokens = [
+                word_tokenize(sentence, language=self.language, preserve_line=True)
+                for sentence in self.sentences
+            ]
+        return self._sentence_tokens
+
+    @property
+    def tokens(self):
+        """All word tokens of the document."""
+        if self._tokens is None:
+            self._tokens = [
+                token for tokens in self.sentence_tokens for token in tokens
+            ]
+        return self._tokens
+
+    @property
+    def lower_tokens(self):
+        """All word tokens of the document, lowercased."""
+        if self._lower_tokens is None:
+            self._lower_tokens = [token.lower() for token in self.tokens]
+        return self._lower_tokens
+
+    @property
+    def stems(self):
+        """Stemmed, lowercased word tokens of the document."""
+        if self._stems is None:
+            stem = get_stemmer()
+            self._stems = [stem(token) for token in self.lower_tokens]
+        return self._stems
+
+    @property
+    def sumy_document(self):
+        """The document as a sumy ObjectDocumentModel, reusing our tokens."""
+        if self._sumy_document is None:
+            from sumy.models.dom import ObjectDocumentModel, Paragraph, Sentence
+
+            words = _SentenceWords(self.language)
+            tokens = iter(self.sentence_tokens)
+            paragraphs = []
+            for paragraph in self.paragraphs:
+                sentences = []
+                for text, is_heading in paragraph:
+                    words.add(text, next(tokens))
+                    sentences.append(Sentence(text, words, is_heading=is_heading))
+                paragraphs.append(Paragraph(sentences))
+            self._sumy_document = ObjectDocumentModel(paragraphs)
+        return self._sumy_document
+
+    @property
+    def blob(self):
+        """The document as a TextBlob."""
+        if self._blob is None:
+            from textblob import TextBlob
+            self._blob = TextBlob(self.text)
+        return self._blob
@@ -0,0 +1,148 @@
+import os
+import struct
+import zlib
+
+import numpy
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# File layout: a 32 byte header followed by one little-endian uint32
+# document frequency per bucket. The header ends with the name of the
+# tokenizer the terms were counted with, all zeros in the first indexes,
+# which were all counted with "treebank".
+MAGIC = b"IDFIDX01"
+HEADER = struct.Struct("<8sIIQ8s")
+HEADER_SIZE = 32
+DOCUMENTS_OFFSET = 16
+DEFAULT_TOKENIZER = "treebank"
+
+DEFAULT_BUCKETS = 1 << 20
+
+
+def term_bucket(term, buckets):
+    """Bucket of a term; terms are hashed, not stored, to keep the file small."""
+    return zlib.crc32(term.encode("utf-8")) % buckets
+
+
+def file_id(path):
+    """
+    Identity of the file at a path, which changes when the file is replaced.
+
+    Raises:
+        OSError: If the file does not exist
+    """
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+def create_index_file(path, buckets=DEFAULT_BUCKETS, tokenizer=DEFAULT_TOKENIZER):
+    """Write an empty index with the given number of buckets, for terms split by the given tokenizer."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as index_file:
+        index_file.write(HEADER.pack(MAGIC, 1, buckets, 0, tokenizer.encode("ascii")).ljust(HEADER_SIZE, b"\0"))
+        index_file.truncate(HEADER_SIZE + 4 * buckets)
+
+
+class IdfIndex:
+    """
+    Document frequencies of the terms of a corpus, memory-mapped from disk.
+
+    Terms are hashed into a fixed number of uint32 counters (collisions
+    merge the counts of rare terms, which barely moves their IDF), so the
+    file has a fixed size whatever the vocabulary and is mapped rather than
+    read: every worker shares the same pages of the OS cache. Documents
+    added with add_documents() are written through the shared mapping and
+    are visible to every process that has the file open.
+
+    The terms of a text only match those of the index when both are split
+    by the same tokenizer, recorded in the file as tokenizer.
+
+    file_id is the identity of the file that was mapped, see file_id().
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self.file_id = file_id(path)
+        self._data = numpy.memmap(path, dtype=numpy.uint8, mode="r+" if writable else "r")
+
+        magic, version, buckets, _, tokenizer = HEADER.unpack_from(self._data[:HEADER.size].tobytes())
+        if magic != MAGIC or version != 1:
+            raise ValueError(f"Not an IDF index file: {path}")
+        if len(self._data) != HEADER_SIZE + 4 * buckets:
+            raise ValueError(f"Truncated IDF index file: {path}")
+
+        self.buckets = buckets
+        self.tokenizer = tokenizer.rstrip(b"\0").decode("ascii") or DEFAULT_TOKENIZER
+        self._documents = self._data[DOCUMENTS_OFFSET:DOCUMENTS_OFFSET + 8].view(numpy.uint64)
+        self._frequencies = self._data[HEADER_SIZE:].view(numpy.uint32)
+
+    @property
+    def documents(self):
+        """Number of documents in the index."""
+        return int(self._documents[0])
+
+    def idf(self, terms):
+        """
+        Smoothed inverse document frequencies, log((1 + N) / (1 + df)) + 1.
+
+        Args:
+            terms (list): Distinct terms
+
+        Returns:
+            numpy.ndarray: The IDF of each term, in order
+        """
+        buckets = numpy.fromiter(
+            (term_bucket(term, self.buckets) for term in terms), dtype=numpy.int64, count=len(terms)
+        )
+        frequencies = self._frequencies[buckets].astype(numpy.float64)
+        return numpy.log((1.0 + self.documents) / (1.0 + frequencies)) + 1.0
+
+    def add_documents(self, documents):
+        """
+        Fold documents into the index without rebuilding it.
+
+        Args:
+            documents (iterable): One iterable of terms per document
+
+        Returns:
+            int: Number of documents added
+        """
+        if not self.writable:
+            raise ValueError("The IDF index was opened read-only")
+
+        counts = numpy.zeros(self.buckets, dtype=numpy.uint32)
+        added = 0
+        for terms in documents:
+            buckets = {term_bucket(term, self.buckets) for term in terms}
+            if buckets:
+                counts[numpy.fromiter(buckets, dtype=numpy.int64, count=len(buckets))] += 1
+            added += 1
+
+        # Serialize concurrent updaters; readers never block
+        with open(self.path, "rb") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                numpy.add(self._frequencies, counts, out=self._frequencies)
+                self._documents[0] += added
+                self._data.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return added
+
+    def stats(self):
+        """Size of the index."""
+        return {
+            "path": self.path,
+            "documents": self.documents,
+            "buckets": self.buckets,
+            "tokenizer": self.tokenizer,
+            "size_bytes": len(self._data)
+        }
+
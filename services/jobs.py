@@ -0,0 +1,412 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+# States of a job
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """The job queue of this process has as many pending jobs as it accepts."""
+
+
+class JobStore:
+    """
+    SQLite-backed store of the state and result of the jobs.
+
+    Like the disk result cache, every gunicorn worker opens the same
+    database file in WAL mode, so a job submitted to one worker can be
+    polled through any other. Jobs expire ttl seconds after they were
+    submitted or last finished, whichever is later.
+
+    A job waiting or running is leased to the process that holds it, which
+    renews the lease while it is alive. The request of the job is stored
+    with it, so once the lease of a job has expired, because its process
+    stopped or hangs, another process can claim the job and run it again.
+    """
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    service TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    status_code INTEGER,
+                    result TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+                """
+            )
+            # Added with leases, to the files of earlier versions too
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (("request", "TEXT"), ("owner", "TEXT"), ("lease_expires_at", "REAL"),
+                                       ("attempts", "INTEGER NOT NULL DEFAULT 0")):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (state, lease_expires_at)")
+            connection.commit()
+        finally:
+            connection.close()
+
+    def create(self, service, request, owner, lease):
+        """
+        Record a new queued job, leased to owner for lease seconds.
+
+        Args:
+            service (str): Name of the service
+            request (dict): What the job needs to run, as JSON
+            owner (str): Id of the process that queued the job
+            lease (float): Seconds the lease lasts unless renewed
+
+        Returns:
+            str: The id of the job
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO jobs (id, service, state, pid, request, owner, lease_expires_at, attempts, "
+                "created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?)",
+                (job_id, service, QUEUED, os.getpid(), json.dumps(request), owner, now + lease, now, now + self.ttl)
+            )
+        return job_id
+
+    def start(self, job_id, owner):
+        """
+        Mark a job as running.
+
+        Returns:
+            bool: Whether owner still holds the job; if not, its lease
+                expired and it was claimed by another process
+        """
+        connection = self._connection()
+        with connection:
+            return connection.execute(
+                "UPDATE jobs SET state = ?, started_at = ? WHERE id = ? AND owner = ?",
+                (RUNNING, time.time(), job_id, owner)
+            ).rowcount > 0
+
+    def finish(self, job_id, state, status_code, result, owner=None):
+        """
+        Store the outcome of a job, kept for ttl seconds from now.
+
+        With an owner, the outcome is only stored if the job is still
+        leased to it, so a process that lost the lease of a job doesn't
+        overwrite the outcome of the process that claimed it.
+        """
+        now = time.time()
+        connection = self._connection()
+        query = ("UPDATE jobs SET state = ?, status_code = ?, result = ?, finished_at = ?, expires_at = ?, "
+                 "lease_expires_at = NULL WHERE id = ?")
+        parameters = (state, status_code, json.dumps(result), now, now + self.ttl, job_id)
+        if owner is not None:
+            query += " AND owner = ?"
+            parameters += (owner,)
+        with connection:
+            connection.execute(query, parameters)
+
+    def renew(self, owner, lease):
+        """Extend the leases of the jobs owner is holding to lease seconds from now."""
+        connection = self._connection()
+        with connection:
+            return connection.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE owner = ? AND state IN (?, ?)",
+                (time.time() + lease, owner, QUEUED, RUNNING)
+            ).rowcount
+
+    def claim_expired(self, owner, lease, limit, max_attempts):
+        """
+        Lease to owner the jobs whose lease has expired, oldest first.
+
+        Jobs already handed out max_attempts times are failed instead: a
+        job that brings down every process that runs it is not run again.
+
+        Args:
+            owner (str): Id of the process claiming the jobs
+            lease (float): Seconds the new leases last unless renewed
+            limit (int): Most jobs to claim
+            max_attempts (int): Times a job is handed out at most
+
+        Returns:
+            list: (id, service, request) of the claimed jobs
+        """
+        now = time.time()
+        connection = self._connection()
+        claimed = []
+        with connection:
+            # Taken before reading, so two processes never claim the same job
+            connection.execute("BEGIN IMMEDIATE")
+            rows = connection.execute(
+                "SELECT id, service, request, attempts FROM jobs "
+                "WHERE state IN (?, ?) AND lease_expires_at < ? AND expires_at > ? ORDER BY created_at LIMIT ?",
+                (QUEUED, RUNNING, now, now, limit)
+            ).fetchall()
+            for job_id, service, request, attempts in rows:
+                if attempts >= max_attempts:
+                    connection.execute(
+                        "UPDATE jobs SET state = ?, status_code = ?, result = ?, finished_at = ?, expires_at = ?, "
+                        "lease_expires_at = NULL WHERE id = ?",
+                        (FAILED, 500, json.dumps({
+                            "status": "error",
+                            "message": f"The job stopped the worker running it {attempts} times"
+                        }), now, now + self.ttl, job_id)
+                    )
+                    continue
+                connection.execute(
+                    "UPDATE jobs SET state = ?, pid = ?, owner = ?, lease_expires_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (QUEUED, os.getpid(), owner, now + lease, job_id)
+                )
+                claimed.append((job_id, service, json.loads(request)))
+        return claimed
+
+    def release(self, job_id, owner):
+        """Give up the lease of a queued job, for any process to claim it."""
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "UPDATE jobs SET lease_expires_at = 0, attempts = attempts - 1 WHERE id = ? AND owner = ? AND state = ?",
+                (job_id, owner, QUEUED)
+            )
+
+    def get(self, job_id):
+        """
+        Look a job up.
+
+        Returns:
+            dict: The id, service, state, attempts, timestamps and, once
+                finished, the HTTP status code and body of the service's
+                response; None if the job doesn't exist or has expired
+        """
+        row = self._connection().execute(
+            "SELECT id, service, state, attempts, status_code, result, created_at, started_at, finished_at, "
+            "expires_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None or row[9] <= time.time():
+            return None
+
+        job_id, service, state, attempts, status_code, result, created_at, started_at, finished_at, _ = row
+        job = {
+            "id": job_id,
+            "service": service,
+            "state": state,
+            "attempts": attempts,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+        if result is not None:
+            job["status_code"] = status_code
+            job["result"] = json.loads(result)
+        return job
+
+    def purge(self):
+        """Drop the expired jobs and return how many there were."""
+        connection = self._connection()
+        with connection:
+            return connection.execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def _connection(self):
+        # Connections can't be shared between threads, nor survive a fork
+        pid = os.getpid()
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != pid:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = pid
+        return connection
+
+
+class JobQueue:
+    """
+    Runs jobs on a few background threads of the process.
+
+    A job is the body and headers of a request to a service, answered by
+    runner(service, body, headers), which returns the HTTP status code and
+    JSON body of the service's response. Jobs wait in a bounded queue:
+    once queue_size are pending, submit() raises JobQueueFull instead of
+    accepting work the process can't get through. The threads are started
+    on first use in every process, after gunicorn has forked the workers.
+
+    A heartbeat thread renews the leases of the jobs of the process every
+    third of lease seconds and claims the jobs whose lease has expired,
+    those of stopped processes, as long as the queue has room for them.
+    """
+
+    # Seconds between two purges of the expired jobs
+    PURGE_INTERVAL = 60
+
+    # Times a job is handed out before it is failed
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, store, runner, workers=2, queue_size=100, lease=30.0):
+        self.store = store
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.lease = lease
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._pid = None
+        self._owner = None
+        self._running = 0
+        self._last_purge = 0.0
+        self._counters = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0, "expired": 0,
+                          "claimed": 0, "lost": 0}
+
+    def submit(self, service, body, headers=None):
+        """
+        Queue a job.
+
+        Args:
+            service (str): Name of the service, passed to the runner
+            body (dict): JSON body of the request
+            headers (dict, optional): Headers of the request
+
+        Returns:
+            str: The id of the job
+
+        Raises:
+            JobQueueFull: If queue_size jobs are already pending
+        """
+        self._ensure_workers()
+        self._purge_expired()
+        if self._queue.full():
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise JobQueueFull("Too many pending jobs, try again later")
+
+        request = {"body": body, "headers": headers or {}}
+        job_id = self.store.create(service, request, self._owner, self.lease)
+        try:
+            self._queue.put_nowait((job_id, service, request))
+        except queue.Full:
+            # Filled up by another thread since the check
+            self.store.finish(job_id, FAILED, 503, {"status": "error", "message": "Job queue is full"})
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise JobQueueFull("Too many pending jobs, try again later")
+        with self._lock:
+            self._counters["submitted"] += 1
+        return job_id
+
+    def get(self, job_id):
+        """Look a job up in the store, see JobStore.get()."""
+        # Any process polled for jobs takes part in claiming the orphaned ones
+        self._ensure_workers()
+        return self.store.get(job_id)
+
+    def stats(self):
+        """Return the number of threads, the queue depth and the job counters."""
+        with self._lock:
+            return dict(
+                workers=self.workers,
+                queue_size=self.queue_size,
+                pending=self._queue.qsize(),
+                running=self._running,
+                **self._counters
+            )
+
+    def _ensure_workers(self):
+        # Threads don't survive a fork, so start them once per process
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # The jobs queued by the parent process are leased to it
+                self._queue = queue.Queue(maxsize=max(1, self.queue_size))
+            self._pid = pid
+            self._owner = f"{pid}-{uuid.uuid4().hex[:8]}"
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+                thread.start()
+            threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _work(self):
+        while True:
+            job_id, service, request = self._queue.get()
+            with self._lock:
+                self._running += 1
+            try:
+                if not self.store.start(job_id, self._owner):
+                    # Claimed by another process while it waited here
+                    with self._lock:
+                        self._counters["lost"] += 1
+                    continue
+                try:
+                    status_code, body = self.runner(service, request["body"], request["headers"])
+                except Exception as e:
+                    status_code, body = 500, {"status": "error", "message": f"Error processing job: {str(e)}"}
+                state = SUCCEEDED if 200 <= status_code < 300 else FAILED
+                self.store.finish(job_id, state, status_code, body, owner=self._owner)
+                with self._lock:
+                    self._counters[state] += 1
+            except sqlite3.Error:
+                with self._lock:
+                    self._counters[FAILED] += 1
+            finally:
+                with self._lock:
+                    self._running -= 1
+                self._queue.task_done()
+
+    def _heartbeat(self):
+        while True:
+            try:
+                self.store.renew(self._owner, self.lease)
+                room = self.queue_size - self._queue.qsize()
+                if room > 0:
+                    claimed = self.store.claim_expired(self._owner, self.lease, room, self.MAX_ATTEMPTS)
+                    for job in claimed:
+                        try:
+                            self._queue.put_nowait(job)
+                        except queue.Full:
+                            # Filled up by new jobs since
+                            self.store.release(job[0], self._owner)
+                    if claimed:
+                        with self._lock:
+                            self._counters["claimed"] += len(claimed)
+                self._purge_expired()
+            except sqlite3.Error:
+                pass
+            time.sleep(self.lease / 3)
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        try:
+            removed = self.store.purge()
+        except sqlite3.Error:
+            return
+        with self._lock:
+            self._counters["expired"] += removed
@@ -1,54 +1,233 @@
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
 from collections import Counter
+import heapq
+import re
 import string
+import sys
+import numpy
+from services.batch import run_batch
+from services.cache import result_cache
+from services.document import ParsedDocument
+from services.metrics import metrics
+from services.process_pool import run_cpu_bound, should_offload
+from services.resources import get_stop_words, get_idf_index
 
-def extract_keywords(text, num_keywords=5):
+# "frequency" ranks words by their count in the text, "tfidf" weighs the
+# count by the inverse document frequency of the word in the IDF index
+KEYWORD_METHODS = ("frequency", "tfidf")
+
+# "treebank" is NLTK's word_tokenize, "fast" a single regular expression
+# that splits words the same way except for contractions and a few
+# punctuation corner cases, at a fraction of the cost
+KEYWORD_TOKENIZERS = ("treebank", "fast")
+_FAST_TOKEN = re.compile(r"\w+(?:[-']\w+)*|[^\w\s]")
+
+# Candidate keyphrases longer than this are too specific to be useful
+MAX_PHRASE_WORDS = 4
+
+def extract_keywords(text, num_keywords=5, method="frequency", tokenizer="treebank", keyphrases=False,
+                     document=None, use_cache=True):
     """
     Extract keywords from the given text.
     
     Args:
         text (str): The text to extract keywords from
         num_keywords (int): Number of keywords to extract
+        method (str): Ranking method, see KEYWORD_METHODS. With "tfidf" the
+            keyword values are TF-IDF scores instead of counts.
+        tokenizer (str): Word tokenizer, see KEYWORD_TOKENIZERS
+        keyphrases (bool): Whether to also extract up to num_keywords
+            multi-word keyphrases, scored like RAKE
+        document (ParsedDocument, optional): Pre-parsed form of the text
+        use_cache (bool): Whether a cached result may be returned
         
     Returns:
         dict: A dictionary containing the keywords and related stats
     """
+    if method not in KEYWORD_METHODS:
+        raise ValueError(f"Unknown keyword extraction method: {method}")
+    if tokenizer not in KEYWORD_TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer: {tokenizer}")
+    
+    index = None
+    params = {"num_keywords": num_keywords}
+    if method == "tfidf":
+        index = get_idf_index()
+        if index is None:
+            raise ValueError("TF-IDF keyword extraction needs an IDF index, see KEYWORD_IDF_INDEX")
+        if index.tokenizer != tokenizer:
+            # Other tokens would be looked up than those the index counted
+            raise ValueError(f"The IDF index was built with the {index.tokenizer} tokenizer, "
+                             f"use tokenizer={index.tokenizer} with method=tfidf")
+        # The scores change as documents are added to the index
+        params["method"] = method
+        params["idf_documents"] = index.documents
+    if tokenizer != "treebank":
+        params["tokenizer"] = tokenizer
+    if keyphrases:
+        params["keyphrases"] = True
+    
     if not text or len(text.strip()) == 0:
-        return {
+        result = {
             "keywords": {},
             "word_count": 0,
             "total_extracted": 0
         }
+        if keyphrases:
+            result["keyphrases"] = {}
+        return result
     
-    # Ensure we have NLTK resources
-    try:
-        nltk.data.find('tokenizers/punkt')
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('punkt')
-        nltk.download('stopwords')
+    def compute():
+        # Long texts are processed in the CPU pool, unless the shared
+        # document is already tokenized here
+        if document is None and should_offload(text):
+            return run_cpu_bound(_compute, text, num_keywords, method, tokenizer, keyphrases)
+        return _compute(text, num_keywords, method, tokenizer, keyphrases, document)
+    
+    return result_cache.get_or_compute("extract_keywords", text, params, compute, use_cache)
+
+def extract_keywords_batch(texts, num_keywords=5, method="frequency", tokenizer="treebank", keyphrases=False,
+                           use_cache=True):
+    """
+    Extract keywords from a batch of texts.
+    
+    Args:
+        texts (list): The texts to extract keywords from
+        num_keywords (int): Number of keywords to extract per text
+        method (str): Ranking method, see KEYWORD_METHODS
+        tokenizer (str): Word tokenizer, see KEYWORD_TOKENIZERS
+        keyphrases (bool): Whether to also extract keyphrases
+        use_cache (bool): Whether cached results may be returned
+        
+    Returns:
+        dict: Per-text results as returned by run_batch
+    """
+    def process(text):
+        return extract_keywords(text, num_keywords, method, tokenizer, keyphrases, use_cache=use_cache)
     
+    return run_batch(process, texts)
+
+def _compute(text, num_keywords, method, tokenizer, keyphrases, document=None):
     # Tokenize and clean text
-    tokens = word_tokenize(text.lower())
-    stop_words = set(stopwords.words('english'))
+    with metrics.time_stage("extract_keywords", "tokenize"):
+        if tokenizer == "treebank" and document is not None:
+            tokens = document.lower_tokens
+        else:
+            tokens = _tokenize(text, tokenizer)
+    
+    index = get_idf_index() if method == "tfidf" else None
+    with metrics.time_stage("extract_keywords", "score"):
+        return _extract(tokens, num_keywords, get_stop_words(), index, keyphrases)
+
+def _tokenize(text, tokenizer):
+    if tokenizer == "fast":
+        return _FAST_TOKEN.findall(text.lower())
+    # The tokens of the ParsedDocument that /api/analyze shares, so both
+    # endpoints count the same words and share cached results
+    return ParsedDocument(text).lower_tokens
+
+def index_terms(text, tokenizer="treebank"):
+    """
+    The distinct terms of a text, as counted by the IDF index.
     
+    Args:
+        text (str): A document of the corpus
+        tokenizer (str): Word tokenizer of the index, see KEYWORD_TOKENIZERS
+        
+    Returns:
+        set: The words keyword extraction would consider
+    """
+    if tokenizer not in KEYWORD_TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer: {tokenizer}")
+    return set(_clean_tokens(_tokenize(text, tokenizer), get_stop_words()))
+
+def _clean_tokens(tokens, stop_words):
     # Remove punctuation and stopwords
-    cleaned_tokens = [
+    return [
         word for word in tokens 
         if word not in stop_words and word not in string.punctuation
         and len(word) > 2  # Remove very short words
     ]
-    
+
+def _extract(tokens, num_keywords, stop_words, index=None, keyphrases=False):
     # Count word frequencies
-    word_counts = Counter(cleaned_tokens)
+    if keyphrases:
+        word_counts, degrees, phrases = _scan_phrases(tokens, stop_words)
+    else:
+        word_counts = Counter(_clean_tokens(tokens, stop_words))
     
-    # Get the most common words
-    keywords = dict(word_counts.most_common(num_keywords))
+    if index is None:
+        # Get the most common words
+        keywords = dict(word_counts.most_common(num_keywords))
+    else:
+        keywords = _top_tfidf(word_counts, num_keywords, index)
     
-    return {
+    result = {
         "keywords": keywords,
         "word_count": len(tokens),
         "total_extracted": len(keywords)
-    }
\ No newline at end of file
+    }
+    if keyphrases:
+        result["keyphrases"] = _top_phrases(phrases, word_counts, degrees, num_keywords)
+    return result
+
+def _scan_phrases(tokens, stop_words):
+    """
+    Count the words and the candidate keyphrases in a single pass.
+    
+    Candidate phrases are the runs of words that _clean_tokens keeps,
+    delimited by stopwords, punctuation and short words (RAKE). Words are
+    interned so the many repeated ones share one string and hash.
+    
+    Returns:
+        tuple: (word counts, word degrees, phrase counts), the degree of a
+            word being the total length of the phrases it appears in
+    """
+    intern = sys.intern
+    punctuation = string.punctuation
+    word_counts = Counter()
+    degrees = {}
+    phrases = {}
+    phrase = []
+    
+    for token in tokens:
+        if len(token) > 2 and token not in stop_words and token not in punctuation:
+            phrase.append(intern(token))
+            continue
+        if phrase:
+            _add_phrase(phrase, word_counts, degrees, phrases)
+            phrase = []
+    if phrase:
+        _add_phrase(phrase, word_counts, degrees, phrases)
+    
+    return word_counts, degrees, phrases
+
+def _add_phrase(phrase, word_counts, degrees, phrases):
+    length = len(phrase)
+    for word in phrase:
+        word_counts[word] += 1
+        degrees[word] = degrees.get(word, 0) + length
+    if length <= MAX_PHRASE_WORDS:
+        phrase = tuple(phrase)
+        phrases[phrase] = phrases.get(phrase, 0) + 1
+
+def _top_phrases(phrases, word_counts, degrees, num_phrases):
+    # RAKE: a phrase scores the sum of degree / frequency of its words
+    def score(phrase):
+        return sum(degrees[word] / word_counts[word] for word in phrase)
+    
+    top = heapq.nlargest(num_phrases, phrases, key=score)
+    return {" ".join(phrase): round(score(phrase), 4) for phrase in top}
+
+def _top_tfidf(word_counts, num_keywords, index):
+    # One IDF lookup per distinct word, and only the top words are sorted
+    terms = list(word_counts)
+    scores = numpy.fromiter(word_counts.values(), dtype=numpy.float64, count=len(terms))
+    scores *= index.idf(terms)
+    
+    top = numpy.arange(len(terms))
+    if num_keywords < len(terms):
+        top = numpy.argpartition(-scores, num_keywords - 1)[:num_keywords]
+    # Highest score first, ties in order of first occurrence like most_common
+    top = sorted(top, key=lambda i: (-scores[i], i))
+    
+    return {terms[i]: round(float(scores[i]), 4) for i in top}
@@ -0,0 +1,139 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+import numpy
+
+# Character n-gram sizes of the profiles
+NGRAM_SIZES = (1, 2, 3)
+
+# Profiles bundled with the service, built by scripts/language_profiles.py
+PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'language_profiles.json')
+
+# Languages told apart by their script alone, in order of precedence: a
+# Japanese text mixes kana with Han characters, a Chinese one has no kana
+_SCRIPTS = (
+    ('ja', re.compile(r"[\u3040-\u30ff]")),
+    ('zh-CN', re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]")),
+    ('ru', re.compile(r"[\u0400-\u04ff]")),
+    ('ar', re.compile(r"[\u0600-\u06ff\u0750-\u077f\ufb50-\ufdff\ufe70-\ufeff]")),
+    ('hi', re.compile(r"[\u0900-\u097f]")),
+)
+_LATIN = re.compile(r"[a-zA-Z\u00c0-\u024f]")
+
+# Letters only, each word padded with spaces so n-grams mark word edges
+_WORD = re.compile(r"[^\W\d_]+")
+
+
+def iter_ngrams(text):
+    """Yield the lowercased character n-grams of the words of a text."""
+    for word in _WORD.findall(text.lower()):
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            for start in range(len(padded) - size + 1):
+                ngram = padded[start:start + size]
+                if ngram != " ":
+                    yield ngram
+
+
+class LanguageDetector:
+    """
+    Offline language identification.
+
+    Texts in a script used by a single supported language (Cyrillic,
+    Arabic, Devanagari, kana or Han characters) are identified by their
+    script. Texts in the Latin script are scored against character n-gram
+    profiles with a naive Bayes model: every profile is a table of n-gram
+    log-probabilities, loaded once into a matrix, and a text's score for a
+    language is the sum of the log-probabilities of its n-grams.
+
+    The confidence is the posterior probability of the best language, with
+    the score differences scaled by log(words + 1) / words: it grows with
+    the length of the text, but much slower than the raw naive Bayes
+    posterior, which is near certain after a few words even when wrong.
+    As the posterior only compares the languages with a profile, it is
+    also scaled down when less than MIN_COVERAGE of the trigrams of the
+    text are frequent ones of the best language, which is the case of
+    texts in other languages.
+
+    Latin texts shorter than MIN_WORDS words or MIN_LETTERS letters, such
+    as one-word UI strings, are not identified at all: a handful of
+    n-grams fits several languages equally well, and the guess would
+    still come out with a high confidence.
+    """
+
+    MIN_COVERAGE = 0.5
+    MIN_WORDS = 3
+    MIN_LETTERS = 15
+
+    def __init__(self, profiles, max_chars=2000):
+        """
+        Args:
+            profiles (dict): language -> {"ngrams": {ngram: log-probability},
+                "unseen": log-probability of any other n-gram}
+            max_chars (int): Characters of a text that are looked at
+        """
+        self.languages = sorted(profiles)
+        ngrams = sorted({ngram for profile in profiles.values() for ngram in profile["ngrams"]})
+        self._index = {ngram: position for position, ngram in enumerate(ngrams)}
+        # Whether each n-gram is in the profile of each language
+        self._frequent = numpy.array([
+            [ngram in profiles[language]["ngrams"] for language in self.languages] for ngram in ngrams
+        ] + [[False] * len(self.languages)], dtype=bool)
+        # One row per n-gram, plus a last row for the unseen ones
+        self._weights = numpy.array([
+            [profiles[language]["ngrams"].get(ngram, profiles[language]["unseen"]) for language in self.languages]
+            for ngram in ngrams
+        ] + [[profiles[language]["unseen"] for language in self.languages]], dtype=numpy.float64)
+        self.max_chars = max_chars
+
+    @classmethod
+    def load(cls, path=PROFILES_PATH, **kwargs):
+        """Load the profiles written by scripts/language_profiles.py."""
+        with open(path, encoding='utf-8') as profiles:
+            return cls(json.load(profiles)["profiles"], **kwargs)
+
+    def detect(self, text):
+        """
+        Identify the language of a text.
+
+        Args:
+            text (str): The text, of which only the first max_chars
+                characters are looked at
+
+        Returns:
+            tuple: (language, confidence), language being None if the text
+                has no letters or is too short to tell
+        """
+        text = text[:self.max_chars]
+        latin = len(_LATIN.findall(text))
+        for language, script in _SCRIPTS:
+            # Latin words are common in other scripts: brands, units, code
+            count = len(script.findall(text))
+            if count and count >= latin / 4:
+                return language, round(count / (count + latin), 4)
+        if not latin or not self.languages:
+            return None, 0.0
+        words = len(_WORD.findall(text))
+        if words < self.MIN_WORDS or latin < self.MIN_LETTERS:
+            return None, 0.0
+
+        unseen = len(self._weights) - 1
+        counts = Counter(iter_ngrams(text))
+        rows = numpy.array([self._index.get(ngram, unseen) for ngram in counts], dtype=numpy.int64)
+        weights = numpy.fromiter(counts.values(), dtype=numpy.float64, count=len(counts))
+        trigrams = numpy.array([len(ngram) == 3 for ngram in counts], dtype=bool)
+        scores = weights @ self._weights[rows]
+
+        scaled = (scores - scores.max()) * math.log(words + 1) / words
+        probabilities = numpy.exp(scaled)
+        probabilities /= probabilities.sum()
+        best = int(probabilities.argmax())
+
+        confidence = float(probabilities[best])
+        if trigrams.any():
+            frequent = weights[trigrams] @ self._frequent[rows[trigrams], best] / weights[trigrams].sum()
+            confidence *= min(1.0, float(frequent) / self.MIN_COVERAGE)
+        return self.languages[best], round(confidence, 4)
@@ -0,0 +1,267 @@
+import re
+
+import numpy
+
+# Tokens of pattern's find_tokens that matter for sentiment, in order of
+# precedence: emoticons between spaces, "(!)", ellipses, numbers,
+# abbreviations and initials, (hyphenated) words and any other single
+# character.
+# Apostrophes are split off like find_tokens does ("don't" -> do n ' t).
+_TOKEN_PATTERNS = (
+    r"\(!\)",
+    r"\.\.\.",
+    r"\d+(?:[.,]\d+)+",
+    r"(?:[^\W\d_]\.)+",
+    r"\w+(?=n't)",
+    r"\w+(?:[-*]\w+)*",
+    r"\S",
+)
+
+
+class LexiconSentiment:
+    """
+    TextBlob's (pattern's) sentiment analysis on array-backed tables.
+
+    The pattern lexicon is loaded once into a sorted vocabulary and parallel
+    arrays of polarity, subjectivity, intensity and flags. A text is scored
+    by looking all its tokens up at once (numpy.searchsorted) and applying
+    pattern's rules with array operations instead of its per-word state
+    machine:
+
+    - known words are averaged, each counting once;
+    - a known adverb ("very") scales the next known word by its intensity
+      and does not count on its own, across words of at most 2 characters;
+    - "no", "not" and "never" negate the next known word, across tokens of
+      at most 1 character, and a negated score is multiplied by -0.5;
+    - every "!" after a word multiplies its polarity by 1.25;
+    - emoticons and "(!)" count as words of their own.
+
+    The results match TextBlob within floating point rounding, except on
+    text that the regular expressions split differently from find_tokens,
+    such as rare punctuation inside words.
+    """
+
+    EXCLAMATION_BOOST = 1.25
+    NEGATION_FACTOR = -0.5
+
+    def __init__(self, lexicon, emoticons, negations=("no", "not", "never"), modifiers=("RB",)):
+        """
+        Args:
+            lexicon (dict): word -> {pos: (polarity, subjectivity, intensity)},
+                as loaded by pattern's Sentiment, with the all-tags average
+                under the None key
+            emoticons (dict): lowercased emoticon -> polarity
+            negations (tuple): Words negating the next known word
+            modifiers (tuple): Part-of-speech tags of the modifying words
+        """
+        entries = {}
+        for word, tags in lexicon.items():
+            # The lexicon has a few multi-word entries no token can match
+            if not word or " " in word or None not in tags:
+                continue
+            polarity, subjectivity, intensity = tags[None][:3]
+            is_modifier = any(tag in tags for tag in modifiers)
+            entries[word] = (polarity, subjectivity, intensity, True, is_modifier, False, False)
+        for emoticon, polarity in emoticons.items():
+            entries.setdefault(emoticon, (polarity, 1.0, 1.0, False, False, False, True))
+        entries.setdefault("(!)", (0.0, 1.0, 1.0, False, False, False, True))
+        for word in negations:
+            values = entries.get(word, (0.0, 0.0, 1.0, False, False, False, False))
+            entries[word] = values[:5] + (True, values[6])
+
+        words = sorted(entries)
+        columns = list(zip(*(entries[word] for word in words)))
+        self.vocabulary = numpy.array(words)
+        self.polarity = numpy.array(columns[0], dtype=numpy.float64)
+        self.subjectivity = numpy.array(columns[1], dtype=numpy.float64)
+        self.intensity = numpy.array(columns[2], dtype=numpy.float64)
+        self.is_known = numpy.array(columns[3], dtype=bool)
+        self.is_modifier = numpy.array(columns[4], dtype=bool)
+        self.is_negation = numpy.array(columns[5], dtype=bool)
+        self.is_emoticon = numpy.array(columns[6], dtype=bool)
+        self.ends_with_ly = numpy.array([word.endswith("ly") for word in words], dtype=bool)
+
+        # Emoticons are only tokens after a space, and before a space or
+        # punctuation
+        alternatives = sorted(map(re.escape, emoticons), key=len, reverse=True)
+        emoticon_pattern = r"(?<!\S)(?:%s)(?=[\s.,;:!?]|$)" % "|".join(alternatives) if alternatives else None
+        patterns = ((emoticon_pattern,) if emoticon_pattern else ()) + _TOKEN_PATTERNS
+        self._token_pattern = re.compile("|".join(patterns))
+
+    @classmethod
+    def from_textblob(cls):
+        """Build the tables from the lexicon bundled with TextBlob."""
+        from textblob._text import EMOTICONS
+        from textblob.en import sentiment as pattern_sentiment
+
+        if dict.__len__(pattern_sentiment) == 0:
+            pattern_sentiment.load()
+        emoticons = {
+            emoticon.lower(): polarity
+            for (_, polarity), forms in EMOTICONS.items()
+            for emoticon in forms
+        }
+        return cls(
+            dict(pattern_sentiment), emoticons,
+            negations=tuple(word for word in pattern_sentiment.negations if "'" not in word),
+            modifiers=pattern_sentiment.modifiers
+        )
+
+    def tokenize(self, text):
+        """Lowercased tokens of a text, split like pattern's find_tokens."""
+        return self._token_pattern.findall(text.lower())
+
+    def analyze(self, texts, independent=False):
+        """
+        Score texts, each on its own, in one vectorized pass.
+
+        Args:
+            texts (list): The texts to score, for instance the sentences of
+                a document
+            independent (bool): Whether the texts are unrelated, like the
+                items of a batch. By default they are parts of one text and
+                an adverb or negation at the end of one applies to the start
+                of the next, like in pattern.
+
+        Returns:
+            tuple: (overall, per_text) where overall is the (polarity,
+                subjectivity) of all the texts together, as if they were
+                one text, and per_text is a list with the (polarity,
+                subjectivity) of each text
+        """
+        tokens = []
+        text_ids = []
+        starts = []
+        for index, text in enumerate(texts):
+            text_tokens = self.tokenize(text)
+            starts.extend([len(tokens)] * len(text_tokens))
+            tokens.extend(text_tokens)
+            text_ids.extend([index] * len(text_tokens))
+
+        count = len(texts)
+        if not tokens:
+            return (0.0, 0.0), [(0.0, 0.0)] * count
+
+        starts = numpy.array(starts) if independent else None
+        polarity, subjectivity, heads = self._assess(numpy.array(tokens), starts)
+
+        overall = (
+            float(polarity.mean()) if len(polarity) else 0.0,
+            float(subjectivity.mean()) if len(subjectivity) else 0.0
+        )
+        # Each assessment belongs to the text its first word is in
+        group_texts = numpy.array(text_ids)[heads]
+        groups = numpy.bincount(group_texts, minlength=count)
+        divisor = numpy.maximum(groups, 1)
+        polarities = numpy.bincount(group_texts, weights=polarity, minlength=count) / divisor
+        subjectivities = numpy.bincount(group_texts, weights=subjectivity, minlength=count) / divisor
+        return overall, list(zip(polarities.tolist(), subjectivities.tolist()))
+
+    def _assess(self, words, starts=None):
+        """
+        Score an array of tokens.
+
+        Args:
+            words (numpy.ndarray): The tokens
+            starts (numpy.ndarray, optional): For every token, the position
+                of the first token of its text when the texts are scored
+                independently
+
+        Returns:
+            tuple: (polarity, subjectivity, heads) of every assessment, an
+                assessment being a known word or emoticon with the adverbs
+                and negations that apply to it, heads giving the index of
+                its first token
+        """
+        size = len(words)
+        positions = numpy.arange(size)
+
+        found = numpy.searchsorted(self.vocabulary, words)
+        found[found == len(self.vocabulary)] = 0
+        matched = self.vocabulary[found] == words
+
+        known = matched & self.is_known[found]
+        unknown = ~known
+        negation = matched & self.is_negation[found]
+        emoticon = matched & self.is_emoticon[found] & unknown
+        modifier = known & self.is_modifier[found]
+        lengths = numpy.char.str_len(words)
+        # Apostrophes are tokens of their own, so only "'" strips to nothing
+        stripped_lengths = numpy.where(words == "'", 0, lengths)
+
+        # An adverb applies across unknown words of at most 2 characters.
+        # "really not good": a negation right after an -ly adverb negates the
+        # current assessment and keeps the adverb active for the next word,
+        # which may be another such negation
+        adverb_barrier = known | (lengths > 2)
+        absorbed = numpy.zeros(size, dtype=bool)
+        while True:
+            previous = _previous(adverb_barrier & ~absorbed, positions, starts)
+            adverb = (previous >= 0) & modifier[previous]
+            absorbing = unknown & negation & adverb & self.ends_with_ly[found[previous]]
+            if numpy.array_equal(absorbing, absorbed):
+                break
+            absorbed = absorbing
+        modified = known & adverb
+
+        # A negation applies across tokens of at most 1 character
+        negation_barrier = known | negation | (stripped_lengths > 1)
+        previous_negation = _previous(negation_barrier, positions, starts)
+        negated = known & (previous_negation >= 0) & negation[previous_negation] & ~absorbed[previous_negation]
+
+        # A word modified by an adverb is merged into the current (last)
+        # assessment, which may be an emoticon found after the adverb
+        heads = (known & ~modified) | emoticon
+        head_positions = positions[heads]
+        if not len(head_positions):
+            return numpy.zeros(0), numpy.zeros(0), head_positions
+        group = numpy.cumsum(heads) - 1
+        group_count = len(head_positions)
+
+        # The last word merged into an assessment decides its scores, scaled
+        # by the intensity of the member before it (inverted if negated)
+        members = known | emoticon
+        last = numpy.full(group_count, -1)
+        numpy.maximum.at(last, group[members], positions[members])
+        polarity = self.polarity[found[last]]
+        subjectivity = self.subjectivity[found[last]]
+
+        merged = modified[last]
+        if merged.any():
+            before = _previous(members, positions)[last[merged]]
+            intensity = self.intensity[found[before]]
+            intensity = numpy.where(negated[before], 1.0 / intensity, intensity)
+            polarity[merged] = numpy.clip(polarity[merged] * intensity, -1.0, 1.0)
+            subjectivity[merged] = numpy.clip(subjectivity[merged] * intensity, -1.0, 1.0)
+
+        # Exclamation marks after the last word boost the assessment
+        exclamation = (words == "!") & (group >= 0)
+        exclamation[exclamation] &= positions[exclamation] > last[group[exclamation]]
+        if starts is not None:
+            exclamation[exclamation] &= head_positions[group[exclamation]] >= starts[exclamation]
+        boosts = numpy.bincount(group[exclamation], minlength=group_count)
+        if boosts.any():
+            polarity = numpy.clip(polarity * self.EXCLAMATION_BOOST ** boosts, -1.0, 1.0)
+
+        is_negated = numpy.zeros(group_count, dtype=bool)
+        is_negated[group[negated]] = True
+        is_negated[group[absorbed & (group >= 0)]] = True
+        polarity = numpy.where(is_negated, polarity * self.NEGATION_FACTOR, polarity)
+
+        return polarity, subjectivity, head_positions
+
+
+def _previous(barrier, positions, starts=None):
+    """
+    For every position, the last barrier strictly before it, or -1.
+
+    With starts, barriers before the start of the text of a position are
+    ignored.
+    """
+    marks = numpy.where(barrier, positions, -1)
+    previous = numpy.empty_like(marks)
+    previous[0] = -1
+    numpy.maximum.accumulate(marks[:-1], out=previous[1:])
+    if starts is not None:
+        previous[previous < starts] = -1
+    return previous
@@ -0,0 +1,74 @@
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_lock = threading.Lock()
+_active = 0
+_started = False
+
+
+class MemoryUsage:
+    """Peak memory allocated while a track_peak_memory() block ran."""
+
+    def __init__(self, baseline):
+        self.baseline = baseline
+        self.peak_bytes = 0
+
+
+@contextmanager
+def track_peak_memory():
+    """
+    Measure the peak memory allocated by Python inside the block.
+
+    tracemalloc is started when the first block is entered and stopped when
+    the last one exits, unless something else had already started it. Its
+    peak is process wide, so when blocks overlap in several threads each
+    one reports an upper bound of its own usage.
+
+    Yields:
+        MemoryUsage: Its peak_bytes is set when the block exits
+    """
+    global _active, _started
+
+    with _lock:
+        if _active == 0:
+            _started = not tracemalloc.is_tracing()
+            if _started:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+        _active += 1
+        usage = MemoryUsage(tracemalloc.get_traced_memory()[0])
+
+    try:
+        yield usage
+    finally:
+        with _lock:
+            usage.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - usage.baseline)
+            _active -= 1
+            if _active == 0 and _started:
+                tracemalloc.stop()
+                _started = False
+
+
+def max_rss_bytes():
+    """
+    Peak resident memory of the process so far, in bytes.
+
+    Read from getrusage, so it costs nothing to measure, but it is process
+    wide and never goes down: an upper bound of what any one call used.
+
+    Returns:
+        int: The peak, or None where getrusage is not available
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
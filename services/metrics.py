@@ -0,0 +1,350 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prefix of the metric names
+NAMESPACE = "text_analysis"
+
+# Counts of the processes that stopped, and the lock of the readers
+CUMULATIVE_FILE = "metrics-cumulative.json"
+LOCK_FILE = "metrics.lock"
+
+
+class Metrics:
+    """
+    Request counts and latency histograms, in the Prometheus text format.
+
+    Every request is counted by endpoint, method and status code and its
+    duration recorded in a histogram per endpoint. Services time their
+    stages (parsing, tokenization, scoring, SVD, calls to the translation
+    provider) with time_stage(), recorded in a histogram per service and
+    stage, so the stage that blows a latency objective can be found.
+
+    Counts are kept per process. With a directory, every process also
+    writes a snapshot of its own to it, at most every flush_interval
+    seconds, and render() adds up the snapshots of all the processes
+    there: the gunicorn workers and their CPU pool processes. Snapshots are
+    named after the pid and a random id of the process, so a process
+    reusing the pid of a stopped one never overwrites its counts. render()
+    folds the snapshots of the processes that stopped into a cumulative
+    one, so the totals never go down and the directory doesn't grow with
+    every worker restarted. The directory must be local to the machine, as
+    processes are looked up by pid.
+    """
+
+    def __init__(self, enabled=True, directory=None, flush_interval=1.0, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._exit_hook = False
+        self._reset()
+
+    def observe_request(self, endpoint, method, status, seconds):
+        """Count a request and record how long it took."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_pid()
+            key = (endpoint, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._observe(self._request_latency, (endpoint,), seconds)
+        self._maybe_flush()
+
+    def observe_stage(self, service, stage, seconds):
+        """Record how long a stage of a service took."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_pid()
+            self._observe(self._stage_latency, (service, stage), seconds)
+        self._maybe_flush()
+
+    @contextmanager
+    def time_stage(self, service, stage):
+        """
+        Time the block as a stage of a service.
+
+        A stage that raises is recorded too: slow failures count against
+        the latency like slow successes.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(service, stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        """The counts of this process, as a JSON-serializable dict."""
+        with self._lock:
+            self._check_pid()
+            return dict(
+                _as_snapshot(self._requests, self._request_latency, self._stage_latency),
+                pid=self._pid
+            )
+
+    def flush(self):
+        """Write the snapshot of this process to the directory."""
+        if not self.directory:
+            return
+        if not self._exit_hook:
+            # The last counts of a process that stops between two flushes
+            self._exit_hook = True
+            atexit.register(self.flush)
+        snapshot = self.snapshot()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(self._name, snapshot)
+        except OSError:
+            pass
+
+    def render(self):
+        """
+        The counts of every process, in the Prometheus text format.
+
+        Returns:
+            str: The metrics, summed over the snapshots in the directory and
+                the current counts of this process
+        """
+        snapshots = [self.snapshot()]
+        if self.directory:
+            snapshots.extend(self._read_snapshots())
+        requests, request_latency, stage_latency = self._add_up(snapshots)
+
+        lines = [
+            f"# HELP {NAMESPACE}_requests_total Requests answered, by endpoint, method and status code.",
+            f"# TYPE {NAMESPACE}_requests_total counter",
+        ]
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append(f"{NAMESPACE}_requests_total"
+                         f"{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+        lines.extend(self._render_histogram(
+            f"{NAMESPACE}_request_duration_seconds", "Time to answer a request, by endpoint.",
+            ("endpoint",), request_latency
+        ))
+        lines.extend(self._render_histogram(
+            f"{NAMESPACE}_stage_duration_seconds", "Time spent in a stage of a service.",
+            ("service", "stage"), stage_latency
+        ))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Remove the snapshots of every process from the directory."""
+        if not self.directory:
+            return
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith("metrics-") and (name.endswith(".json") or name.endswith(".tmp")):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def reset(self):
+        """Forget the counts of this process."""
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._name = f"metrics-{self._pid}-{uuid.uuid4().hex[:8]}.json"
+        self._requests = {}
+        self._request_latency = {}
+        self._stage_latency = {}
+
+    def _check_pid(self):
+        # A forked process (CPU pool, bulk processing) starts from zero
+        # rather than report the counts of its parent a second time
+        if self._pid != os.getpid():
+            self._reset()
+            self._last_flush = 0.0
+
+    def _observe(self, histograms, key, seconds):
+        # A histogram is the count of every bucket, of the larger values,
+        # and the sum of the values
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def _read_snapshots(self):
+        # The snapshots of the other processes, after folding those of the
+        # stopped ones into the cumulative snapshot. Readers take turns, so
+        # none counts a snapshot both on its own and in the cumulative one.
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            lock_file = open(os.path.join(self.directory, LOCK_FILE), "a")
+        except OSError:
+            return []
+        with lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                names = set(os.listdir(self.directory))
+            except OSError:
+                return []
+
+            cumulative = self._read(CUMULATIVE_FILE) or {}
+            # Snapshots already in the cumulative one that couldn't be
+            # removed yet
+            folded = set(cumulative.get("folded", [])) & names
+            running = []
+            stopped = {}
+            for name in names:
+                if (not name.startswith("metrics-") or not name.endswith(".json")
+                        or name in (self._name, CUMULATIVE_FILE) or name in folded):
+                    continue
+                snapshot = self._read(name)
+                if snapshot is None:
+                    continue
+                if _is_running(snapshot.get("pid")):
+                    running.append(snapshot)
+                else:
+                    stopped[name] = snapshot
+
+            if stopped or folded != set(cumulative.get("folded", [])):
+                folded |= set(stopped)
+                updated = dict(_as_snapshot(*self._add_up([cumulative] + list(stopped.values()))),
+                               folded=sorted(folded))
+                try:
+                    self._write(CUMULATIVE_FILE, updated)
+                except OSError:
+                    return running + list(stopped.values()) + [cumulative]
+                cumulative = updated
+                for name in stopped:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+            return running + [cumulative]
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name), encoding="utf-8") as snapshot_file:
+                return json.load(snapshot_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name, snapshot):
+        path = os.path.join(self.directory, name)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        # Readers never see a partly written snapshot
+        os.replace(temporary, path)
+
+    def _add_up(self, snapshots):
+        requests = {}
+        request_latency = {}
+        stage_latency = {}
+        for snapshot in snapshots:
+            for endpoint, method, status, count in snapshot.get("requests", []):
+                key = (endpoint, method, status)
+                requests[key] = requests.get(key, 0) + count
+            for *key, histogram in snapshot.get("request_latency", []):
+                self._merge(request_latency, tuple(key), histogram)
+            for *key, histogram in snapshot.get("stage_latency", []):
+                self._merge(stage_latency, tuple(key), histogram)
+        return requests, request_latency, stage_latency
+
+    def _merge(self, histograms, key, histogram):
+        if len(histogram) != len(self.buckets) + 2:
+            # Written with other buckets, by an earlier version
+            return
+        total = histograms.get(key)
+        if total is None:
+            histograms[key] = list(histogram)
+        else:
+            for index, value in enumerate(histogram):
+                total[index] += value
+
+    def _render_histogram(self, name, description, label_names, histograms):
+        lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for key, histogram in sorted(histograms.items()):
+            labels = dict(zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(le=le, **labels)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**labels)} {histogram[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(**labels)} {cumulative}")
+        return lines
+
+    def _maybe_flush(self):
+        if not self.directory or time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        # One thread writes while the others go on
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+
+def _as_snapshot(requests, request_latency, stage_latency):
+    return {
+        "requests": [list(key) + [count] for key, count in requests.items()],
+        "request_latency": [list(key) + [list(histogram)] for key, histogram in request_latency.items()],
+        "stage_latency": [list(key) + [list(histogram)] for key, histogram in stage_latency.items()],
+    }
+
+
+def _is_running(pid):
+    # A pid reused by another process only keeps a stopped process's
+    # snapshot on its own a while longer, which counts the same
+    if not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Running, as another user
+        return True
+    return True
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Metrics of this process, added up with those of the other processes when
+# METRICS_DIR is set
+metrics = Metrics(
+    enabled=config.METRICS_ENABLED,
+    directory=config.METRICS_DIR,
+    flush_interval=config.METRICS_FLUSH_INTERVAL
+)
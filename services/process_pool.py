@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+
+# Set in the pool processes, so the services they run don't offload again
+_in_worker = False
+
+# Threads running the services inline, see run_inline()
+_local = threading.local()
+
+
+class PoolBusy(Exception):
+    """
+    The CPU pool has as many tasks queued as it accepts.
+
+    Attributes:
+        retry_after (float): Seconds after which a retry is likely to be
+            accepted
+    """
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _init_worker():
+    global _in_worker
+    _in_worker = True
+    # Forked from a warm process this only checks that everything is
+    # loaded; with the spawn or forkserver start methods it loads the models
+    from services import resources
+    resources.warm_up()
+
+
+def _run(function, args, kwargs, submitted):
+    # time.time() is the only clock shared with the parent process
+    waited = max(0.0, time.time() - submitted)
+    try:
+        return waited, function(*args, **kwargs)
+    finally:
+        # Pool processes never run their exit hooks, so the stage timings
+        # of every task are written out for /metrics right away
+        from services.metrics import metrics
+        metrics.flush()
+
+
+def _ready():
+    return os.getpid()
+
+
+class CpuPool:
+    """
+    Process pool for the CPU-bound services.
+
+    Summarization and keyword extraction are pure Python, so the threads of
+    a gunicorn worker can't run them in parallel and a long one holds the
+    GIL against every other request of the worker. Running them in a pool
+    of processes keeps the request threads free for the light and I/O-bound
+    work such as sentiment analysis and translation.
+
+    The processes are started and warmed up (resources.warm_up()) ahead of
+    the requests by start(), so no request pays for loading the models,
+    which forked processes share with their parent. At most
+    queue_size tasks wait for a free process: beyond that, run() raises
+    PoolBusy instead of letting requests pile up.
+    """
+
+    def __init__(self, workers, queue_size=8, start_method=None):
+        """
+        Args:
+            workers (int): Processes in the pool, 0 to run every task in
+                the calling thread
+            queue_size (int): Tasks that may wait for a free process
+            start_method (str, optional): multiprocessing start method, the
+                platform's default if None
+        """
+        self.workers = max(0, workers)
+        self.queue_size = max(0, queue_size)
+        self.start_method = start_method
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size) if self.workers else None
+        self._in_flight = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "restarts": 0}
+        self._wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._run_ms = 0.0
+
+    @property
+    def enabled(self):
+        """Whether tasks are sent to other processes."""
+        return self.workers > 0 and not _in_worker and not getattr(_local, "inline", False)
+
+    def start(self):
+        """
+        Start the processes and wait until they are warmed up.
+
+        Without it they are started by the first tasks. Processes are forked
+        from the calling process by default, so this is best called before
+        it starts threads, see gunicorn.conf.py.
+        """
+        if self.enabled and self._executor is None:
+            executor = self._get_executor()
+            # Tasks submitted together make the pool start all its processes
+            for future in [executor.submit(_ready) for _ in range(self.workers)]:
+                future.result()
+
+    def run(self, function, *args, **kwargs):
+        """
+        Run a function in a pool process and wait for its result.
+
+        The function, its arguments and its result are pickled, so the
+        function must be defined at the top level of a module.
+
+        Raises:
+            PoolBusy: If queue_size tasks are already waiting
+        """
+        if not self.enabled:
+            return function(*args, **kwargs)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise PoolBusy("Server is busy, try again later")
+
+        start = time.perf_counter()
+        waited = None
+        try:
+            with self._lock:
+                self._in_flight += 1
+                self._counters["submitted"] += 1
+            executor = self._get_executor()
+            try:
+                waited, result = executor.submit(_run, function, args, kwargs, time.time()).result()
+            except BrokenProcessPool:
+                # A process died (killed, out of memory): the next task gets
+                # a new pool, this one fails
+                self._restart(executor)
+                raise
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                self._counters["completed" if waited is not None else "failed"] += 1
+                self._run_ms += elapsed_ms
+                if waited is not None:
+                    self._wait_ms += waited * 1000
+                    self._max_wait_ms = max(self._max_wait_ms, waited * 1000)
+            self._slots.release()
+
+    def stats(self):
+        """Return the size, queue depth, task counters and timings of the pool."""
+        with self._lock:
+            finished = self._counters["completed"] + self._counters["failed"]
+            return dict(
+                workers=self.workers,
+                queue_size=self.queue_size,
+                started=self._executor is not None,
+                in_flight=self._in_flight,
+                queued=max(0, self._in_flight - self.workers),
+                mean_wait_ms=round(self._wait_ms / self._counters["completed"], 2) if self._counters["completed"] else None,
+                max_wait_ms=round(self._max_wait_ms, 2),
+                mean_task_ms=round(self._run_ms / finished, 2) if finished else None,
+                **self._counters
+            )
+
+    def shutdown(self):
+        """Stop the processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    context = multiprocessing.get_context(self.start_method) if self.start_method else None
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=context, initializer=_init_worker
+                    )
+        return self._executor
+
+    def _restart(self, broken):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._counters["restarts"] += 1
+        broken.shutdown(wait=False)
+
+
+def run_cpu_bound(function, *args, **kwargs):
+    """
+    Run a CPU-bound service function in the CPU pool of this process.
+
+    It runs in the calling thread when the pool is disabled, or when called
+    from a pool process.
+    """
+    from services.resources import get_cpu_pool
+    return get_cpu_pool().run(function, *args, **kwargs)
+
+
+def should_offload(text):
+    """Whether a text is long enough to be worth sending to the CPU pool."""
+    return (config.CPU_POOL_SIZE > 0 and not _in_worker and not getattr(_local, "inline", False)
+            and len(text) >= config.CPU_POOL_MIN_CHARS)
+
+
+@contextmanager
+def run_inline():
+    """
+    Run the CPU-bound services called in the block in the calling thread.
+
+    Profiling uses it: the work done in a pool process would not show up in
+    the profile of the request.
+    """
+    previous = getattr(_local, "inline", False)
+    _local.inline = True
+    try:
+        yield
+    finally:
+        _local.inline = previous
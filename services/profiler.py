@@ -0,0 +1,262 @@
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+
+import config
+from services.memory import track_peak_memory
+from services.process_pool import run_inline
+
+# Header asking for the profile of a request, set to PROFILING_TOKEN
+PROFILE_HEADER = "X-Profile"
+
+# Frames of the profiling machinery itself, left out of the allocation sites
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+class ProfileStore:
+    """
+    Directory of the latest profile reports, one JSON file each.
+
+    Beyond max_entries reports, the oldest ones are removed, so the
+    profiles sampled from a busy server never fill up the disk.
+    """
+
+    def __init__(self, directory, max_entries=200):
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+
+    def save(self, report):
+        """Store a report and return its id."""
+        profile_id = f"{time.time_ns() // 1000:017d}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.directory, f"{profile_id}.json")
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as report_file:
+                json.dump(dict(report, id=profile_id), report_file)
+            os.replace(f"{path}.tmp", path)
+
+            # Ids sort by time
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+            for name in names[:-self.max_entries]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        return profile_id
+
+    def get(self, profile_id):
+        """Return a stored report, or None if there is none with that id."""
+        if not re.fullmatch(r"[0-9]+-[0-9a-f]+", profile_id or ""):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json"), encoding="utf-8") as report_file:
+                return json.load(report_file)
+        except (OSError, ValueError):
+            return None
+
+    def latest(self, limit=50):
+        """Summaries of the latest reports, newest first."""
+        try:
+            names = sorted((name for name in os.listdir(self.directory) if name.endswith(".json")), reverse=True)
+        except OSError:
+            return []
+        summaries = []
+        for name in names[:limit]:
+            report = self.get(name[:-len(".json")])
+            if report is not None:
+                summaries.append({key: report.get(key) for key in
+                                  ("id", "route", "function", "trigger", "started_at", "elapsed_ms", "error")})
+        return summaries
+
+
+class RequestProfiler:
+    """
+    Profiles the service call of selected requests.
+
+    A request is profiled when profiling is enabled and it sends the token
+    in the PROFILE_HEADER header, or when it is one of every sample_every
+    requests to its route. Profiles show the code and timings of the
+    service, so without a token no request may ask for or read them. The call
+    runs under cProfile and, for requested profiles or with sample_memory,
+    under tracemalloc; the hottest functions and the sites that allocated
+    the most memory make the report, which is stored and, for requested
+    profiles, returned with the response.
+
+    One request is profiled at a time per process: a request that comes
+    while another one is profiled runs as usual. A profiled request runs
+    its CPU-bound services in its own thread rather than the CPU pool, so
+    that their work is in the profile.
+    """
+
+    def __init__(self, enabled=False, token=None, sample_every=0, sample_memory=False, top=25, store=None):
+        """
+        Args:
+            enabled (bool): Whether requests may ask to be profiled; only
+                with a token
+            token (str, optional): Value of the header required to ask
+            sample_every (int): Profile one request in that many per route,
+                0 to sample none
+            sample_memory (bool): Whether sampled requests also trace their
+                memory allocations, which slows them down a lot more
+            top (int): Functions and allocation sites in a report
+            store (ProfileStore, optional): Where to keep the reports
+        """
+        self.enabled = enabled and bool(token)
+        self.token = token
+        self.sample_every = max(0, sample_every)
+        self.sample_memory = sample_memory
+        self.top = top
+        self.store = store
+
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        self._requests = {}
+
+    def is_authorized(self, headers):
+        """Whether the headers of a request allow it to ask for or read profiles."""
+        if not self.enabled:
+            return False
+        value = headers.get(PROFILE_HEADER) if headers is not None else None
+        return bool(value) and hmac.compare_digest(value.encode("utf-8"), self.token.encode("utf-8"))
+
+    def call(self, route, headers, function, *args, **kwargs):
+        """
+        Call a service function, profiling it if the request is selected.
+
+        Args:
+            route (str): Route of the request, sampled on its own
+            headers (dict): Headers of the request
+            function (callable): The service function, called with the
+                remaining arguments
+
+        Returns:
+            tuple: (result of the function, report of its profile if the
+                request asked for it, else None)
+        """
+        requested = self.is_authorized(headers)
+        sampled = False
+        if self.sample_every and not requested:
+            with self._lock:
+                count = self._requests.get(route, 0) + 1
+                self._requests[route] = count
+            sampled = count % self.sample_every == 0
+        if not requested and not sampled:
+            return function(*args, **kwargs), None
+
+        if not self._busy.acquire(blocking=False):
+            result = function(*args, **kwargs)
+            return result, ({"route": route, "skipped": "Another request is being profiled"} if requested else None)
+        try:
+            result, error, report = self._profile(route, function, args, kwargs, requested or self.sample_memory)
+        finally:
+            self._busy.release()
+        report["trigger"] = "header" if requested else "sample"
+
+        if self.store is not None:
+            try:
+                report["id"] = self.store.save(report)
+            except OSError:
+                pass
+        if error is not None:
+            # Slow failures are profiled like the rest
+            raise error
+        return result, (report if requested else None)
+
+    def _profile(self, route, function, args, kwargs, memory):
+        report = {
+            "route": route,
+            "function": f"{function.__module__}.{function.__qualname__}",
+            "started_at": time.time(),
+            "pid": os.getpid(),
+        }
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with run_inline():
+            if memory:
+                with track_peak_memory() as usage:
+                    before = tracemalloc.take_snapshot()
+                    result, error = self._run(profiler, function, args, kwargs)
+                    after = tracemalloc.take_snapshot()
+            else:
+                result, error = self._run(profiler, function, args, kwargs)
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        if error is not None:
+            report["error"] = f"{type(error).__name__}: {error}"
+
+        report["hotspots"] = self._hotspots(profiler)
+        if memory:
+            report["peak_memory_bytes"] = usage.peak_bytes
+            report["allocations"] = self._allocations(before, after)
+        return result, error, report
+
+    def _run(self, profiler, function, args, kwargs):
+        # An exception is returned, to be raised again once the report is
+        # stored
+        profiler.enable()
+        try:
+            return function(*args, **kwargs), None
+        except Exception as e:
+            return None, e
+        finally:
+            profiler.disable()
+
+    def _hotspots(self, profiler):
+        # The functions that took the most time themselves, with the time of
+        # what they called
+        stats = pstats.Stats(profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        return [
+            {
+                "function": f"{_short_path(filename)}:{line}({name})",
+                "calls": calls,
+                "self_ms": round(self_time * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, self_time, cumulative, _) in rows
+        ]
+
+    def _allocations(self, before, after):
+        # Memory still allocated after the call, by the line that allocated
+        # it: results, caches and leaks
+        filters = [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+        differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        return [
+            {
+                "site": f"{_short_path(difference.traceback[0].filename)}:{difference.traceback[0].lineno}",
+                "size_bytes": difference.size_diff,
+                "count": difference.count_diff,
+            }
+            for difference in differences[:self.top]
+            if difference.size_diff > 0
+        ]
+
+
+def _short_path(filename):
+    # Paths from the installed packages or the project, not the machine
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    project = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+    if filename.startswith(project):
+        return filename[len(project):]
+    return filename
+
+
+# Profiler of the requests of this process, of the Flask app and the
+# serverless handlers alike, storing its reports in PROFILING_DIR
+request_profiler = RequestProfiler(
+    enabled=config.PROFILING_ENABLED,
+    token=config.PROFILING_TOKEN,
+    sample_every=config.PROFILING_SAMPLE_EVERY,
+    sample_memory=config.PROFILING_SAMPLE_MEMORY,
+    top=config.PROFILING_TOP,
+    store=ProfileStore(config.PROFILING_DIR, config.PROFILING_MAX_ENTRIES)
+)
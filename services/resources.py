@@ -0,0 +1,343 @@
+import importlib
+import os
+import threading
+from functools import lru_cache
+
+import config
+
+# NLTK data packages the services rely on, by resource path
+NLTK_RESOURCES = {
+    'tokenizers/punkt': 'punkt',
+    'corpora/stopwords': 'stopwords',
+    'taggers/averaged_perceptron_tagger': 'averaged_perceptron_tagger',
+}
+
+# Number of distinct words whose stems are memoized per process
+STEM_CACHE_SIZE = 65536
+
+_resources = {}
+_lock = threading.RLock()
+
+# Process that started the background warm up, see warm_up_in_background()
+_warm_up_pid = None
+_warm_up_lock = threading.Lock()
+
+
+def _get(name, loader):
+    """Return the named resource, loading it on first use."""
+    try:
+        return _resources[name]
+    except KeyError:
+        pass
+
+    with _lock:
+        if name not in _resources:
+            _resources[name] = loader()
+        return _resources[name]
+
+
+def ensure_nltk_data():
+    """
+    Make sure the NLTK data packages can be found.
+
+    NLTK_DATA_DIR is searched first. Missing packages are downloaded only
+    when NLTK_DOWNLOAD is enabled, so an offline deployment never blocks on
+    the network. The file system is only probed once per process.
+
+    Returns:
+        dict: Whether each NLTK data package is available
+    """
+    def load():
+        import nltk
+
+        if config.NLTK_DATA_DIR and os.path.isdir(config.NLTK_DATA_DIR):
+            if config.NLTK_DATA_DIR not in nltk.data.path:
+                nltk.data.path.insert(0, config.NLTK_DATA_DIR)
+
+        available = {}
+        for resource, package in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(resource)
+                available[package] = True
+            except LookupError:
+                available[package] = bool(config.NLTK_DOWNLOAD and nltk.download(package))
+        return available
+
+    return _get('nltk_data', load)
+
+
+def get_stop_words():
+    """NLTK's English stopwords as a frozenset."""
+    def load():
+        from nltk.corpus import stopwords
+        ensure_nltk_data()
+        return frozenset(stopwords.words('english'))
+
+    return _get('stop_words', load)
+
+
+def get_stemmer():
+    """sumy's English stemmer, memoized per word."""
+    def load():
+        from sumy.nlp.stemmers import Stemmer
+        return lru_cache(maxsize=STEM_CACHE_SIZE)(Stemmer("english"))
+
+    return _get('stemmer', load)
+
+
+def get_sumy_tokenizer():
+    """sumy's English tokenizer, with the punkt model loaded."""
+    def load():
+        from sumy.nlp.tokenizers import Tokenizer
+        ensure_nltk_data()
+        return Tokenizer("english")
+
+    return _get('sumy_tokenizer', load)
+
+
+def _sumy_summarizer(name, module, class_name):
+    # sumy summarizers are configured the same way: a stemmer and stop words
+    def load():
+        from sumy.utils import get_stop_words as get_sumy_stop_words
+        summarizer_class = getattr(importlib.import_module(module), class_name)
+        summarizer = summarizer_class(get_stemmer())
+        summarizer.stop_words = get_sumy_stop_words("english")
+        return summarizer
+
+    return _get(name, load)
+
+
+def get_lsa_summarizer():
+    """
+    A ready-to-use LSA summarizer.
+
+    The summarizer keeps no state between calls, so a single instance is
+    shared by every request.
+    """
+    return _sumy_summarizer('lsa_summarizer', 'sumy.summarizers.lsa', 'LsaSummarizer')
+
+
+def get_sparse_lsa_summarizer():
+    """A ready-to-use sparse LSA summarizer, shared like the LSA one."""
+    def load():
+        from sumy.utils import get_stop_words as get_sumy_stop_words
+        from services.sparse_lsa import SparseLsaSummarizer
+        return SparseLsaSummarizer(
+            get_stemmer(),
+            get_sumy_stop_words("english"),
+            dimensions=config.SPARSE_LSA_DIMENSIONS
+        )
+
+    return _get('sparse_lsa_summarizer', load)
+
+
+def get_lex_rank_summarizer():
+    """A ready-to-use LexRank summarizer, shared like the LSA one."""
+    return _sumy_summarizer('lex_rank_summarizer', 'sumy.summarizers.lex_rank', 'LexRankSummarizer')
+
+
+def get_text_rank_summarizer():
+    """A ready-to-use TextRank summarizer, shared like the LSA one."""
+    return _sumy_summarizer('text_rank_summarizer', 'sumy.summarizers.text_rank', 'TextRankSummarizer')
+
+
+def get_luhn_summarizer():
+    """A ready-to-use Luhn summarizer, shared like the LSA one."""
+    return _sumy_summarizer('luhn_summarizer', 'sumy.summarizers.luhn', 'LuhnSummarizer')
+
+
+def get_baseline_summarizer():
+    """A ready-to-use frequency and position baseline summarizer."""
+    return _sumy_summarizer('baseline_summarizer', 'services.baseline_summarizer', 'BaselineSummarizer')
+
+
+def get_idf_index():
+    """
+    The IDF index of KEYWORD_IDF_INDEX, memory-mapped.
+
+    The file is checked on every call, which costs a stat(): an index
+    rebuilt in its place is mapped again, without restarting the workers.
+    Documents added to the live index are seen through the mapping.
+
+    Returns:
+        IdfIndex: The index, or None if none is configured or the file
+            does not exist yet; a missing index is not cached, so one built
+            later is picked up by the next call
+    """
+    from services.idf_index import IdfIndex, file_id
+
+    path = config.KEYWORD_IDF_INDEX
+    if not path:
+        return None
+    try:
+        current = file_id(path)
+    except FileNotFoundError:
+        return None
+
+    index = _resources.get('idf_index')
+    if index is not None and index.file_id == current:
+        return index
+    with _lock:
+        index = _resources.get('idf_index')
+        if index is None or index.file_id != current:
+            # Requests still using the previous index keep its mapping
+            index = _resources['idf_index'] = IdfIndex(path)
+        return index
+
+
+def get_lexicon_sentiment():
+    """TextBlob's sentiment lexicon in LexiconSentiment's lookup tables."""
+    def load():
+        from services.lexicon_sentiment import LexiconSentiment
+        return LexiconSentiment.from_textblob()
+
+    return _get('lexicon_sentiment', load)
+
+
+def get_language_detector():
+    """The offline language detector, with its bundled n-gram profiles."""
+    def load():
+        from services.language_detector import LanguageDetector
+        return LanguageDetector.load(max_chars=config.LANGUAGE_DETECTION_MAX_CHARS)
+
+    return _get('language_detector', load)
+
+
+def get_translation_backend():
+    """
+    The translation backend of TRANSLATE_BACKEND.
+
+    Backends are thread-safe, so one instance and its connection pool are
+    shared by every request.
+    """
+    def load():
+        from services.translation_backends import create_backend
+        return create_backend()
+
+    return _get('translation_backend', load)
+
+
+def get_translation_executor():
+    """
+    The thread pool translating the chunks of long texts.
+
+    It is shared by all requests, so at most TRANSLATE_MAX_WORKERS calls
+    to the translation provider are in flight per process. Its threads are
+    only started on first use, after gunicorn has forked the workers.
+    """
+    def load():
+        from concurrent.futures import ThreadPoolExecutor
+        return ThreadPoolExecutor(
+            max_workers=max(1, config.TRANSLATE_MAX_WORKERS),
+            thread_name_prefix='translate'
+        )
+
+    return _get('translation_executor', load)
+
+
+def get_cpu_pool():
+    """
+    The process pool running the CPU-bound services.
+
+    Created on first use in every process, so gunicorn workers never share
+    the pool of the master process. Its processes are started by the first
+    task, or right after the worker is forked by gunicorn.conf.py.
+    """
+    def load():
+        from services.process_pool import CpuPool
+        return CpuPool(config.CPU_POOL_SIZE, config.CPU_POOL_QUEUE_SIZE, config.CPU_POOL_START_METHOD)
+
+    return _get('cpu_pool', load)
+
+
+def get_job_queue(runner):
+    """
+    The queue running the jobs submitted to /api/jobs from this process.
+
+    The job store is a SQLite file at JOB_STORE_PATH shared by all workers;
+    the queue and its threads are per process.
+
+    Args:
+        runner (callable): Answers the jobs, see JobQueue; only used by the
+            first call
+    """
+    def load():
+        from services.jobs import JobQueue, JobStore
+        store = JobStore(config.JOB_STORE_PATH, ttl=config.JOB_RESULT_TTL)
+        return JobQueue(store, runner, workers=config.JOB_WORKERS, queue_size=config.JOB_QUEUE_SIZE,
+                        lease=config.JOB_LEASE_SECONDS)
+
+    return _get('job_queue', load)
+
+
+def warm_up():
+    """
+    Load every resource the services use.
+
+    Called once at startup so the first requests don't pay for it. When the
+    app is preloaded by gunicorn (--preload) this runs in the master process
+    and the loaded models are shared with the workers copy-on-write.
+    """
+    from nltk.tokenize import sent_tokenize, word_tokenize
+    from textblob import TextBlob
+
+    ensure_nltk_data()
+    get_stop_words()
+    get_sumy_tokenizer()
+    get_lsa_summarizer()
+    get_sparse_lsa_summarizer()
+    get_lex_rank_summarizer()
+    get_text_rank_summarizer()
+    get_luhn_summarizer()
+    get_baseline_summarizer()
+    get_idf_index()
+    get_lexicon_sentiment()
+    get_language_detector()
+
+    # Load the punkt model and the sentiment lexicon
+    word_tokenize(" ".join(sent_tokenize("Warm up the models. Now.")))
+    TextBlob("A good warm up.").sentiment
+
+    # Import the remaining services so their first request is fast too
+    import services.text_analyzer
+    import services.translator
+
+    _resources['warm'] = True
+
+
+def warm_up_in_background():
+    """
+    Start warm_up() in a background thread, once per process.
+
+    Used with LAZY_STARTUP, so a process that starts answering before its
+    models are loaded still becomes ready without waiting for a request to
+    each service. Threads don't survive a fork, so this is called from the
+    workers, not from a gunicorn master preloading the app.
+    """
+    global _warm_up_pid
+
+    pid = os.getpid()
+    if _warm_up_pid == pid or _resources.get('warm'):
+        return
+    with _warm_up_lock:
+        if _warm_up_pid == pid:
+            return
+        _warm_up_pid = pid
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def status():
+    """
+    Report which resources have been loaded in this process.
+
+    Returns:
+        dict: Whether warm_up() has completed, the loaded resources and the
+            availability of the NLTK data packages (None if not probed yet)
+    """
+    with _lock:
+        loaded = sorted(name for name in _resources if name != 'warm')
+        return {
+            "warm": _resources.get('warm', False),
+            "loaded": loaded,
+            "nltk_data": _resources.get('nltk_data')
+        }
@@ -1,43 +1,147 @@
 from textblob import TextBlob
+from services.batch import run_batch
+from services.cache import result_cache
+from services.metrics import metrics
+from services.resources import ensure_nltk_data, get_lexicon_sentiment
 
-def analyze_sentiment(text):
+# "textblob" builds a TextBlob per text, "lexicon" scores the same pattern
+# lexicon with LexiconSentiment's array lookups, which is much faster on
+# long texts and batches
+SENTIMENT_ENGINES = ("textblob", "lexicon")
+
+def analyze_sentiment(text, engine="textblob", sentences=False, document=None, use_cache=True):
     """
     Analyze the sentiment of the given text.
     
     Args:
         text (str): The text to analyze
+        engine (str): Sentiment engine, see SENTIMENT_ENGINES
+        sentences (bool): Whether to also score every sentence on its own
+        document (ParsedDocument, optional): Pre-parsed form of the text
+        use_cache (bool): Whether a cached result may be returned
         
     Returns:
-        dict: A dictionary containing sentiment analysis results
+        dict: A dictionary containing sentiment analysis results, with a
+            "sentences" list of per-sentence results when requested
     """
+    if engine not in SENTIMENT_ENGINES:
+        raise ValueError(f"Unknown sentiment engine: {engine}")
+    
     if not text or len(text.strip()) == 0:
-        return {
+        result = {
             "polarity": 0,
             "subjectivity": 0,
             "category": "Neutral"
         }
+        if sentences:
+            result["sentences"] = []
+        return result
+    
+    params = {}
+    if engine != "textblob":
+        params["engine"] = engine
+    if sentences:
+        params["sentences"] = True
+    
+    if engine == "lexicon":
+        compute = lambda: _analyze_lexicon(text, sentences)
+    else:
+        compute = lambda: _analyze(text, document, sentences)
+    
+    return result_cache.get_or_compute("analyze_sentiment", text, params, compute, use_cache)
+
+def analyze_sentiment_batch(texts, engine="textblob", sentences=False, use_cache=True):
+    """
+    Analyze the sentiment of a batch of texts.
+    
+    Args:
+        texts (list): The texts to analyze
+        engine (str): Sentiment engine, see SENTIMENT_ENGINES
+        sentences (bool): Whether to also score every sentence on its own
+        use_cache (bool): Whether cached results may be returned
+        
+    Returns:
+        dict: Per-text results as returned by run_batch
+    """
+    if engine == "lexicon" and not sentences:
+        return _analyze_lexicon_batch(texts, use_cache)
+    
+    return run_batch(lambda text: analyze_sentiment(text, engine, sentences, use_cache=use_cache), texts)
+
+def _analyze_lexicon_batch(texts, use_cache):
+    # On the first cache miss every text of the batch is scored in a single
+    # vectorized pass, which costs about as much as scoring a few of them
+    scores = {}
     
+    def process(text):
+        def compute():
+            if not scores:
+                valid = [item for item in texts if isinstance(item, str) and item.strip()]
+                with metrics.time_stage("analyze_sentiment", "score"):
+                    _, per_text = get_lexicon_sentiment().analyze(valid, independent=True)
+                scores.update(zip(valid, per_text))
+            return _result(*scores[text])
+        
+        return result_cache.get_or_compute("analyze_sentiment", text, {"engine": "lexicon"}, compute, use_cache)
+    
+    return run_batch(process, texts)
+
+def _analyze(text, document, sentences):
     # Create TextBlob object
-    blob = TextBlob(text)
+    blob = document.blob if document is not None else TextBlob(text)
     
-    # Get polarity and subjectivity
-    polarity = blob.sentiment.polarity
-    subjectivity = blob.sentiment.subjectivity
+    # Get polarity and subjectivity. TextBlob tokenizes lazily, so scoring
+    # includes the tokenization
+    with metrics.time_stage("analyze_sentiment", "score"):
+        polarity = blob.sentiment.polarity
+        subjectivity = blob.sentiment.subjectivity
     
+    result = _result(polarity, subjectivity)
+    if sentences:
+        with metrics.time_stage("analyze_sentiment", "score_sentences"):
+            result["sentences"] = [
+                dict(text=str(sentence), **_result(sentence.sentiment.polarity, sentence.sentiment.subjectivity))
+                for sentence in blob.sentences
+            ]
+    return result
+
+def _analyze_lexicon(text, sentences):
+    engine = get_lexicon_sentiment()
+    if not sentences:
+        with metrics.time_stage("analyze_sentiment", "score"):
+            (polarity, subjectivity), _ = engine.analyze([text])
+        return _result(polarity, subjectivity)
+    
+    # The sentences together score the same as the whole text
+    from nltk.tokenize import sent_tokenize
+    ensure_nltk_data()
+    with metrics.time_stage("analyze_sentiment", "tokenize"):
+        texts = sent_tokenize(text)
+    with metrics.time_stage("analyze_sentiment", "score"):
+        (polarity, subjectivity), scores = engine.analyze(texts)
+    result = _result(polarity, subjectivity)
+    result["sentences"] = [
+        dict(text=sentence, **_result(*score))
+        for sentence, score in zip(texts, scores)
+    ]
+    return result
+
+def _result(polarity, subjectivity):
+    return {
+        "polarity": polarity,
+        "subjectivity": subjectivity,
+        "category": _category(polarity)
+    }
+
+def _category(polarity):
     # Determine sentiment category
     if polarity >= 0.5:
-        category = "Strongly Positive"
+        return "Strongly Positive"
     elif polarity > 0:
-        category = "Positive"
+        return "Positive"
     elif polarity == 0:
-        category = "Neutral"
+        return "Neutral"
     elif polarity > -0.5:
-        category = "Negative"
+        return "Negative"
     else:
-        category = "Strongly Negative"
-    
-    return {
-        "polarity": polarity,
-        "subjectivity": subjectivity,
-        "category": category
-    }
\ No newline at end of file
+        return "Strongly Negative"
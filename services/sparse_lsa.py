@@ -0,0 +1,169 @@
+import math
+
+import numpy
+from sumy.summarizers._summarizer import AbstractSummarizer
+from services.metrics import metrics
+
+
+class SparseLsaSummarizer(AbstractSummarizer):
+    """
+    LSA summarizer whose cost scales with the number of non-zero terms.
+
+    It rates sentences exactly like sumy's LsaSummarizer, without building
+    the dense |words| x |sentences| matrix. The term frequency matrix sumy
+    decomposes is
+
+        A = SMOOTH * 1 c^T + S
+
+    where S holds the (1 - SMOOTH) * count / max_count entries of the words
+    that occur in each sentence and c marks the sentences that contain any
+    word at all. A is only ever used through products with A and A^T, which
+    cost O(non-zeros + words + sentences).
+
+    Sumy keeps every singular value, and with all of them the LSA rank of a
+    sentence is just the norm of its column of A. That is computed directly
+    when the document has at most `dimensions` singular values, which gives
+    the same ranking as sumy. Larger documents are reduced to their top
+    `dimensions` concepts with a randomized truncated SVD (Halko et al.,
+    subspace iteration).
+    """
+
+    SMOOTH = 0.4
+
+    def __init__(self, stemmer, stop_words=(), dimensions=50, power_iterations=2, oversampling=10, seed=0):
+        super(SparseLsaSummarizer, self).__init__(stemmer)
+        self.stop_words = stop_words
+        self.dimensions = dimensions
+        self.power_iterations = power_iterations
+        self.oversampling = oversampling
+        self.seed = seed
+
+    @property
+    def stop_words(self):
+        return self._stop_words
+
+    @stop_words.setter
+    def stop_words(self, words):
+        self._stop_words = frozenset(map(self.normalize_word, words))
+
+    def __call__(self, document, sentences_count):
+        sentences = document.sentences
+        matrix = self._create_matrix(sentences)
+        # empty document
+        if matrix is None:
+            return ()
+
+        ranks = iter(self._compute_ranks(*matrix))
+        return self._get_best_sentences(sentences, sentences_count, lambda s: next(ranks))
+
+    def _create_matrix(self, sentences):
+        """
+        Build the term frequency matrix in coordinate form.
+
+        Returns:
+            tuple: (rows, cols, values, words_count, sentences_count,
+                has_words) or None if the document has no words
+        """
+        stem_word = self.stem_word
+        stop_words = self._stop_words
+
+        # Like sumy, the dictionary is built from non-stopwords only, but
+        # every word whose stem is in the dictionary is counted
+        sentence_stems = []
+        dictionary = {}
+        for sentence in sentences:
+            stems = []
+            for word in sentence.words:
+                stem = stem_word(word)
+                stems.append(stem)
+                if stem not in dictionary and self.normalize_word(word) not in stop_words:
+                    dictionary[stem] = len(dictionary)
+            sentence_stems.append(stems)
+
+        if not dictionary:
+            return None
+
+        counts = {}
+        for col, stems in enumerate(sentence_stems):
+            for stem in stems:
+                row = dictionary.get(stem)
+                if row is not None:
+                    counts[(row, col)] = counts.get((row, col), 0) + 1
+
+        sentences_count = len(sentences)
+        keys = numpy.array(list(counts.keys()), dtype=numpy.int64).reshape(-1, 2)
+        rows, cols = keys[:, 0], keys[:, 1]
+        values = numpy.fromiter(counts.values(), dtype=numpy.float64, count=len(counts))
+
+        # Maximum term frequency normalization of every sentence (column)
+        max_counts = numpy.zeros(sentences_count)
+        numpy.maximum.at(max_counts, cols, values)
+        values = (1.0 - self.SMOOTH) * values / max_counts[cols]
+        has_words = (max_counts > 0).astype(numpy.float64)
+
+        return rows, cols, values, len(dictionary), sentences_count, has_words
+
+    def _compute_ranks(self, rows, cols, values, words_count, sentences_count, has_words):
+        if min(words_count, sentences_count) <= self.dimensions:
+            return self._column_norms(cols, values, words_count, sentences_count, has_words)
+
+        operator = _TermMatrix(rows, cols, values, words_count, sentences_count, has_words, self.SMOOTH)
+        with metrics.time_stage("summarize", "svd"):
+            sigma, v_matrix = self._truncated_svd(operator, self.dimensions)
+        return numpy.sqrt(((sigma ** 2)[:, None] * v_matrix ** 2).sum(axis=0))
+
+    def _column_norms(self, cols, values, words_count, sentences_count, has_words):
+        # |A e_j|^2 = SMOOTH^2 * words for the implicit entries, corrected
+        # for the non-zero ones
+        smooth = self.SMOOTH
+        squares = has_words * smooth ** 2 * words_count
+        numpy.add.at(squares, cols, (smooth + values) ** 2 - smooth ** 2)
+        return [math.sqrt(square) for square in squares]
+
+    def _truncated_svd(self, operator, k):
+        """Top-k singular values and right singular vectors of the operator."""
+        random = numpy.random.default_rng(self.seed)
+        width = min(k + self.oversampling, operator.shape[1])
+
+        sample = operator.dot(random.standard_normal((operator.shape[1], width)))
+        basis, _ = numpy.linalg.qr(sample)
+        for _ in range(self.power_iterations):
+            basis, _ = numpy.linalg.qr(operator.transpose_dot(basis))
+            basis, _ = numpy.linalg.qr(operator.dot(basis))
+
+        # Project onto the basis and decompose the small matrix exactly
+        projected = operator.transpose_dot(basis).T
+        _, sigma, v_matrix = numpy.linalg.svd(projected, full_matrices=False)
+        return sigma[:k], v_matrix[:k]
+
+
+class _TermMatrix:
+    """The matrix SMOOTH * 1 c^T + S, only available through products."""
+
+    def __init__(self, rows, cols, values, words_count, sentences_count, has_words, smooth):
+        self.shape = (words_count, sentences_count)
+        self.values = values
+        self.rows = rows
+        self.cols = cols
+        self.has_words = has_words
+        self.smooth = smooth
+
+    def dot(self, matrix):
+        """A @ matrix, for a (sentences x k) matrix."""
+        result = self._sparse_product(self.rows, self.cols, matrix, self.shape[0])
+        result += self.smooth * (self.has_words @ matrix)
+        return result
+
+    def transpose_dot(self, matrix):
+        """A^T @ matrix, for a (words x k) matrix."""
+        result = self._sparse_product(self.cols, self.rows, matrix, self.shape[1])
+        result += self.smooth * numpy.outer(self.has_words, matrix.sum(axis=0))
+        return result
+
+    def _sparse_product(self, out_index, in_index, matrix, size):
+        # One column at a time keeps the temporaries at O(non-zeros)
+        result = numpy.empty((size, matrix.shape[1]))
+        for column in range(matrix.shape[1]):
+            weights = self.values * matrix[in_index, column]
+            result[:, column] = numpy.bincount(out_index, weights=weights, minlength=size)
+        return result
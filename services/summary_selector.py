@@ -0,0 +1,115 @@
+import threading
+from collections import namedtuple
+
+# Size of a parsed document, as far as the summarizers' cost is concerned
+DocumentSize = namedtuple("DocumentSize", ["sentences", "words", "distinct_words"])
+
+# Algorithms "auto" may pick, best summaries first
+AUTO_PREFERENCE = ("lexrank", "textrank", "lsa", "sparse_lsa", "luhn", "baseline")
+
+
+# How the running time of each algorithm grows with the document size, in
+# arbitrary units, and the initial milliseconds per unit (measured on a
+# development machine; they are corrected by the timings recorded at runtime)
+def _lsa_cost(size):
+    # sumy fills a dense distinct words x sentences matrix
+    return size.distinct_words * size.sentences
+
+def _pairwise_cost(size):
+    # LexRank and TextRank compare every pair of sentences
+    return size.sentences * size.words
+
+def _luhn_cost(size):
+    # Every word is looked up in a tuple of significant words
+    return size.words * size.distinct_words
+
+def _linear_cost(size):
+    return size.words
+
+ALGORITHM_COSTS = {
+    "lsa": (_lsa_cost, 1.2e-3),
+    "sparse_lsa": (_linear_cost, 1e-2),
+    "lexrank": (_pairwise_cost, 1.1e-3),
+    "textrank": (_pairwise_cost, 3.5e-4),
+    "luhn": (_luhn_cost, 1.7e-5),
+    "baseline": (_linear_cost, 1.7e-3),
+}
+
+
+def document_size(parsed_document):
+    """Measure a sumy document for LatencyModel."""
+    sentences = parsed_document.sentences
+    words = 0
+    distinct_words = set()
+    for sentence in sentences:
+        words += len(sentence.words)
+        distinct_words.update(word.lower() for word in sentence.words)
+    return DocumentSize(len(sentences), words, len(distinct_words))
+
+
+class LatencyModel:
+    """
+    Predicts how long each summarization algorithm takes on a document.
+
+    The prediction is the algorithm's cost function of the document size
+    times a milliseconds-per-unit rate. The rate starts from a measured
+    prior and follows the timings recorded in this process as an
+    exponentially weighted moving average, so it adapts to the machine the
+    app runs on.
+    """
+
+    # Runs shorter than this are dominated by fixed overheads and would
+    # skew the per-unit rate, so they are not recorded
+    MIN_RECORDED_MS = 5.0
+
+    def __init__(self, costs=ALGORITHM_COSTS, preference=AUTO_PREFERENCE, smoothing=0.2):
+        self.costs = costs
+        self.preference = preference
+        self.smoothing = smoothing
+        self._rates = {name: prior for name, (_, prior) in costs.items()}
+        self._samples = dict.fromkeys(costs, 0)
+        self._lock = threading.Lock()
+
+    def predict(self, algorithm, size):
+        """Predicted running time in milliseconds."""
+        cost_function, _ = self.costs[algorithm]
+        return self._rates[algorithm] * cost_function(size)
+
+    def record(self, algorithm, size, elapsed_ms):
+        """Fold the measured running time of a run into the rate."""
+        if algorithm not in self.costs or elapsed_ms < self.MIN_RECORDED_MS:
+            return
+        cost_function, _ = self.costs[algorithm]
+        rate = elapsed_ms / max(cost_function(size), 1)
+        with self._lock:
+            self._rates[algorithm] += self.smoothing * (rate - self._rates[algorithm])
+            self._samples[algorithm] += 1
+
+    def select(self, size, budget_ms):
+        """
+        Pick the preferred algorithm expected to finish within the budget.
+
+        Args:
+            size (DocumentSize): Size of the document to summarize
+            budget_ms (float): Time available, in milliseconds
+
+        Returns:
+            str: The first algorithm of the preference order predicted to
+                fit in the budget, or the fastest one if none does
+        """
+        for algorithm in self.preference:
+            if self.predict(algorithm, size) <= budget_ms:
+                return algorithm
+        return min(self.preference, key=lambda algorithm: self.predict(algorithm, size))
+
+    def stats(self):
+        """Current rate and number of recorded runs of every algorithm."""
+        with self._lock:
+            return {
+                name: {"ms_per_unit": self._rates[name], "samples": self._samples[name]}
+                for name in self.costs
+            }
+
+
+# Shared by every request of the process
+latency_model = LatencyModel()
@@ -0,0 +1,63 @@
+from services.document import ParsedDocument
+from services.sentiment_analyzer import analyze_sentiment
+from services.text_summarizer import summarize_text
+from services.keyword_extractor import extract_keywords
+from services.content_enhancer import enhance_content
+from services.process_pool import run_cpu_bound, should_offload
+
+# Analyses that can be requested together, in the order they are run
+AVAILABLE_ANALYSES = (
+    "analyze_sentiment",
+    "summarize",
+    "extract_keywords",
+    "enhance_content",
+)
+
+def analyze_text(text, analyses=None, num_sentences=3, num_keywords=5, use_cache=True):
+    """
+    Run several analyses over the given text in a single pass.
+
+    The text is tokenized once into a ParsedDocument which every requested
+    service consumes, instead of each service re-tokenizing it. Long texts
+    are analyzed in the CPU pool, whose processes have result caches of
+    their own.
+
+    Args:
+        text (str): The text to analyze
+        analyses (list, optional): Names of the analyses to run, see
+            AVAILABLE_ANALYSES. Defaults to all of them.
+        num_sentences (int): Number of sentences in the summary
+        num_keywords (int): Number of keywords to extract
+        use_cache (bool): Whether cached results may be returned
+
+    Returns:
+        dict: A dictionary mapping each requested analysis to its result
+    """
+    if analyses is None:
+        analyses = AVAILABLE_ANALYSES
+
+    unknown = [name for name in analyses if name not in AVAILABLE_ANALYSES]
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(unknown)}")
+
+    if text and should_offload(text):
+        return run_cpu_bound(_analyze, text, analyses, num_sentences, num_keywords, use_cache)
+    return _analyze(text, analyses, num_sentences, num_keywords, use_cache)
+
+def _analyze(text, analyses, num_sentences, num_keywords, use_cache):
+    document = ParsedDocument(text) if text and text.strip() else None
+
+    results = {}
+    for name in AVAILABLE_ANALYSES:
+        if name not in analyses:
+            continue
+        if name == "analyze_sentiment":
+            results[name] = analyze_sentiment(text, document=document, use_cache=use_cache)
+        elif name == "summarize":
+            results[name] = summarize_text(text, num_sentences, document=document, use_cache=use_cache)
+        elif name == "extract_keywords":
+            results[name] = extract_keywords(text, num_keywords, document=document, use_cache=use_cache)
+        elif name == "enhance_content":
+            results[name] = enhance_content(text, document=document, use_cache=use_cache)
+
+    return results
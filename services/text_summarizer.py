@@ -1,21 +1,68 @@
+import time
+from contextlib import nullcontext
 from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer
-from sumy.nlp.stemmers import Stemmer
-from sumy.utils import get_stop_words
-import nltk
+import config
+from services.batch import run_batch
+from services.cache import result_cache
+from services.chunking import iter_chunks
+from services.memory import max_rss_bytes, track_peak_memory
+from services.metrics import metrics
+from services.process_pool import run_cpu_bound, should_offload
+from services.resources import (
+    get_sumy_tokenizer, get_lsa_summarizer, get_sparse_lsa_summarizer, get_lex_rank_summarizer,
+    get_text_rank_summarizer, get_luhn_summarizer, get_baseline_summarizer
+)
+from services.summary_selector import document_size, latency_model
 
-def summarize_text(text, num_sentences=3):
+# Summarization algorithms that can be requested, by name
+SUMMARY_ALGORITHMS = {
+    "lsa": get_lsa_summarizer,
+    "sparse_lsa": get_sparse_lsa_summarizer,
+    "lexrank": get_lex_rank_summarizer,
+    "textrank": get_text_rank_summarizer,
+    "luhn": get_luhn_summarizer,
+    "baseline": get_baseline_summarizer,
+}
+
+# Picks one of the algorithms above from the size of the text and the
+# latency budget
+AUTO_ALGORITHM = "auto"
+SUMMARY_ALGORITHM_CHOICES = tuple(SUMMARY_ALGORITHMS) + (AUTO_ALGORITHM,)
+
+# "standard" summarizes the whole document at once, "hierarchical" streams
+# it in chunks and summarizes the chunk summaries
+SUMMARY_MODES = ("standard", "hierarchical")
+
+def summarize_text(text, num_sentences=3, algorithm="lsa", mode="standard", max_latency_ms=None,
+                   document=None, use_cache=True):
     """
     Summarize the given text.
     
     Args:
         text (str): The text to summarize
         num_sentences (int): Number of sentences in the summary
+        algorithm (str): Summarization algorithm, see SUMMARY_ALGORITHMS.
+            "sparse_lsa" ranks sentences like "lsa" but scales with the
+            number of distinct words per sentence, for long documents.
+            "auto" runs the preferred algorithm expected to finish within
+            max_latency_ms.
+        mode (str): "standard" or "hierarchical", see SUMMARY_MODES. The
+            hierarchical mode keeps memory bounded on very large texts and
+            adds chunk counts and peak memory to the stats.
+        max_latency_ms (float, optional): Latency budget of "auto", in
+            milliseconds. Defaults to SUMMARY_LATENCY_BUDGET_MS.
+        document (ParsedDocument, optional): Pre-parsed form of the text
+        use_cache (bool): Whether a cached result may be returned
         
     Returns:
-        dict: A dictionary containing the summary and related stats
+        dict: A dictionary containing the summary, the algorithm that ran
+            and related stats
     """
+    if algorithm not in SUMMARY_ALGORITHM_CHOICES:
+        raise ValueError(f"Unknown summarization algorithm: {algorithm}")
+    if mode not in SUMMARY_MODES:
+        raise ValueError(f"Unknown summarization mode: {mode}")
+    
     if not text or len(text.strip()) == 0:
         return {
             "summary": "",
@@ -24,24 +71,137 @@ def summarize_text(text, num_sentences=3):
             "reduction_percentage": 0
         }
     
-    # Ensure we have NLTK punkt
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
+    params = {"num_sentences": num_sentences, "algorithm": algorithm, "mode": mode}
+    if algorithm == AUTO_ALGORITHM:
+        if max_latency_ms is None:
+            max_latency_ms = config.SUMMARY_LATENCY_BUDGET_MS
+        params["max_latency_ms"] = max_latency_ms
     
-    # Create parser
-    parser = PlaintextParser.from_string(text, Tokenizer("english"))
+    def compute():
+        # Long texts are summarized in the CPU pool, unless the shared
+        # document is already parsed here
+        if document is None and should_offload(text):
+            return run_cpu_bound(_compute, text, num_sentences, algorithm, mode, max_latency_ms)
+        return _compute(text, num_sentences, algorithm, mode, max_latency_ms, document)
     
-    # Create summarizer
-    stemmer = Stemmer("english")
-    summarizer = LsaSummarizer(stemmer)
-    summarizer.stop_words = get_stop_words("english")
+    return result_cache.get_or_compute("summarize", text, params, compute, use_cache)
+
+def summarize_text_batch(texts, num_sentences=3, algorithm="lsa", mode="standard", max_latency_ms=None,
+                         use_cache=True):
+    """
+    Summarize a batch of texts.
     
-    # Generate summary
-    summary_sentences = summarizer(parser.document, num_sentences)
-    summary = " ".join([str(sentence) for sentence in summary_sentences])
+    Args:
+        texts (list): The texts to summarize
+        num_sentences (int): Number of sentences in each summary
+        algorithm (str): Summarization algorithm, see SUMMARY_ALGORITHMS
+        mode (str): Summarization mode, see SUMMARY_MODES
+        max_latency_ms (float, optional): Latency budget of "auto" per text
+        use_cache (bool): Whether cached results may be returned
+        
+    Returns:
+        dict: Per-text results as returned by run_batch
+    """
+    def process(text):
+        return summarize_text(text, num_sentences, algorithm, mode, max_latency_ms, use_cache=use_cache)
     
+    return run_batch(process, texts)
+
+def _compute(text, num_sentences, algorithm, mode, max_latency_ms, document=None):
+    if mode == "hierarchical":
+        return _summarize_hierarchical(
+            text, num_sentences, algorithm, max_latency_ms, config.SUMMARY_CHUNK_CHARS
+        )
+    
+    # Reuse the shared document if there is one
+    start = time.perf_counter()
+    if document is not None:
+        parsed_document = document.sumy_document
+    else:
+        with metrics.time_stage("summarize", "parse"):
+            parsed_document = PlaintextParser.from_string(text, get_sumy_tokenizer()).document
+    
+    return _summarize(text, num_sentences, parsed_document, algorithm, max_latency_ms, start)
+
+def _summarize(text, num_sentences, parsed_document, algorithm, max_latency_ms, start):
+    size = document_size(parsed_document)
+    if algorithm == AUTO_ALGORITHM:
+        # The time spent parsing counts against the budget
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        algorithm = latency_model.select(size, max_latency_ms - elapsed_ms)
+    
+    summary = _run_summarizer(algorithm, parsed_document, num_sentences, size)
+    result = _summary_stats(text, summary)
+    result["algorithm"] = algorithm
+    return result
+
+def _summarize_hierarchical(text, num_sentences, algorithm, max_latency_ms, chunk_chars):
+    """
+    Summarize each chunk of the text, then the summaries of the chunks,
+    until they fit in a single chunk.
+    
+    Only one chunk is parsed at a time, so the memory used does not grow
+    with the size of the text beyond the text itself and the chunk
+    summaries. With "auto", the algorithm is selected once, on the first
+    chunk, with its share of the latency budget.
+    """
+    tokenizer = get_sumy_tokenizer()
+    selected = None if algorithm == AUTO_ALGORITHM else algorithm
+    
+    def summarize_chunk(chunk):
+        nonlocal selected
+        with metrics.time_stage("summarize", "parse"):
+            parsed_document = PlaintextParser.from_string(chunk, tokenizer).document
+        size = document_size(parsed_document)
+        if selected is None:
+            selected = latency_model.select(size, max_latency_ms * len(chunk) / len(text))
+        return _run_summarizer(selected, parsed_document, num_sentences, size)
+    
+    # tracemalloc slows every allocation down, so it is only on when asked for
+    with track_peak_memory() if config.SUMMARY_MEASURE_MEMORY else nullcontext() as memory:
+        level_text = text
+        chunks = 0
+        levels = 0
+        while True:
+            levels += 1
+            summaries = []
+            for chunk in iter_chunks(level_text, chunk_chars):
+                summaries.append(summarize_chunk(chunk))
+                chunks += 1
+            
+            next_text = "\n\n".join(summaries)
+            if len(summaries) <= 1:
+                summary = next_text
+                break
+            if len(next_text) >= len(level_text):
+                # Chunks too small to shrink (e.g. very long sentences):
+                # summarize what is left in one go
+                summary = summarize_chunk(next_text)
+                levels += 1
+                chunks += 1
+                break
+            level_text = next_text
+    
+    result = _summary_stats(text, summary.replace("\n\n", " "))
+    result["algorithm"] = selected
+    result["chunks"] = chunks
+    result["levels"] = levels
+    result["max_rss_bytes"] = max_rss_bytes()
+    if memory is not None:
+        result["peak_memory_bytes"] = memory.peak_bytes
+    return result
+
+def _run_summarizer(algorithm, parsed_document, num_sentences, size):
+    # Every run is timed to keep the latency model of "auto" up to date
+    summarizer = SUMMARY_ALGORITHMS[algorithm]()
+    start = time.perf_counter()
+    summary_sentences = summarizer(parsed_document, num_sentences)
+    elapsed = time.perf_counter() - start
+    latency_model.record(algorithm, size, elapsed * 1000)
+    metrics.observe_stage("summarize", f"rank_{algorithm}", elapsed)
+    return " ".join([str(sentence) for sentence in summary_sentences])
+
+def _summary_stats(text, summary):
     # Calculate statistics
     original_length = len(text)
     summary_length = len(summary)
@@ -0,0 +1,401 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import config
+from services.circuit_breaker import CircuitBreaker
+
+# Number of recent upstream calls the latency percentiles are computed on
+LATENCY_WINDOW = 1024
+
+# Calls recorded before the hedging delay is trusted
+HEDGE_MIN_SAMPLES = 20
+
+
+class TranslationError(Exception):
+    """The translation provider failed to translate a text."""
+
+
+class TranslationUnavailable(TranslationError):
+    """
+    The translation provider is considered down and is not being called.
+
+    Attributes:
+        retry_after (float): Seconds until it is tried again
+    """
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamStats:
+    """
+    Thread-safe latency and error counters of the calls to a provider.
+
+    Totals cover the life of the process, percentiles the last
+    LATENCY_WINDOW calls.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms, error=None):
+        """Record one call, and the exception it raised if it failed."""
+        with self._lock:
+            self.calls += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self._recent.append(elapsed_ms)
+            if error is not None:
+                self.errors += 1
+                if isinstance(error, TimeoutError):
+                    self.timeouts += 1
+
+    def record_hedge(self, won):
+        """Record a hedged call, and whether it answered first."""
+        with self._lock:
+            self.hedged += 1
+            if won:
+                self.hedge_wins += 1
+
+    def percentile(self, percent, min_samples=1):
+        """
+        Latency percentile of the recent calls, in milliseconds.
+
+        Returns:
+            float: The percentile, or None with fewer than min_samples calls
+        """
+        with self._lock:
+            recent = sorted(self._recent)
+        if len(recent) < max(1, min_samples):
+            return None
+        return recent[int(percent / 100 * (len(recent) - 1))]
+
+    def snapshot(self):
+        """Return the counters and the latency percentiles in milliseconds."""
+        with self._lock:
+            stats = {
+                "calls": self.calls,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "mean_ms": round(self.total_ms / self.calls, 2) if self.calls else None,
+                "max_ms": round(self.max_ms, 2)
+            }
+        for name, percent in (("p50_ms", 50), ("p95_ms", 95), ("p99_ms", 99)):
+            latency = self.percentile(percent)
+            stats[name] = round(latency, 2) if latency is not None else None
+        return stats
+
+
+class TranslationBackend:
+    """
+    Interface of the translation providers.
+
+    A backend is created once per process and shared by every request and
+    thread, so implementations must be thread-safe. They implement
+    _translate(); translate() checks the input, times every call and guards
+    the provider with a circuit breaker. With TRANSLATE_HEDGE_PERCENTILE
+    set, a call still running after that percentile of the recent
+    latencies is sent a second time and the first answer wins.
+    """
+
+    name = None
+
+    # Longest text a single call accepts
+    max_chars = 5000
+
+    def __init__(self):
+        self.upstream = UpstreamStats()
+        self.breaker = CircuitBreaker(
+            error_rate=config.TRANSLATE_BREAKER_ERROR_RATE,
+            min_calls=config.TRANSLATE_BREAKER_MIN_CALLS,
+            window=config.TRANSLATE_BREAKER_WINDOW,
+            cooldown=config.TRANSLATE_BREAKER_COOLDOWN
+        )
+        self.hedge_percentile = config.TRANSLATE_HEDGE_PERCENTILE
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+
+    def languages(self, source, target):
+        """
+        Validate a language pair.
+
+        Args:
+            source (str): Source language code or name, or 'auto'
+            target (str): Target language code or name
+
+        Returns:
+            tuple: The (source, target) codes of the provider
+
+        Raises:
+            ValueError: If the provider doesn't support one of the languages
+        """
+        return source, target
+
+    def translate(self, text, source, target):
+        """
+        Translate a text of at most max_chars characters.
+
+        Args:
+            text (str): The text to translate
+            source (str): Source language code, or 'auto'
+            target (str): Target language code
+
+        Returns:
+            str: The translated text, without surrounding whitespace
+
+        Raises:
+            TranslationUnavailable: If the circuit breaker is open
+        """
+        if len(text) > self.max_chars:
+            raise ValueError(f"Text exceeds the limit of {self.max_chars} characters")
+        text = text.strip()
+        if not text:
+            return text
+
+        permit = self.breaker.allow()
+        if permit is None:
+            raise TranslationUnavailable(
+                "Translation service is unavailable, try again later",
+                retry_after=self.breaker.retry_after()
+            )
+
+        delay_ms = None
+        if self.hedge_percentile:
+            delay_ms = self.upstream.percentile(self.hedge_percentile, HEDGE_MIN_SAMPLES)
+        if delay_ms is None:
+            return self._call(text, source, target, permit)
+        return self._hedged_call(text, source, target, delay_ms, permit)
+
+    def _call(self, text, source, target, permit):
+        start = time.perf_counter()
+        error = None
+        try:
+            return self._translate(text, source, target)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.upstream.record((time.perf_counter() - start) * 1000, error)
+            self.breaker.record(permit, error is None)
+
+    def _hedged_call(self, text, source, target, delay_ms, permit):
+        # The calls run on a pool of their own: its threads never wait for
+        # other tasks of the pool, so they can't deadlock
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self._call, text, source, target, permit)
+        done, _ = wait([primary], timeout=delay_ms / 1000)
+        if done:
+            return primary.result()
+        hedge_permit = self.breaker.allow()
+        if hedge_permit is None:
+            return primary.result()
+
+        hedge = executor.submit(self._call, text, source, target, hedge_permit)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer an answer, even from a call that finished with a failed
+            # one, and fall back to an error once both calls are over
+            succeeded = [future for future in done if future.exception() is None]
+            if succeeded or not pending:
+                future = succeeded[0] if succeeded else next(iter(done))
+                self.upstream.record_hedge(future is hedge and bool(succeeded))
+                return future.result()
+
+    def _get_hedge_executor(self):
+        if self._hedge_executor is None:
+            with self._hedge_lock:
+                if self._hedge_executor is None:
+                    # Room for a primary and a hedged call per pooled connection
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=2 * max(1, config.TRANSLATE_POOL_SIZE),
+                        thread_name_prefix='translate-hedge'
+                    )
+        return self._hedge_executor
+
+    def _translate(self, text, source, target):
+        raise NotImplementedError
+
+    def stats(self):
+        """Return the name, call statistics and breaker state of the backend."""
+        return dict(backend=self.name, breaker=self.breaker.stats(), **self.upstream.snapshot())
+
+    def close(self):
+        """Release the connections and threads held by the backend."""
+        with self._hedge_lock:
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+
+
+class GoogleBackend(TranslationBackend):
+    """
+    Google Translate's web endpoint, as used by deep_translator.
+
+    Unlike deep_translator's GoogleTranslator, all calls go through one
+    requests.Session whose keep-alive connections are pooled, so only the
+    first calls pay for the TCP and TLS handshakes, and every call has a
+    connect and a read timeout.
+    """
+
+    name = "google"
+
+    def __init__(self, connect_timeout=None, read_timeout=None, pool_size=None):
+        """
+        Args:
+            connect_timeout (float): Seconds to wait for a connection,
+                TRANSLATE_CONNECT_TIMEOUT by default
+            read_timeout (float): Seconds to wait for the response,
+                TRANSLATE_READ_TIMEOUT by default
+            pool_size (int): Connections kept alive, TRANSLATE_POOL_SIZE by
+                default
+        """
+        from deep_translator.constants import BASE_URLS, GOOGLE_LANGUAGES_TO_CODES
+
+        super().__init__()
+        self.url = BASE_URLS["GOOGLE_TRANSLATE"]
+        self.codes = GOOGLE_LANGUAGES_TO_CODES
+        self._supported = frozenset(GOOGLE_LANGUAGES_TO_CODES.values())
+        self.timeout = (
+            config.TRANSLATE_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout,
+            config.TRANSLATE_READ_TIMEOUT if read_timeout is None else read_timeout
+        )
+        self.pool_size = config.TRANSLATE_POOL_SIZE if pool_size is None else pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def languages(self, source, target):
+        if source != 'auto':
+            source = self._code(source)
+        return source, self._code(target)
+
+    def _code(self, language):
+        # Languages can be given by name, like deep_translator accepts
+        code = self.codes.get(language.lower(), language)
+        if code not in self._supported:
+            raise ValueError(f"Language not supported: {language}")
+        return code
+
+    def _translate(self, text, source, target):
+        import requests
+        from bs4 import BeautifulSoup
+        from deep_translator.exceptions import RequestError, TooManyRequests, TranslationNotFound
+
+        try:
+            response = self._get_session().get(
+                self.url, params={"sl": source, "tl": target, "q": text}, timeout=self.timeout
+            )
+        except requests.Timeout as e:
+            raise TimeoutError(f"Translation provider timed out: {e}") from e
+
+        # Read the whole body so the connection goes back to the pool
+        with response:
+            if response.status_code == 429:
+                raise TooManyRequests()
+            if not 200 <= response.status_code < 300:
+                raise RequestError()
+            soup = BeautifulSoup(response.text, "html.parser")
+
+        element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+        if not element:
+            raise TranslationNotFound(text)
+        return element.get_text(strip=True)
+
+    def _get_session(self):
+        # Created on first use, so gunicorn workers don't share the
+        # connections of the master process
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def close(self):
+        super().close()
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class FakeBackend(TranslationBackend):
+    """
+    Offline stand-in for the translation provider.
+
+    "Translates" a text by prefixing each of its lines with the target
+    language, after an optional delay, and can fail at random like a flaky
+    remote service. It
+    needs no network access, for development, offline deployments and
+    benchmarks.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms=0, failure_rate=0.0, seed=None):
+        """
+        Args:
+            latency_ms (float): Time every call takes, in milliseconds
+            failure_rate (float): Probability of a call raising ConnectionError
+            seed (int, optional): Seed of the failures, for reproducible runs
+        """
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _translate(self, text, source, target):
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if failed:
+            raise ConnectionError("Simulated translation failure")
+
+        return "\n".join(f"[{target}] {line}" if line.strip() else line for line in text.split("\n"))
+
+
+# Backend classes by TRANSLATE_BACKEND name
+TRANSLATION_BACKENDS = {
+    'google': GoogleBackend,
+    'fake': FakeBackend
+}
+
+
+def create_backend(name=None):
+    """
+    Create the translation backend of the given name.
+
+    Args:
+        name (str, optional): A key of TRANSLATION_BACKENDS,
+            TRANSLATE_BACKEND by default
+
+    Returns:
+        TranslationBackend: The backend, with its default settings
+    """
+    name = name or config.TRANSLATE_BACKEND
+    backend = TRANSLATION_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown translation backend: {name}")
+    return backend()
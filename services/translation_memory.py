@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import config
+
+# What TranslationMemory.claim() returns for each segment
+HIT = "hit"
+WAIT = "wait"
+OWN = "own"
+
+
+class TranslationMemory:
+    """
+    Sentence-level translation memory with single-flight coalescing.
+
+    Translations are kept per (source, target, segment), the segment being
+    normalized, so a sentence repeated inside a document or across
+    documents is only sent to the provider once. The least recently used
+    segments are evicted first.
+
+    Segments being translated are registered as in flight: a request
+    needing one of them waits for the translation under way instead of
+    asking the provider again, so N concurrent identical requests make a
+    single upstream call.
+    """
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(source, target, segment):
+        """Build the key of a segment, ignoring differences in whitespace."""
+        return source, target, " ".join(segment.split())
+
+    def claim(self, keys):
+        """
+        Look segments up, and claim the ones nobody is translating.
+
+        Every claimed segment must be settled with resolve() or fail(),
+        otherwise the requests waiting for it never finish.
+
+        Args:
+            keys (list): Segment keys from make_key(), in document order
+
+        Returns:
+            list: For each key, (HIT, translation) if it is in memory,
+                (WAIT, future) if it is being translated, possibly earlier
+                in the same list, and (OWN, future) if the caller has to
+                translate it
+        """
+        claims = []
+        with self._lock:
+            for key in keys:
+                translation = self._entries.get(key)
+                if translation is not None:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    claims.append((HIT, translation))
+                elif key in self._in_flight:
+                    self._counters["coalesced"] += 1
+                    claims.append((WAIT, self._in_flight[key]))
+                else:
+                    self._counters["misses"] += 1
+                    future = self._in_flight[key] = Future()
+                    claims.append((OWN, future))
+        return claims
+
+    def resolve(self, key, translation):
+        """
+        Settle a claimed segment.
+
+        Args:
+            key (tuple): The segment key
+            translation (str): Its translation, or None if it could not be
+                told apart from the translation of its neighbours, in which
+                case it is not kept and waiting requests translate it alone
+        """
+        with self._lock:
+            future = self._in_flight.pop(key, None)
+            if translation is not None and self.max_entries > 0:
+                self._store(key, translation)
+        if future is not None and not future.done():
+            future.set_result(translation)
+
+    def fail(self, key, error):
+        """Settle a claimed segment whose translation failed."""
+        with self._lock:
+            future = self._in_flight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+    def store(self, key, translation):
+        """Keep the translation of a segment that was not claimed."""
+        if self.max_entries > 0:
+            with self._lock:
+                self._store(key, translation)
+
+    def _store(self, key, translation):
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def stats(self):
+        """Return the number of segments kept and the hit/miss counters."""
+        with self._lock:
+            return dict(
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                in_flight=len(self._in_flight),
+                **self._counters
+            )
+
+    def clear(self):
+        """Forget every translation."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Memory shared by every request in this process
+translation_memory = TranslationMemory(config.TRANSLATION_MEMORY_SIZE)
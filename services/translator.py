@@ -1,6 +1,39 @@
-from deep_translator import GoogleTranslator
+import re
+import time
+import config
+from services.batch import run_batch
+from services.cache import result_cache
+from services.chunking import iter_chunks, sentence_spans
+from services.metrics import metrics
+from services.resources import get_language_detector, get_translation_backend, get_translation_executor
+from services.translation_backends import TranslationError, TranslationUnavailable
+from services.translation_memory import translation_memory, HIT, WAIT, OWN
 
-def translate_text(text, from_lang='auto', to_lang='en'):
+# Marks the segments translated together with the previous ones, when the
+# translation of a run could not be split back into sentences
+_MERGED = object()
+
+# Language code mapping (UI friendly names to ISO codes)
+LANGUAGE_MAPPING = {
+    'english': 'en',
+    'german': 'de',
+    'spanish': 'es',
+    'french': 'fr',
+    'italian': 'it',
+    'portuguese': 'pt',
+    'russian': 'ru',
+    'japanese': 'ja',
+    'chinese': 'zh-CN',
+    'arabic': 'ar',
+    'hindi': 'hi'
+}
+
+# Supported target languages (ISO codes to display names)
+SUPPORTED_LANGUAGES = {
+    code: name.capitalize() for name, code in LANGUAGE_MAPPING.items()
+}
+
+def translate_text(text, from_lang='auto', to_lang='en', use_cache=True):
     """
     Translate the given text from one language to another.
     
@@ -8,9 +41,16 @@ def translate_text(text, from_lang='auto', to_lang='en'):
         text (str): The text to translate
         from_lang (str): Source language code (or 'auto' for auto-detection)
         to_lang (str): Target language code
+        use_cache (bool): Whether a cached translation may be returned
         
     Returns:
         dict: A dictionary containing the translated text and language info
+        
+    Raises:
+        ValueError: If a language is not supported
+        TranslationError: If the translation provider failed
+        TranslationUnavailable: If the provider is considered down and was
+            not called
     """
     if not text or len(text.strip()) == 0:
         return {
@@ -20,59 +60,271 @@ def translate_text(text, from_lang='auto', to_lang='en'):
             "original_length": 0
         }
     
-    # Language code mapping (UI friendly names to ISO codes)
-    language_mapping = {
-        'english': 'en',
-        'german': 'de',
-        'spanish': 'es',
-        'french': 'fr',
-        'italian': 'it',
-        'portuguese': 'pt',
-        'russian': 'ru',
-        'japanese': 'ja',
-        'chinese': 'zh-CN',
-        'arabic': 'ar',
-        'hindi': 'hi'
-    }
+    from_lang = _normalize_language(from_lang)
+    to_lang = _normalize_language(to_lang)
+    
+    try:
+        # Failed translations raise, so they are never cached
+        return _cached_translation(text, from_lang, to_lang, get_translation_backend(), use_cache)
+    except TranslationError as e:
+        print(f"Translation failed: {str(e)}")  # Log the error
+        raise
+
+def translate_text_batch(texts, from_lang='auto', to_lang='en', use_cache=True):
+    """
+    Translate a batch of texts from one language to another.
+    
+    The translation backend and its pooled connections are shared by the
+    whole batch. A failed translation is reported as an error for that item.
     
+    Args:
+        texts (list): The texts to translate
+        from_lang (str): Source language code (or 'auto' for auto-detection)
+        to_lang (str): Target language code
+        use_cache (bool): Whether cached translations may be returned
+        
+    Returns:
+        dict: Per-text results as returned by run_batch
+    """
+    from_lang = _normalize_language(from_lang)
+    to_lang = _normalize_language(to_lang)
+    backend = get_translation_backend()
+    
+    def process(text):
+        return _cached_translation(text, from_lang, to_lang, backend, use_cache)
+    
+    return run_batch(process, texts)
+
+def translation_stats():
+    """
+    Report the calls made to the translation provider by this process.
+    
+    Returns:
+        dict: "upstream" with the backend name, call, error and timeout
+            counts and the mean, percentile and maximum latencies in
+            milliseconds, and "memory" with the translation memory counters
+    """
+    return {
+        "upstream": get_translation_backend().stats(),
+        "memory": translation_memory.stats()
+    }
+
+def _normalize_language(lang):
     # Convert language name to code if needed
-    if to_lang.lower() in language_mapping:
-        to_lang = language_mapping[to_lang.lower()]
+    if lang.lower() in LANGUAGE_MAPPING:
+        return LANGUAGE_MAPPING[lang.lower()]
+    return lang
+
+def _cached_translation(text, from_lang, to_lang, backend, use_cache):
+    def compute():
+        # Reject unsupported languages even when there is nothing to translate
+        backend.languages(from_lang, to_lang)
+        source, confidence = _detect_source(text, from_lang)
+        if source == to_lang and (confidence is None or confidence >= config.LANGUAGE_DETECTION_MIN_CONFIDENCE):
+            return _untranslated(text, source, to_lang, confidence)
+        return _translate(text, from_lang, to_lang, backend, source, confidence)
     
-    # Check if we're actually changing languages
-    if to_lang == 'en' and from_lang == 'auto':
-        # Skip translation if already in English and source is auto
-        return {
-            "translated_text": text,
-            "source_language": "auto-detected (English)",
-            "target_language": "en",
-            "original_length": len(text)
-        }
+    return result_cache.get_or_compute(
+        "translate", text, {"from_lang": from_lang, "to_lang": to_lang}, compute, use_cache
+    )
+
+def _detect_source(text, from_lang):
+    """
+    The source language of a text and the confidence of its detection.
+    
+    Returns:
+        tuple: (from_lang, None) if the source language was given, and the
+            language detected locally and its confidence for 'auto', the
+            language being None if the text has no letters or is too short
+            to tell, in which case it is translated
+    """
+    if from_lang != 'auto':
+        return from_lang, None
+    with metrics.time_stage("translate", "detect"):
+        return get_language_detector().detect(text)
+
+def _untranslated(text, source, to_lang, confidence):
+    return {
+        "translated_text": text,
+        "source_language": source,
+        "source_confidence": confidence,
+        "target_language": to_lang,
+        "original_length": len(text)
+    }
+
+def _translate(text, from_lang, to_lang, backend, detected, confidence):
+    # The provider detects the language of every call itself: the local
+    # detection only knows a few languages, so it is not sent
+    source, target = backend.languages(from_lang, to_lang)
+    spans = list(_segment_spans(text))
+    segments = [text[start:end] for start, end in spans]
+    try:
+        translations, from_memory = _translate_segments(segments, source, target, backend)
+    except TranslationError:
+        raise
+    except Exception as e:
+        raise TranslationError(f"Translation error: {str(e)}") from e
+    
+    # Put the translations back between the original line breaks and spaces
+    parts = []
+    position = 0
+    for (start, end), translation in zip(spans, translations):
+        if translation is not _MERGED:
+            parts.extend((text[position:start], translation))
+        position = end
+    parts.append(text[position:])
+    translated_text = "".join(parts)
+    
+    return {
+        "translated_text": translated_text,
+        "source_language": detected or from_lang,
+        "source_confidence": confidence,
+        "target_language": to_lang,
+        "original_length": len(text),
+        "segments": len(segments),
+        "segments_from_memory": from_memory
+    }
+
+def _segment_spans(text):
+    """
+    The (start, end) offsets of the sentences of a text, line by line.
+    
+    Sentences longer than TRANSLATE_CHUNK_CHARS are cut between words so
+    that every segment fits in a single call to the provider.
+    """
+    max_chars = config.TRANSLATE_CHUNK_CHARS
+    for line in re.finditer(r"[^\n]+", text):
+        offset = line.start()
+        for start, end in sentence_spans(line.group()):
+            # Punkt keeps the indentation of a line in its first sentence,
+            # leave it out of the segment so it is not lost
+            sentence = text[start + offset:end + offset]
+            start += offset + len(sentence) - len(sentence.lstrip())
+            end += offset
+            if start >= end:
+                continue
+            if end - start <= max_chars:
+                yield start, end
+                continue
+            position = start
+            for piece in iter_chunks(text[start:end], max_chars):
+                position = text.index(piece, position)
+                content = piece.strip()
+                if content:
+                    content_start = position + piece.index(content)
+                    yield content_start, content_start + len(content)
+                position += len(piece)
+
+def _translate_segments(segments, source, target, backend):
+    """
+    Translate segments through the translation memory.
     
+    Segments in memory are served from it and segments another request is
+    translating are waited for. The others are packed into runs, one line
+    per segment, each run translated in a single call on the shared
+    translation thread pool. When the translation of a run has one line per
+    segment they are kept in memory. Otherwise a run of consecutive
+    segments is returned as a whole, and the segments of other runs are
+    translated one by one.
+    
+    Returns:
+        tuple: (translations, from_memory) where translations has the
+            translation of every segment, or _MERGED for the segments
+            translated with the previous one, and from_memory is the number
+            of segments not sent to the provider
+    """
+    keys = [translation_memory.make_key(source, target, segment) for segment in segments]
+    claims = translation_memory.claim(keys)
+    translations = [None] * len(segments)
+    
+    owned = [index for index, (state, _) in enumerate(claims) if state == OWN]
+    unsettled = set(owned)
+    executor = get_translation_executor()
+    futures = []
     try:
-        # Perform translation
-        translator = GoogleTranslator(source=from_lang, target=to_lang)
-        translated_text = translator.translate(text)
+        for run in _runs(owned, segments):
+            lines = [keys[index][2] for index in run]
+            contiguous = run[-1] - run[0] == len(run) - 1
+            futures.append((run, executor.submit(_translate_run, lines, contiguous, source, target, backend)))
         
-        # If from_lang was auto, get detected language
-        if from_lang == 'auto':
-            detected_lang = "auto-detected"
-        else:
-            detected_lang = from_lang
-            
-        return {
-            "translated_text": translated_text,
-            "source_language": detected_lang,
-            "target_language": to_lang,
-            "original_length": len(text)
-        }
+        for run, future in futures:
+            translation, lines = future.result()
+            if lines is None:
+                translations[run[0]] = translation
+                for index in run[1:]:
+                    translations[index] = _MERGED
+                lines = [None] * len(run)
+            for index, line in zip(run, lines):
+                if line is not None:
+                    translations[index] = line
+                translation_memory.resolve(keys[index], line)
+                unsettled.discard(index)
     except Exception as e:
-        error_message = f"Translation error: {str(e)}"
-        print(f"Translation failed: {error_message}")  # Log the error
-        
-        return {
-            "translated_text": error_message,
-            "source_language": from_lang,
-            "target_language": to_lang,
-            "original_length": len(text)
-        }
\ No newline at end of file
+        # Don't translate the rest of a text that has failed anyway, and let
+        # the requests waiting for its segments fail too
+        for _, future in futures:
+            future.cancel()
+        for index in unsettled:
+            translation_memory.fail(keys[index], e)
+        raise
+    
+    from_memory = 0
+    for index, (state, value) in enumerate(claims):
+        if state == HIT:
+            translations[index] = value
+            from_memory += 1
+        elif state == WAIT:
+            translation = value.result()
+            if translation is None:
+                # It was translated as part of a run, translate it alone
+                translation = _translate_chunk(keys[index][2], source, target, backend)
+                translation_memory.store(keys[index], translation)
+            else:
+                from_memory += 1
+            translations[index] = translation
+    return translations, from_memory
+
+def _runs(indices, segments):
+    # Group segments, in order, into runs that fit in a single call
+    max_chars = config.TRANSLATE_CHUNK_CHARS
+    runs = []
+    run = []
+    size = 0
+    for index in indices:
+        length = len(segments[index]) + 1
+        if run and size + length > max_chars + 1:
+            runs.append(run)
+            run = []
+            size = 0
+        run.append(index)
+        size += length
+    if run:
+        runs.append(run)
+    return runs
+
+def _translate_run(lines, contiguous, source, target, backend):
+    translation = _translate_chunk("\n".join(lines), source, target, backend)
+    translated_lines = [line.strip() for line in translation.split("\n")]
+    if len(translated_lines) == len(lines) and all(translated_lines):
+        return translation, translated_lines
+    if contiguous:
+        return translation, None
+    # Segments from all over the text can't be returned as a whole
+    return None, [_translate_chunk(line, source, target, backend) for line in lines]
+
+def _translate_chunk(chunk, source, target, backend):
+    # Retry transient failures of the provider, waiting longer every time
+    attempt = 0
+    while True:
+        try:
+            # Every call to the provider is timed, retries included
+            with metrics.time_stage("translate", "upstream"):
+                return backend.translate(chunk, source, target)
+        except TranslationUnavailable:
+            # The provider is down, don't wait for it
+            raise
+        except Exception:
+            if attempt >= config.TRANSLATE_RETRIES:
+                raise
+            time.sleep(config.TRANSLATE_RETRY_DELAY_MS / 1000 * 2 ** attempt)
+            attempt += 1
@@ -0,0 +1,4 @@
+import os
+
+# Don't load every model when the app is imported, config reads it once
+os.environ.setdefault("LAZY_STARTUP", "true")
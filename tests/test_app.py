@@ -0,0 +1,40 @@
+"""
+Requests dispatched internally for jobs and bulk runs.
+"""
+import pytest
+
+import app as text_app
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Count the requests seen by the metrics, the request log and the profiler."""
+    calls = {"metrics": 0, "log": 0, "profiler": 0}
+
+    def count(name, result=None):
+        def record(*args, **kwargs):
+            calls[name] += 1
+            return result(*args, **kwargs) if result else None
+        return record
+
+    monkeypatch.setattr(text_app.metrics, "observe_request", count("metrics"))
+    monkeypatch.setattr(text_app.request_logger, "log", count("log"))
+    monkeypatch.setattr(text_app.request_profiler, "call", count(
+        "profiler", lambda route, headers, function, *args, **kwargs: (function(*args, **kwargs), None)
+    ))
+    return calls
+
+
+def test_internal_dispatch_skips_the_request_hooks(recorded):
+    status_code, body = text_app.run_endpoint("analyze_sentiment", {"text": "I love this"})
+
+    assert status_code == 200
+    assert body["status"] == "success"
+    assert recorded == {"metrics": 0, "log": 0, "profiler": 0}
+
+
+def test_client_requests_go_through_the_request_hooks(recorded):
+    response = text_app.app.test_client().post("/api/analyze_sentiment", json={"text": "I love this"})
+
+    assert response.status_code == 200
+    assert recorded == {"metrics": 1, "log": 1, "profiler": 1}
@@ -0,0 +1,62 @@
+"""
+The IDF index of the workers across rebuilds and updates.
+"""
+import argparse
+import json
+
+import pytest
+
+import config
+from scripts import idf_index as idf_index_script
+from services import resources
+
+
+def write_corpus(path, documents):
+    path.write_text("".join(json.dumps({"body": document}) + "\n" for document in documents))
+    return str(path)
+
+
+def run(command, corpus, index):
+    args = argparse.Namespace(corpus=corpus, index=index, field=["body"], buckets=1024, tokenizer="treebank")
+    getattr(idf_index_script, command)(args)
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "idf.index")
+    monkeypatch.setattr(config, "KEYWORD_IDF_INDEX", path)
+    monkeypatch.delitem(resources._resources, "idf_index", raising=False)
+    yield path
+    resources._resources.pop("idf_index", None)
+
+
+def test_missing_index_is_picked_up_once_built(index_path, tmp_path):
+    assert resources.get_idf_index() is None
+
+    run("build", write_corpus(tmp_path / "corpus.jsonl", ["alpha beta", "beta gamma"]), index_path)
+
+    assert resources.get_idf_index().documents == 2
+
+
+def test_rebuilt_index_is_reopened(index_path, tmp_path):
+    run("build", write_corpus(tmp_path / "first.jsonl", ["alpha beta", "beta gamma"]), index_path)
+    first = resources.get_idf_index()
+    assert resources.get_idf_index() is first
+
+    run("build", write_corpus(tmp_path / "second.jsonl", ["delta", "delta", "epsilon"]), index_path)
+    second = resources.get_idf_index()
+
+    assert second is not first
+    assert second.documents == 3
+    # Requests still holding the previous index can use it
+    assert first.documents == 2
+
+
+def test_updated_index_is_seen_through_the_mapping(index_path, tmp_path):
+    run("build", write_corpus(tmp_path / "first.jsonl", ["alpha beta"]), index_path)
+    index = resources.get_idf_index()
+
+    run("update", write_corpus(tmp_path / "more.jsonl", ["gamma", "delta"]), index_path)
+
+    assert resources.get_idf_index() is index
+    assert index.documents == 3
@@ -0,0 +1,63 @@
+"""
+Hedged calls of the translation backends, offline with FakeBackend.
+"""
+import threading
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED
+
+import pytest
+
+from services import translation_backends
+from services.translation_backends import FakeBackend
+
+
+class RacingBackend(FakeBackend):
+    """The primary call fails and the hedged one succeeds, both once released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _translate(self, text, source, target):
+        with self._calls_lock:
+            self.calls += 1
+            primary = self.calls == 1
+        self.release.wait(5)
+        if primary:
+            raise ConnectionError("Simulated translation failure")
+        return super()._translate(text, source, target)
+
+
+@pytest.fixture
+def same_wait(monkeypatch):
+    """Make both hedged calls finish before wait() returns."""
+    real_wait = translation_backends.wait
+    backends = []
+
+    def wait(futures, timeout=None, return_when=ALL_COMPLETED):
+        if return_when == FIRST_COMPLETED:
+            for backend in backends:
+                backend.release.set()
+            return real_wait(futures, timeout=5, return_when=ALL_COMPLETED)
+        return real_wait(futures, timeout=timeout, return_when=return_when)
+
+    monkeypatch.setattr(translation_backends, "wait", wait)
+    return backends.append
+
+
+@pytest.mark.parametrize("attempt", range(20))
+def test_hedged_call_prefers_an_answer_over_an_error_in_the_same_wait(same_wait, attempt):
+    backend = RacingBackend()
+    same_wait(backend)
+    try:
+        permit = backend.breaker.allow()
+        translation = backend._hedged_call("Hello there.", "en", "fr", 1, permit)
+    finally:
+        backend.close()
+
+    assert translation == "[fr] Hello there."
+    assert backend.calls == 2
+    stats = backend.upstream.snapshot()
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
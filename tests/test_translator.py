@@ -0,0 +1,181 @@
+"""
+Chunked translation, offline: every test runs against FakeBackend.
+"""
+import random
+import threading
+import time
+
+import pytest
+
+import config
+from services import translator
+from services.translation_backends import FakeBackend, TranslationError, TranslationUnavailable
+from services.translation_memory import translation_memory
+
+
+class RecordingBackend(FakeBackend):
+    """FakeBackend keeping the text of every call, answering in random order."""
+
+    def __init__(self, jitter_ms=0):
+        super().__init__()
+        self.jitter_ms = jitter_ms
+        self.calls = []
+        self._calls_lock = threading.Lock()
+
+    def _translate(self, text, source, target):
+        with self._calls_lock:
+            self.calls.append(text)
+        if self.jitter_ms:
+            time.sleep(random.uniform(0, self.jitter_ms) / 1000)
+        return self._answer(text, source, target)
+
+    def _answer(self, text, source, target):
+        return super()._translate(text, source, target)
+
+
+class FlakyBackend(RecordingBackend):
+    """Fails the first `failures` calls whose text contains `marker`."""
+
+    def __init__(self, marker, failures):
+        super().__init__()
+        self.marker = marker
+        self.failures = failures
+
+    def _answer(self, text, source, target):
+        if self.marker in text:
+            with self._calls_lock:
+                failed = self.failures > 0
+                self.failures -= 1
+            if failed:
+                raise ConnectionError("Simulated translation failure")
+        return super()._answer(text, source, target)
+
+
+class MergingBackend(RecordingBackend):
+    """Returns the lines of a call joined into one, like providers sometimes do."""
+
+    def _answer(self, text, source, target):
+        return f"[{target}] " + " ".join(text.split("\n"))
+
+
+class UnavailableBackend(RecordingBackend):
+    """A provider that is down."""
+
+    def _answer(self, text, source, target):
+        raise TranslationUnavailable("Translation provider unavailable", retry_after=15)
+
+
+@pytest.fixture
+def use_backend(monkeypatch):
+    """Install a backend for the translator, with small chunks and no retry delay."""
+    monkeypatch.setattr(config, "TRANSLATE_CHUNK_CHARS", 40)
+    monkeypatch.setattr(config, "TRANSLATE_RETRIES", 2)
+    monkeypatch.setattr(config, "TRANSLATE_RETRY_DELAY_MS", 0)
+    translation_memory.clear()
+
+    def install(backend):
+        monkeypatch.setattr(translator, "get_translation_backend", lambda: backend)
+        return backend
+
+    yield install
+    translation_memory.clear()
+
+
+def translate(text):
+    return translator.translate_text(text, from_lang="en", to_lang="fr", use_cache=False)
+
+
+def test_chunks_are_reassembled_in_order_with_line_breaks(use_backend):
+    backend = use_backend(RecordingBackend(jitter_ms=20))
+    text = (
+        "The first sentence is here. A second one follows.\n"
+        "A third line stands alone.\n"
+        "\n"
+        "  The last paragraph is after it. It ends here.\n"
+    )
+
+    result = translate(text)
+
+    assert result["translated_text"] == (
+        "[fr] The first sentence is here. [fr] A second one follows.\n"
+        "[fr] A third line stands alone.\n"
+        "\n"
+        "  [fr] The last paragraph is after it. [fr] It ends here.\n"
+    )
+    assert result["segments"] == 5
+    assert len(backend.calls) > 1
+    assert all(len(call) <= config.TRANSLATE_CHUNK_CHARS for call in backend.calls)
+
+
+def test_sentences_longer_than_a_chunk_are_cut_between_words(use_backend):
+    backend = use_backend(RecordingBackend(jitter_ms=20))
+    words = [f"word{number}" for number in range(40)]
+    text = "Short one.\n" + " ".join(words) + ".\nThe end."
+
+    translated_text = translate(text)["translated_text"]
+
+    assert all(len(call) <= config.TRANSLATE_CHUNK_CHARS for call in backend.calls)
+    assert translated_text.replace("[fr] ", "") == text
+    lines = translated_text.split("\n")
+    assert lines[0] == "[fr] Short one."
+    assert lines[1].count("[fr] ") > 1
+    assert lines[2] == "[fr] The end."
+
+
+def test_failed_chunk_is_retried_alone(use_backend):
+    backend = use_backend(FlakyBackend("Second", failures=2))
+    text = "First sentence of the text.\nSecond sentence of the text.\nThird sentence of the text."
+
+    result = translate(text)
+
+    assert result["translated_text"] == (
+        "[fr] First sentence of the text.\n"
+        "[fr] Second sentence of the text.\n"
+        "[fr] Third sentence of the text."
+    )
+    # Two failures and a success for the chunk with the second sentence,
+    # a single call for the others
+    assert sum("Second" in call for call in backend.calls) == 3
+    assert sum("First" in call for call in backend.calls) == 1
+
+
+def test_chunk_failing_past_the_retries_fails_the_translation(use_backend):
+    backend = use_backend(FlakyBackend("Second", failures=config.TRANSLATE_RETRIES + 1))
+    text = "First sentence of the text.\nSecond sentence of the text."
+
+    with pytest.raises(TranslationError):
+        translate(text)
+    assert sum("Second" in call for call in backend.calls) == config.TRANSLATE_RETRIES + 1
+    # Waiting requests are released
+    assert translation_memory.stats()["in_flight"] == 0
+
+
+def test_merged_run_of_consecutive_segments_is_returned_whole(use_backend):
+    backend = use_backend(MergingBackend())
+
+    result = translate("One is here. Two is there.")
+
+    assert backend.calls == ["One is here.\nTwo is there."]
+    assert result["translated_text"] == "[fr] One is here. Two is there."
+    # The segments can't be told apart, so they are not kept
+    assert translation_memory.stats()["entries"] == 0
+
+
+def test_merged_run_of_scattered_segments_is_translated_line_by_line(use_backend):
+    backend = use_backend(MergingBackend())
+    translation_memory.store(translation_memory.make_key("en", "fr", "Two is there."), "[fr] Deux")
+
+    result = translate("One is here. Two is there. Three now.")
+
+    assert backend.calls == ["One is here.\nThree now.", "One is here.", "Three now."]
+    assert result["translated_text"] == "[fr] One is here. [fr] Deux [fr] Three now."
+    assert result["segments_from_memory"] == 1
+
+
+def test_unavailable_provider_is_not_retried(use_backend):
+    backend = use_backend(UnavailableBackend())
+
+    with pytest.raises(TranslationUnavailable) as raised:
+        translate("Try again later.")
+    assert raised.value.retry_after == 15
+    assert len(backend.calls) == 1